@@ -2,6 +2,7 @@
 import React, { useState, useRef, useEffect, useCallback } from 'react';
 import { Send, User, Bot, Copy, Check } from 'lucide-react';
 import { Message } from '../types';
+import { streamRCAAgent } from '../utils/rcaApi';
 
 interface ChatWindowProps {
   conversation: any; // Using any for now to avoid type issues
@@ -18,6 +19,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({
 }) => {
   const [input, setInput] = useState<string>('');
   const [localLoading, setLocalLoading] = useState<boolean>(false);
+  const [streaming, setStreaming] = useState<boolean>(false);
   const [copiedMessageId, setCopiedMessageId] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
@@ -99,21 +101,45 @@ const ChatWindow: React.FC<ChatWindowProps> = ({
 
     try {
       const startTime = Date.now();
-      const response = await callRCAAPI(input.trim(), updatedMessages);
-      const processingTime = Date.now() - startTime;
-
       const botMessage: Message = {
         id: `msg_${Date.now()}_assistant`,
-        content: response,
+        content: '',
         role: 'assistant',
         timestamp: new Date(),
         metadata: {
-          processingTime,
+          processingTime: 0,
           confidence: 0.95
         }
       };
+      const showBotMessage = (content: string, processingTime = 0): void => {
+        onUpdateConversation(conversation.id, [
+          ...updatedMessages,
+          { ...botMessage, content, metadata: { ...botMessage.metadata, processingTime } }
+        ]);
+      };
+
+      // Render tokens as they arrive; fall back to the buffered endpoint if streaming is unavailable
+      let streamed = '';
+      let response: string;
+      try {
+        response = await streamRCAAgent(
+          '/api/rca/analyze/stream',
+          { error_log: input.trim(), conversationId: conversation?.id || '' },
+          {
+            onToken: (text) => {
+              streamed += text;
+              setStreaming(true);
+              showBotMessage(streamed);
+            }
+          }
+        );
+      } catch (streamError) {
+        if (streamed) throw streamError;
+        console.warn('RCA stream unavailable, falling back:', streamError);
+        response = await callRCAAPI(input.trim(), updatedMessages);
+      }
 
-      onUpdateConversation(conversation.id, [...updatedMessages, botMessage]);
+      showBotMessage(response, Date.now() - startTime);
     } catch (error) {
       console.error('Error in sendMessage:', error);
       const errorMessage: Message = {
@@ -129,6 +155,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({
       onUpdateConversation(conversation.id, [...updatedMessages, errorMessage]);
     } finally {
       setLocalLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -220,7 +247,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({
           </div>
         ))}
         
-        {isAnyLoading && (
+        {isAnyLoading && !streaming && (
           <div className="message assistant">
             <div className="message-avatar">
               <Bot size={20} />
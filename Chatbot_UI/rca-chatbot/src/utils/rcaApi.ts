@@ -30,4 +30,70 @@ export const callRCAAgent = async (message: string, history: any[] = []) => {
   const generateSessionId = () => {
     return Math.random().toString(36).substring(2) + Date.now().toString(36);
   };
-  
\ No newline at end of file
+  
+  export interface RCAStreamHandlers {
+    onContext?: (context: { cache: string; files?: string[]; code_references?: string[] }) => void;
+    onToken: (text: string) => void;
+  }
+
+  // Streams /analyze/stream (server-sent events) and returns the full analysis.
+  // Throws if the stream cannot be opened so callers can fall back to /analyze.
+  export const streamRCAAgent = async (
+    url: string,
+    body: Record<string, unknown>,
+    handlers: RCAStreamHandlers,
+    signal?: AbortSignal
+  ): Promise<string> => {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+        'Authorization': `Bearer ${process.env.REACT_APP_RCA_API_KEY || ''}`
+      },
+      body: JSON.stringify(body),
+      signal
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`RCA Stream Error: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let analysis = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line; keep any partial event for the next read
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+
+      for (const raw of events) {
+        let event = 'message';
+        let data = '';
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        if (!data) continue;
+        const payload = JSON.parse(data);
+
+        if (event === 'context') {
+          handlers.onContext?.(payload);
+        } else if (event === 'token') {
+          analysis += payload.text;
+          handlers.onToken(payload.text);
+        } else if (event === 'done') {
+          return payload.analysis ?? analysis;
+        } else if (event === 'error') {
+          throw new Error(payload.message);
+        }
+      }
+    }
+    return analysis;
+  };
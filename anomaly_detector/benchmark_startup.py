@@ -0,0 +1,46 @@
+import sys
+import json
+import subprocess
+from model_store import MMAP_DIR
+
+RUNS = 5
+SAMPLE_LOGS = [
+    "INFO: User 'testuser' logged in successfully.",
+    "ERROR: Database connection failed: timeout expired.",
+]
+
+# Runs inside a fresh interpreter so every measurement is a real cold start
+_PROBE = """
+import sys, json, time
+sys.path.insert(0, '.')
+started = time.perf_counter()
+from detect_anomalies import AnomalyDetector
+detector = AnomalyDetector(**json.loads(sys.argv[1]))
+ready = time.perf_counter()
+detector.predict(json.loads(sys.argv[2]))
+done = time.perf_counter()
+print(json.dumps({'startup_ms': (ready - started) * 1000, 'first_predict_ms': (done - ready) * 1000}))
+"""
+
+MODES = {
+    'joblib (current format)': {},
+    'memory-mapped': {'mmap_dir': MMAP_DIR},
+    'memory-mapped, lazy': {'mmap_dir': MMAP_DIR, 'lazy': True},
+}
+
+def run_mode(kwargs: dict) -> dict:
+    """Median startup and first-predict time for one loading mode across RUNS cold starts."""
+    samples = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', _PROBE, json.dumps(kwargs), json.dumps(SAMPLE_LOGS)],
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    median = lambda key: sorted(s[key] for s in samples)[len(samples) // 2]
+    return {'startup_ms': median('startup_ms'), 'first_predict_ms': median('first_predict_ms')}
+
+if __name__ == '__main__':
+    # Export first with: python model_store.py
+    print(f"--- AnomalyDetector cold start (median of {RUNS} runs) ---")
+    for name, kwargs in MODES.items():
+        result = run_mode(kwargs)
+        print(f"{name:28s} startup {result['startup_ms']:8.1f} ms   first predict {result['first_predict_ms']:8.1f} ms")
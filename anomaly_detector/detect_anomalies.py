@@ -1,12 +1,68 @@
-import pandas as pd
+import os
+import sys
+import time
+import queue
+import threading
+from collections import OrderedDict
 import joblib
+from log_templates import TemplateMiner
+
+# --- Streaming Settings ---
+STREAM_BATCH_SIZE = 2000       # Max lines scored per vectorize+predict call
+STREAM_MAX_LATENCY = 0.5       # Max seconds a line may wait before its batch is flushed
+STREAM_POLL_INTERVAL = 0.1     # How often idle sources are re-checked for new lines
+STREAM_QUEUE_SIZE = 50000      # Bounded read-ahead so memory stays flat under bursts
+
+# --- Template Cache Settings ---
+TEMPLATE_CACHE_SIZE = 100000   # Max templates whose (score, label) is remembered
+
+# --- Artifact Loading Settings ---
+ARTIFACT_VERSION_ATTR = 'artifact_version_'  # Stamped on every artifact of one training run (see train_model.py)
+ARTIFACT_LOAD_ATTEMPTS = 5     # Loads retried while a retrain is still swapping artifacts in
+ARTIFACT_RETRY_DELAY = 0.5     # Seconds between those attempts
+
+_END_OF_SOURCE = object()  # Put on the queue by a reader that has stopped (stdin EOF or an error)
+
+def artifacts_match(*artifacts) -> bool:
+    """True if the given artifacts (None for a missing one) were written by the same training run."""
+    return len({getattr(a, ARTIFACT_VERSION_ATTR, None) for a in artifacts if a is not None}) <= 1
 
 class AnomalyDetector:
-    def __init__(self, model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib'):
-        """Loads the pre-trained model and vectorizer."""
+    def __init__(self, model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib',
+                 template_miner_path: str = 'log_templates.joblib', mmap_dir: str = None, lazy: bool = False):
+        """
+        Loads the pre-trained model and vectorizer.
+        mmap_dir points at artifacts written by model_store.export_mmap_artifacts, which are
+        memory-mapped instead of unpickled. With lazy=True nothing is loaded until the first score.
+        """
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        self.template_miner_path = template_miner_path
+        self.mmap_dir = mmap_dir
+        self.model = self.vectorizer = self.template_miner = None
+        self.template_cache = OrderedDict()  # template -> (score, label), LRU order
+        if not lazy:
+            self._load()
+
+    def _load(self):
         print("Loading anomaly detection model and vectorizer...")
-        self.model = joblib.load(model_path)
-        self.vectorizer = joblib.load(vectorizer_path)
+        if self.mmap_dir:
+            from model_store import load_mmap_artifacts
+            self.model, self.vectorizer, self.template_miner = load_mmap_artifacts(self.mmap_dir)
+        else:
+            for _ in range(ARTIFACT_LOAD_ATTEMPTS):
+                self.model = joblib.load(self.model_path)
+                self.vectorizer = joblib.load(self.vectorizer_path)
+                # Models trained before template mining existed have no miner and score raw messages
+                if os.path.exists(self.template_miner_path):
+                    self.template_miner = joblib.load(self.template_miner_path)
+                # A retrain renames its artifacts in one at a time; never pair a model with another run's features
+                if artifacts_match(self.model, self.vectorizer, self.template_miner):
+                    break
+                time.sleep(ARTIFACT_RETRY_DELAY)
+            else:
+                raise RuntimeError(f"{self.model_path}, {self.vectorizer_path} and {self.template_miner_path} "
+                                   "come from different training runs; retrain the model.")
         print("Ready to detect anomalies.")
 
     def predict(self, log_messages: list[str]) -> list[int]:
@@ -14,13 +70,173 @@ class AnomalyDetector:
         Predicts if a list of new log messages are anomalies.
         Returns a list where -1 is an anomaly and 1 is normal.
         """
-        X_new = self.vectorizer.transform(log_messages)
-        predictions = self.model.predict(X_new)
-        return predictions
+        scores, labels = self.score(log_messages)
+        return labels
+
+    def _score_texts(self, texts: list[str]) -> tuple[list[float], list[int]]:
+        X_new = self.vectorizer.transform(texts)
+        scores = self.model.decision_function(X_new)
+        # IsolationForest.predict is exactly this threshold on decision_function,
+        # so deriving labels here avoids scoring the batch twice.
+        labels = [-1 if s < 0 else 1 for s in scores]
+        return scores.tolist(), labels
+
+    def template(self, message: str) -> str:
+        """
+        The trained template a message belongs to, or its masked form if it matches none.
+        Read-only: scoring never grows or generalizes the trained miner.
+        """
+        cluster = self.template_miner.match(message) if self.template_miner is not None else None
+        return cluster.template if cluster is not None else ' '.join(TemplateMiner.mask(message).split())
+
+    def score(self, log_messages: list[str]) -> tuple[list[float], list[int]]:
+        """
+        Scores a batch of log messages with a single vectorize+predict pass.
+        Returns (scores, labels): scores are the model's decision_function values
+        (negative means anomalous) and labels use the same -1/1 convention as predict().
+        With a template miner, only templates not already in the cache are scored.
+        """
+        if self.model is None:
+            self._load()
+        if self.template_miner is None:
+            return self._score_texts(log_messages)
+
+        templates = [self.template(message) for message in log_messages]
+        cache = self.template_cache
+        missing = list({t: None for t in templates if t not in cache})
+        if missing:
+            for template, result in zip(missing, zip(*self._score_texts(missing))):
+                cache[template] = result
+
+        scores, labels = [], []
+        for template in templates:
+            score, label = cache[template]
+            cache.move_to_end(template)
+            scores.append(score)
+            labels.append(label)
+        while len(cache) > TEMPLATE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return scores, labels
+
+    def score_stream(self, lines, batch_size: int = STREAM_BATCH_SIZE, max_latency: float = STREAM_MAX_LATENCY):
+        """
+        Scores an iterable of log lines in micro-batches and yields (line, score, label).
+        The source may yield None as an idle heartbeat (see follow_logs) so partially
+        filled batches are still flushed within max_latency.
+        """
+        for batch in micro_batches(lines, batch_size, max_latency):
+            scores, labels = self.score(batch)
+            yield from zip(batch, scores, labels)
+
+
+def _read_source(path: str, out: queue.Queue, poll_interval: float, from_start: bool):
+    """Reader thread: pushes lines from a file (tail -f style) or stdin ('-') into the queue."""
+    try:
+        if path == '-':
+            for line in sys.stdin:
+                out.put(line.rstrip('\n'))
+        else:
+            _follow_file(path, out, poll_interval, from_start)
+    except Exception as e:
+        out.put(e)  # Re-raised by follow_logs instead of the source silently going quiet
+    finally:
+        out.put(_END_OF_SOURCE)
+
+
+def _replaced(f, path: str) -> bool:
+    """True if path was truncated below our position or now names a different file (rotated)."""
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False  # Rotated away and not recreated yet; keep the old handle until it is
+    return current.st_ino != os.fstat(f.fileno()).st_ino or current.st_size < f.tell()
+
+
+def _follow_file(path: str, out: queue.Queue, poll_interval: float, from_start: bool):
+    f = open(path, 'r', errors='replace')
+    try:
+        if not from_start:
+            f.seek(0, 2)  # Start at the end of the file, like tail -f
+        partial = ''
+        while True:
+            line = f.readline()
+            if not line:
+                if _replaced(f, path):
+                    # The old file is drained; follow the new one from its start, like tail -F
+                    if partial:
+                        out.put(partial)
+                        partial = ''
+                    f.close()
+                    f = open(path, 'r', errors='replace')
+                    continue
+                time.sleep(poll_interval)
+                continue
+            if not line.endswith('\n'):
+                # Writer is mid-line; keep the fragment until the rest arrives
+                partial += line
+                continue
+            out.put((partial + line).rstrip('\n'))
+            partial = ''
+    finally:
+        f.close()
+
+
+def follow_logs(paths: list[str], poll_interval: float = STREAM_POLL_INTERVAL,
+                from_start: bool = False, queue_size: int = STREAM_QUEUE_SIZE):
+    """
+    Follows one or more log files (or stdin via '-') and yields new lines as they arrive.
+    Yields None whenever no line arrived within poll_interval so downstream batching
+    can flush on time. The bounded queue applies backpressure to the readers.
+    Stops once every source has ended (only stdin ever does; files are followed forever,
+    across truncation and rotation). An error in a reader is re-raised here.
+    """
+    lines = queue.Queue(maxsize=queue_size)
+    for path in paths:
+        reader = threading.Thread(target=_read_source, args=(path, lines, poll_interval, from_start), daemon=True)
+        reader.start()
+
+    live_sources = len(paths)
+    while live_sources:
+        try:
+            line = lines.get(timeout=poll_interval)
+        except queue.Empty:
+            yield None
+            continue
+        if line is _END_OF_SOURCE:
+            live_sources -= 1
+            continue
+        if isinstance(line, Exception):
+            raise line
+        yield line
+
+
+def micro_batches(lines, batch_size: int = STREAM_BATCH_SIZE, max_latency: float = STREAM_MAX_LATENCY):
+    """Groups lines into lists capped by batch_size or by how long the oldest line has waited."""
+    batch = []
+    batch_started = 0.0
+    for line in lines:
+        if line is not None:
+            if not batch:
+                batch_started = time.monotonic()
+            batch.append(line)
+        if batch and (len(batch) >= batch_size or time.monotonic() - batch_started >= max_latency):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 if __name__ == '__main__':
     detector = AnomalyDetector()
-    
+
+    if len(sys.argv) > 1:
+        # Streaming mode: python detect_anomalies.py app.log other.log  (use '-' for stdin)
+        print(f"Following {', '.join(sys.argv[1:])} ...")
+        for line, score, label in detector.score_stream(follow_logs(sys.argv[1:])):
+            if label == -1:
+                print(f"[Anomaly {score:.3f}] {line}")
+        sys.exit(0)
+
     # Example of processing a new batch of logs
     new_logs = [
         "INFO: User 'testuser' logged in successfully.",
@@ -29,9 +245,9 @@ if __name__ == '__main__':
         "WARN: High memory usage detected: 95%",
         "FATAL: NullPointerException at com.example.UserService:123" # This should be an anomaly
     ]
-    
+
     results = detector.predict(new_logs)
-    
+
     print("\n--- Anomaly Detection Results ---")
     for log, result in zip(new_logs, results):
         status = "Anomaly" if result == -1 else "Normal"
@@ -0,0 +1,110 @@
+import re
+
+# --- Template Mining Settings ---
+TREE_DEPTH = 4              # Root + length layer + (TREE_DEPTH - 2) leading-token layers
+SIMILARITY_THRESHOLD = 0.4  # Min share of matching tokens for a message to join a template
+MAX_CHILDREN = 100          # Max distinct tokens per tree node before falling back to the wildcard
+WILDCARD = '<*>'
+
+# Variable parts of a message, masked before clustering so they never reach the vectorizer
+MASK_PATTERNS = [
+    re.compile(r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'),  # timestamps
+    re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'),  # UUIDs
+    re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'),  # IPv4 (+ port)
+    re.compile(r'\b0x[0-9a-fA-F]+\b'),  # hex literals
+    re.compile(r'\b[0-9a-fA-F]{16,}\b'),  # long hex ids / hashes
+    re.compile(r'(?<![A-Za-z_])[-+]?\d+(?:\.\d+)?'),  # numbers not glued to an identifier
+]
+_HAS_DIGIT = re.compile(r'\d')
+
+
+class LogCluster:
+    """A group of log messages that share one template."""
+
+    def __init__(self, cluster_id: int, tokens: list[str]):
+        self.cluster_id = cluster_id
+        self.tokens = tokens
+        self.size = 1
+
+    @property
+    def template(self) -> str:
+        return ' '.join(self.tokens)
+
+
+class TemplateMiner:
+    """
+    Online Drain-style log parser. Messages are masked, routed through a fixed-depth
+    prefix tree (token count, then leading tokens) and matched against the few
+    clusters in the leaf, so each message costs O(tree depth + leaf size).
+    """
+
+    def __init__(self, depth: int = TREE_DEPTH, similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 max_children: int = MAX_CHILDREN):
+        self.depth = depth
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.root = {}
+        self.clusters = []
+
+    @staticmethod
+    def mask(message: str) -> str:
+        for pattern in MASK_PATTERNS:
+            message = pattern.sub(WILDCARD, message)
+        return message
+
+    def _leaf(self, tokens: list[str], create: bool):
+        """Walks (and optionally grows) the prefix tree; returns the leaf's cluster list or None."""
+        node = self.root.get(len(tokens))
+        if node is None:
+            if not create:
+                return None
+            node = self.root[len(tokens)] = {}
+
+        for token in tokens[:self.depth - 2]:
+            # Tokens that still carry digits after masking are treated as variables
+            key = WILDCARD if _HAS_DIGIT.search(token) else token
+            child = node.get(key)
+            if child is None:
+                child = node.get(WILDCARD)
+            if child is None:
+                if not create:
+                    return None
+                key = key if len(node) < self.max_children else WILDCARD
+                child = node.setdefault(key, {})
+            node = child
+
+        leaf = node.get(None)
+        if leaf is None and create:
+            leaf = node[None] = []
+        return leaf
+
+    def _best_match(self, leaf: list, tokens: list[str]):
+        best, best_sim = None, -1.0
+        for cluster in leaf:
+            same = sum(1 for a, b in zip(cluster.tokens, tokens) if a == b and a != WILDCARD)
+            sim = same / len(tokens) if tokens else 1.0
+            if sim > best_sim:
+                best, best_sim = cluster, sim
+        return best if best_sim >= self.similarity_threshold else None
+
+    def add_log_message(self, message: str) -> LogCluster:
+        """Assigns a message to a template, creating or generalizing templates as needed."""
+        tokens = self.mask(message).split()
+        leaf = self._leaf(tokens, create=True)
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            cluster = LogCluster(len(self.clusters), tokens)
+            self.clusters.append(cluster)
+            leaf.append(cluster)
+            return cluster
+
+        cluster.size += 1
+        if any(a != b for a, b in zip(cluster.tokens, tokens)):
+            cluster.tokens = [a if a == b else WILDCARD for a, b in zip(cluster.tokens, tokens)]
+        return cluster
+
+    def match(self, message: str) -> LogCluster | None:
+        """Finds the template for a message without changing the miner's state."""
+        tokens = self.mask(message).split()
+        leaf = self._leaf(tokens, create=False)
+        return self._best_match(leaf, tokens) if leaf else None
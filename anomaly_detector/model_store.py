@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import shutil
+import numpy as np
+import joblib
+from detect_anomalies import artifacts_match
+
+# --- Memory-Mapped Artifact Settings ---
+MMAP_DIR = 'model_mmap'   # Directory holding the flattened forest and uncompressed vectorizer
+SCORE_CHUNK_ROWS = 1024   # Rows densified at a time while walking the trees
+
+_FOREST_ARRAYS = ['left', 'right', 'feature', 'threshold', 'leaf_path', 'roots', 'used_features']
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Expected path length of an unsuccessful BST search over n samples (the c(n) of Isolation Forest)."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+
+def export_mmap_artifacts(model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib',
+                          template_miner_path: str = 'log_templates.joblib', out_dir: str = MMAP_DIR):
+    """
+    Converts the joblib artifacts into a memory-mappable layout:
+    every tree of the forest is flattened into shared .npy node arrays and the
+    vectorizer is re-saved uncompressed so joblib can memory-map its arrays.
+    """
+    model = joblib.load(model_path)
+    vectorizer = joblib.load(vectorizer_path)
+    miner = joblib.load(template_miner_path) if os.path.exists(template_miner_path) else None
+    if not artifacts_match(model, vectorizer, miner):
+        raise RuntimeError("Model artifacts come from different training runs (a retrain may be in progress); export again.")
+    left, right, feature, threshold, leaf_path, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree_features, estimator in zip(model.estimators_features_, model.estimators_):
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count)
+
+        # Node depths (root = 0); children always come after their parent in sklearn trees
+        depth = np.zeros(tree.node_count, dtype=np.int64)
+        for node in node_ids[~is_leaf]:
+            depth[tree.children_left[node]] = depth[tree.children_right[node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+        # Leaves point at themselves so a fixed number of steps lands every row on its leaf
+        left.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        feature.append(np.where(is_leaf, 0, np.asarray(tree_features)[np.maximum(tree.feature, 0)]))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        leaf_path.append(depth + _average_path_length(tree.n_node_samples))
+        roots.append(offset)
+        offset += tree.node_count
+
+    feature = np.concatenate(feature)
+    used_features = np.unique(feature)
+    arrays = {
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        # Remap to columns of the dense slice of only the features the forest actually splits on
+        'feature': np.searchsorted(used_features, feature).astype(np.int32),
+        'threshold': np.concatenate(threshold),
+        'leaf_path': np.concatenate(leaf_path),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'used_features': used_features.astype(np.int64),
+    }
+
+    # Build next to the destination and rename in, so loaders never see a half-written directory
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_dir, 'forest.json'), 'w') as f:
+        json.dump({
+            'n_trees': len(roots),
+            'max_depth': max_depth,
+            'denominator': float(_average_path_length([model.max_samples_])[0]),
+            'offset': float(model.offset_),
+        }, f)
+    joblib.dump(vectorizer, os.path.join(tmp_dir, 'vectorizer.joblib'), compress=0)
+    if miner is not None:
+        joblib.dump(miner, os.path.join(tmp_dir, 'log_templates.joblib'))
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    print(f"Exported {len(roots)} trees ({offset} nodes) to {out_dir}")
+
+
+class MmapIsolationForest:
+    """
+    Scores with a forest exported by export_mmap_artifacts. The node arrays are
+    memory-mapped read-only, so processes on one host share the same pages and
+    loading costs a few file opens instead of unpickling every tree.
+    """
+
+    def __init__(self, artifact_dir: str = MMAP_DIR):
+        for name in _FOREST_ARRAYS:
+            setattr(self, name, np.load(os.path.join(artifact_dir, f"{name}.npy"), mmap_mode='r'))
+        with open(os.path.join(artifact_dir, 'forest.json')) as f:
+            meta = json.load(f)
+        self.max_depth = meta['max_depth']
+        self.denominator = meta['denominator']
+        self.offset_ = meta['offset']
+
+    def score_samples(self, X) -> np.ndarray:
+        """Same values as IsolationForest.score_samples (lower is more abnormal)."""
+        n_rows = X.shape[0]
+        mean_path = np.empty(n_rows)
+        for start in range(0, n_rows, SCORE_CHUNK_ROWS):
+            # sklearn compares float32 feature values against float64 thresholds
+            X_chunk = X[start:start + SCORE_CHUNK_ROWS][:, self.used_features]
+            X_chunk = np.asarray(X_chunk.todense() if hasattr(X_chunk, 'todense') else X_chunk, dtype=np.float32)
+            rows = np.arange(X_chunk.shape[0])[:, None]
+            nodes = np.broadcast_to(self.roots, (X_chunk.shape[0], len(self.roots)))
+            for _ in range(self.max_depth):
+                go_left = X_chunk[rows, self.feature[nodes]] <= self.threshold[nodes]
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            mean_path[start:start + X_chunk.shape[0]] = self.leaf_path[nodes].mean(axis=1)
+        return -(2.0 ** (-mean_path / self.denominator))
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X) -> np.ndarray:
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+def load_mmap_artifacts(artifact_dir: str = MMAP_DIR):
+    """Returns (model, vectorizer, template_miner or None) from an exported directory."""
+    model = MmapIsolationForest(artifact_dir)
+    vectorizer = joblib.load(os.path.join(artifact_dir, 'vectorizer.joblib'), mmap_mode='r')
+    miner_path = os.path.join(artifact_dir, 'log_templates.joblib')
+    miner = joblib.load(miner_path) if os.path.exists(miner_path) else None
+    return model, vectorizer, miner
+
+
+if __name__ == '__main__':
+    export_mmap_artifacts(out_dir=sys.argv[1] if len(sys.argv) > 1 else MMAP_DIR)
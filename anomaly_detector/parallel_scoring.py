@@ -0,0 +1,123 @@
+import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from detect_anomalies import AnomalyDetector
+
+# --- Parallel Scoring Settings ---
+SHARD_SIZE = 20000                  # Lines per task sent to a worker
+MAX_PENDING_SHARDS_PER_WORKER = 2   # Bounds read-ahead so memory does not grow with input size
+
+# Each worker process loads the model once in its initializer and keeps it here,
+# so tasks only ship lines in and scores out instead of re-unpickling the model.
+_worker_detector = None
+
+def _init_worker(model_path: str, vectorizer_path: str, template_miner_path: str, mmap_dir: str):
+    global _worker_detector
+    _worker_detector = AnomalyDetector(model_path, vectorizer_path, template_miner_path, mmap_dir=mmap_dir)
+
+def _score_shard(lines: list[str]) -> tuple[list[float], list[int], int, float]:
+    """Scores one shard inside a worker. Returns (scores, labels, worker pid, seconds spent)."""
+    started = time.perf_counter()
+    scores, labels = _worker_detector.score(lines)
+    return scores, labels, os.getpid(), time.perf_counter() - started
+
+
+def iter_csv_shards(csv_path: str, shard_size: int = SHARD_SIZE, column: str = 'log_message'):
+    """Reads the log_message column of a CSV in fixed-size chunks."""
+    for chunk in pd.read_csv(csv_path, usecols=[column], chunksize=shard_size):
+        yield chunk[column].astype(str).tolist()
+
+def iter_directory_shards(directory: str, shard_size: int = SHARD_SIZE):
+    """Reads every file in a directory (sorted, recursively) line by line in fixed-size chunks."""
+    shard = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            with open(os.path.join(root, file), 'r', errors='replace') as f:
+                for line in f:
+                    shard.append(line.rstrip('\n'))
+                    if len(shard) >= shard_size:
+                        yield shard
+                        shard = []
+    if shard:
+        yield shard
+
+
+class ParallelScorer:
+    """Shards large inputs across a process pool and merges results back in input order."""
+
+    def __init__(self, model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib',
+                 workers: int = None, template_miner_path: str = 'log_templates.joblib', mmap_dir: str = None):
+        # Same artifacts as AnomalyDetector; with mmap_dir every worker maps one shared copy of the model
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        self.template_miner_path = template_miner_path
+        self.mmap_dir = mmap_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_stats = {}  # pid -> {'lines': n, 'seconds': busy time}
+
+    def score_shards(self, shards):
+        """
+        Yields (line, score, label) for every line of every shard, in input order.
+        Only a bounded number of shards is in flight at once.
+        """
+        max_pending = self.workers * MAX_PENDING_SHARDS_PER_WORKER
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.model_path, self.vectorizer_path,
+                                           self.template_miner_path, self.mmap_dir)) as pool:
+            for shard in shards:
+                pending.append((shard, pool.submit(_score_shard, shard)))
+                if len(pending) >= max_pending:
+                    yield from self._collect(*pending.popleft())
+            while pending:
+                yield from self._collect(*pending.popleft())
+
+    def _collect(self, shard: list[str], future):
+        scores, labels, pid, seconds = future.result()
+        stats = self.worker_stats.setdefault(pid, {'lines': 0, 'seconds': 0.0})
+        stats['lines'] += len(shard)
+        stats['seconds'] += seconds
+        return zip(shard, scores, labels)
+
+    def throughput_report(self) -> dict:
+        """Lines/s per worker, based on time spent scoring inside each worker."""
+        report = {}
+        for pid, stats in sorted(self.worker_stats.items()):
+            rate = stats['lines'] / stats['seconds'] if stats['seconds'] else 0.0
+            report[pid] = {'lines': stats['lines'], 'busy_seconds': round(stats['seconds'], 3),
+                           'lines_per_second': round(rate, 1)}
+        return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scores a large CSV or log directory across a process pool.")
+    parser.add_argument('source', help="CSV with a log_message column, or a directory of log files")
+    parser.add_argument('workers', type=int, nargs='?', help="Worker processes (default: CPU count)")
+    parser.add_argument('--model', default='isolation_forest.joblib')
+    parser.add_argument('--vectorizer', default='tfidf_vectorizer.joblib')
+    parser.add_argument('--template-miner', default='log_templates.joblib')
+    parser.add_argument('--mmap-dir', help="Memory-mapped model artifacts (see model_store.py)")
+    args = parser.parse_args()
+
+    scorer = ParallelScorer(args.model, args.vectorizer, args.workers,
+                            template_miner_path=args.template_miner, mmap_dir=args.mmap_dir)
+    shards = iter_directory_shards(args.source) if os.path.isdir(args.source) else iter_csv_shards(args.source)
+
+    started = time.perf_counter()
+    total = anomalies = 0
+    for line, score, label in scorer.score_shards(shards):
+        total += 1
+        if label == -1:
+            anomalies += 1
+            print(f"[Anomaly {score:.3f}] {line}")
+    elapsed = time.perf_counter() - started
+
+    print("\n--- Throughput Report ---")
+    for pid, stats in scorer.throughput_report().items():
+        print(f"Worker {pid}: {stats['lines']} lines, {stats['lines_per_second']} lines/s")
+    print(f"Total: {total} lines ({anomalies} anomalies) in {elapsed:.2f}s "
+          f"= {total / elapsed if elapsed else 0:.1f} lines/s with {scorer.workers} workers")
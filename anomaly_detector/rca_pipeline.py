@@ -0,0 +1,398 @@
+import re
+import json
+import time
+import heapq
+import sqlite3
+import argparse
+import threading
+import requests
+from detect_anomalies import AnomalyDetector, follow_logs
+
+# Long-running bridge from anomaly detection to root cause analysis:
+#   scored log stream -> per-template time windows -> bounded priority queue
+#   -> token-bucket rate limit -> rca_agent's POST /analyze -> SQLite results (served to the UI by rca_agent)
+# Each template is analyzed once per REANALYZE_AFTER_SECONDS; later windows only add to its occurrence count.
+
+# --- Anomaly Grouping Settings ---
+WINDOW_SECONDS = 60              # A group collects one template's anomalies for this long before it is dispatched
+MAX_OPEN_GROUPS = 5000           # Open windows kept at once; beyond this the oldest is closed early
+MAX_SAMPLES = 5                  # Example lines kept per group and sent as the error log
+REANALYZE_AFTER_SECONDS = 3600   # A template analyzed (or queued) this recently is not analyzed again
+
+# --- RCA Dispatch Settings ---
+RCA_API_URL = 'http://localhost:8000/analyze'
+RCA_RATE_PER_MINUTE = 30         # Sustained RCA requests per minute (token bucket refill)
+RCA_BURST = 5                    # Requests allowed back to back after a quiet period
+RCA_WORKERS = 2                  # RCA requests in flight at once
+MAX_PENDING_GROUPS = 500         # Queue bound; the lowest-priority group is dropped beyond it
+RCA_TIMEOUT_SECONDS = 120
+RCA_MAX_ATTEMPTS = 3             # Tries per group on connection errors and 429/5xx, with backoff
+METRICS_INTERVAL = 30            # Seconds between metric printouts
+
+# --- Result Store Settings ---
+RESULTS_DB_PATH = 'anomaly_rca.sqlite3'
+
+SEVERITY_WEIGHTS = {'FATAL': 8.0, 'CRITICAL': 8.0, 'SEVERE': 4.0, 'ERROR': 4.0, 'WARN': 2.0, 'WARNING': 2.0}
+_LEVEL = re.compile(r'\b(FATAL|CRITICAL|SEVERE|ERROR|WARN(?:ING)?)\b')
+
+
+class AnomalyGroup:
+    """Anomalies sharing one template within one time window."""
+    __slots__ = ('template', 'first_seen', 'last_seen', 'count', 'min_score', 'severity', 'samples', 'row_id')
+
+    def __init__(self, template: str, now: float):
+        self.template = template
+        self.first_seen = self.last_seen = now
+        self.count = 0
+        self.min_score = 0.0
+        self.severity = 'INFO'
+        self.samples = []
+        self.row_id = None
+
+    def add(self, line: str, score: float, now: float):
+        self.count += 1
+        self.last_seen = now
+        self.min_score = min(self.min_score, score)
+        level = _LEVEL.search(line)
+        if level and SEVERITY_WEIGHTS[level.group(1)] > SEVERITY_WEIGHTS.get(self.severity, 1.0):
+            self.severity = level.group(1)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(line)
+
+    @property
+    def priority(self) -> float:
+        """Frequency times severity, boosted by how far below the decision boundary the worst line scored."""
+        return self.count * SEVERITY_WEIGHTS.get(self.severity, 1.0) * (1.0 - self.min_score)
+
+
+class AnomalyGrouper:
+    """Tumbling per-template windows; thread-safe so the stream and the window timer can share it."""
+
+    def __init__(self, window_seconds: float = WINDOW_SECONDS, max_open: int = MAX_OPEN_GROUPS):
+        self.window_seconds = window_seconds
+        self.max_open = max_open
+        self.open = {}  # template -> AnomalyGroup, oldest first
+        self.lock = threading.Lock()
+
+    def add(self, template: str, line: str, score: float) -> list[AnomalyGroup]:
+        """Adds one anomaly; returns groups closed early to stay within max_open."""
+        now = time.time()
+        closed = []
+        with self.lock:
+            group = self.open.get(template)
+            if group is None:
+                while len(self.open) >= self.max_open:
+                    closed.append(self.open.pop(next(iter(self.open))))
+                group = self.open[template] = AnomalyGroup(template, now)
+            group.add(line, score, now)
+        return closed
+
+    def close_expired(self, now: float = None) -> list[AnomalyGroup]:
+        now = time.time() if now is None else now
+        with self.lock:
+            expired = [t for t, g in self.open.items() if now - g.first_seen >= self.window_seconds]
+            return [self.open.pop(t) for t in expired]
+
+    def close_all(self) -> list[AnomalyGroup]:
+        with self.lock:
+            groups, self.open = list(self.open.values()), {}
+        return groups
+
+
+class TokenBucket:
+    """Allows rate_per_second requests on average and up to burst back to back."""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, stopping: threading.Event) -> bool:
+        """Blocks until a token is available; returns False if stopping was set first."""
+        while not stopping.is_set():
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait = (1.0 - self.tokens) / self.rate
+            stopping.wait(min(wait, 1.0))
+        return False
+
+
+class PriorityDispatchQueue:
+    """Bounded max-priority queue of groups awaiting RCA. Returns whatever it had to drop when full."""
+
+    def __init__(self, max_size: int = MAX_PENDING_GROUPS):
+        self.max_size = max_size
+        self.heap = []  # (-priority, sequence, group)
+        self.sequence = 0
+        self.unfinished = 0  # Pushed and not yet dropped or marked done, like queue.Queue's task count
+        self.ready = threading.Condition()
+
+    def push(self, group: AnomalyGroup) -> AnomalyGroup:
+        with self.ready:
+            self.sequence += 1
+            heapq.heappush(self.heap, (-group.priority, self.sequence, group))
+            self.unfinished += 1
+            dropped = None
+            if len(self.heap) > self.max_size:
+                lowest = max(range(len(self.heap)), key=lambda i: self.heap[i][:2])
+                dropped = self.heap[lowest][2]
+                self.heap[lowest] = self.heap[-1]
+                self.heap.pop()
+                heapq.heapify(self.heap)
+                self.unfinished -= 1
+            self.ready.notify()
+            return dropped
+
+    def pop(self, timeout: float) -> AnomalyGroup:
+        with self.ready:
+            if not self.heap:
+                self.ready.wait(timeout)
+            return heapq.heappop(self.heap)[2] if self.heap else None
+
+    def task_done(self):
+        with self.ready:
+            self.unfinished -= 1
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class ResultStore:
+    """
+    One row per dispatched anomaly group: its template, window, counts, samples, status
+    (queued, analyzing, analyzed, failed, dropped) and the RCA result. Shared with rca_agent's /anomalies.
+    """
+
+    def __init__(self, path: str = RESULTS_DB_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS anomaly_groups (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, template TEXT NOT NULL, severity TEXT NOT NULL,
+                first_seen REAL NOT NULL, last_seen REAL NOT NULL, occurrences INTEGER NOT NULL,
+                min_score REAL NOT NULL, priority REAL NOT NULL, samples TEXT NOT NULL,
+                status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+                analysis TEXT, context_provided TEXT, error TEXT, analyzed_at REAL)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS anomaly_groups_template ON anomaly_groups (template, last_seen)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS anomaly_groups_status ON anomaly_groups (status)")
+
+    def insert(self, group: AnomalyGroup, status: str) -> int:
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO anomaly_groups (template, severity, first_seen, last_seen, occurrences, min_score,"
+                " priority, samples, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (group.template, group.severity, group.first_seen, group.last_seen, group.count,
+                 group.min_score, group.priority, json.dumps(group.samples), status))
+            return cursor.lastrowid
+
+    def add_occurrences(self, row_id: int, group: AnomalyGroup):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE anomaly_groups SET occurrences = occurrences + ?, last_seen = MAX(last_seen, ?),"
+                              " min_score = MIN(min_score, ?) WHERE id = ?",
+                              (group.count, group.last_seen, group.min_score, row_id))
+
+    def set_status(self, row_id: int, status: str, **fields):
+        assignments = ''.join(f", {name} = ?" for name in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE anomaly_groups SET status = ?{assignments} WHERE id = ?",
+                              (status, *fields.values(), row_id))
+
+    def recent_templates(self, since: float) -> dict:
+        """template -> (latest row id, its first_seen), for templates dispatched since the given time (restores dedup after a restart)."""
+        with self.lock:
+            # SQLite takes the bare id column from the row holding MAX(first_seen)
+            rows = self.conn.execute("SELECT template, id, MAX(first_seen) FROM anomaly_groups WHERE first_seen >= ?"
+                                     " AND status NOT IN ('dropped', 'failed') GROUP BY template", (since,)).fetchall()
+        return {template: (row_id, first_seen) for template, row_id, first_seen in rows}
+
+    def unfinished(self, limit: int) -> list[AnomalyGroup]:
+        """Groups left queued or mid-analysis by a previous run, highest priority first."""
+        with self.lock:
+            rows = self.conn.execute("SELECT id, template, severity, first_seen, last_seen, occurrences, min_score, samples"
+                                     " FROM anomaly_groups WHERE status IN ('queued', 'analyzing')"
+                                     " ORDER BY priority DESC LIMIT ?", (limit,)).fetchall()
+        groups = []
+        for row_id, template, severity, first_seen, last_seen, occurrences, min_score, samples in rows:
+            group = AnomalyGroup(template, first_seen)
+            group.last_seen, group.count, group.min_score, group.severity = last_seen, occurrences, min_score, severity
+            group.samples, group.row_id = json.loads(samples), row_id
+            groups.append(group)
+        return groups
+
+
+class AnomalyRCAPipeline:
+    """
+    Consumes (line, score, label) from AnomalyDetector.score_stream and triggers one RCA per new
+    anomaly group. Work stays bounded under floods: open windows, the pending queue and in-flight
+    requests are all capped, and the token bucket limits calls reaching the LLM gateway.
+    """
+
+    def __init__(self, detector: AnomalyDetector, store: ResultStore, rca_url: str = RCA_API_URL,
+                 window_seconds: float = WINDOW_SECONDS, rate_per_minute: float = RCA_RATE_PER_MINUTE,
+                 burst: int = RCA_BURST, workers: int = RCA_WORKERS, max_pending: int = MAX_PENDING_GROUPS):
+        self.detector = detector
+        self.store = store
+        self.rca_url = rca_url
+        self.grouper = AnomalyGrouper(window_seconds)
+        self.queue = PriorityDispatchQueue(max_pending)
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.http = requests.Session()
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()  # Guards dispatched and metrics, shared by the stream, window and worker threads
+        self.metrics = {'lines': 0, 'anomalies': 0, 'groups': 0, 'recurring': 0, 'dropped': 0,
+                        'analyzed': 0, 'failed': 0}
+        # template -> (row id, dispatched at); a template here is not dispatched again until REANALYZE_AFTER_SECONDS
+        self.dispatched = store.recent_templates(time.time() - REANALYZE_AFTER_SECONDS)
+        for group in store.unfinished(max_pending):
+            self.queue.push(group)
+        self.threads = [threading.Thread(target=self._window_loop, name="rca-windows", daemon=True)]
+        self.threads += [threading.Thread(target=self._worker_loop, name=f"rca-worker-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def _dispatch(self, groups: list[AnomalyGroup]):
+        """Queues groups for templates not analyzed recently; recurrences are only counted."""
+        if not groups:
+            return
+        now = time.time()
+        with self.lock:
+            for group in groups:
+                known = self.dispatched.get(group.template)
+                if known and now - known[1] < REANALYZE_AFTER_SECONDS:
+                    self.store.add_occurrences(known[0], group)
+                    self.metrics['recurring'] += 1
+                    continue
+                group.row_id = self.store.insert(group, 'queued')
+                self.dispatched[group.template] = (group.row_id, now)
+                self.metrics['groups'] += 1
+                dropped = self.queue.push(group)
+                if dropped is not None:
+                    self.store.set_status(dropped.row_id, 'dropped')
+                    self.dispatched.pop(dropped.template, None)  # Eligible again if it recurs
+                    self.metrics['dropped'] += 1
+
+    def _window_loop(self):
+        last_report = time.monotonic()
+        while not self.stopping.wait(1.0):
+            self._dispatch(self.grouper.close_expired())
+            if time.monotonic() - last_report >= METRICS_INTERVAL:
+                last_report = time.monotonic()
+                expired = time.time() - REANALYZE_AFTER_SECONDS
+                with self.lock:
+                    self.dispatched = {t: v for t, v in self.dispatched.items() if v[1] >= expired}
+                print(f"[rca-pipeline] {self.metrics} pending={len(self.queue)} "
+                      f"in_flight={self.queue.unfinished - len(self.queue)}")
+
+    def _analyze(self, group: AnomalyGroup) -> tuple[str, dict]:
+        """
+        POSTs the group's sample lines to the RCA API; returns (status, fields to store).
+        Connection errors, 429/5xx and gateway failures reported by the API are retried; other 4xx are not.
+        """
+        error = None
+        for attempt in range(1, RCA_MAX_ATTEMPTS + 1):
+            if attempt > 1 and (self.stopping.wait(2 ** attempt) or not self.bucket.acquire(self.stopping)):
+                break  # Shutting down; a restart picks the group up again
+            try:
+                response = self.http.post(self.rca_url, json={'error_log': "\n".join(group.samples)},
+                                          timeout=RCA_TIMEOUT_SECONDS)
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                error = f"RCA API returned HTTP {response.status_code}"
+                continue
+            if response.status_code >= 400:
+                # The request itself is rejected (e.g. 400/413); retrying cannot help
+                return 'failed', {'attempts': attempt, 'error': f"RCA API returned HTTP {response.status_code}: {response.text[:500]}"}
+            result = response.json()
+            if result.get('cache') == 'error' or not result.get('analysis'):
+                error = result.get('analysis') or "RCA API returned no analysis"  # The LLM gateway failed
+                continue
+            return 'analyzed', {'attempts': attempt, 'analysis': result['analysis'], 'analyzed_at': time.time(),
+                                'context_provided': json.dumps(result.get('context_provided') or [])}
+        return 'failed', {'attempts': RCA_MAX_ATTEMPTS, 'error': error or 'interrupted'}
+
+    def _worker_loop(self):
+        while not self.stopping.is_set():
+            group = self.queue.pop(timeout=0.5)
+            if group is None:
+                continue
+            try:
+                if not self.bucket.acquire(self.stopping):
+                    break  # Still 'queued' in the store; the next start resumes it
+                self.store.set_status(group.row_id, 'analyzing')
+                status, fields = self._analyze(group)
+                if status == 'failed' and self.stopping.is_set():
+                    self.store.set_status(group.row_id, 'queued')
+                    continue
+                self.store.set_status(group.row_id, status, **fields)
+            except Exception as e:
+                # One bad group (e.g. a malformed response or a locked database) must not take the worker down
+                status = 'failed'
+                print(f"[rca-pipeline] error analyzing '{group.template[:80]}': {e!r}")
+                try:
+                    self.store.set_status(group.row_id, status, error=repr(e))
+                except sqlite3.Error:
+                    pass  # Left 'analyzing', so the next start retries it
+            finally:
+                self.queue.task_done()
+            with self.lock:
+                self.metrics[status] += 1
+                if status == 'failed' and self.dispatched.get(group.template, (None,))[0] == group.row_id:
+                    del self.dispatched[group.template]  # Not analyzed, so a recurrence tries again
+            print(f"[rca-pipeline] {status} {group.count}x {group.severity} '{group.template[:80]}'")
+
+    def run(self, lines, drain: bool = True):
+        """
+        Scores lines (e.g. from follow_logs) until the source ends, feeding anomalies into the windows.
+        When it ends, open windows are dispatched and, with drain, queued groups are analyzed before returning.
+        """
+        for thread in self.threads:
+            thread.start()
+        try:
+            for line, score, label in self.detector.score_stream(lines):
+                self.metrics['lines'] += 1  # Only this thread writes these two
+                if label == -1:
+                    self.metrics['anomalies'] += 1
+                    self._dispatch(self.grouper.add(self.detector.template(line), line, score))
+            self._dispatch(self.grouper.close_all())
+            while drain and self.queue.unfinished:
+                time.sleep(0.2)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stops the workers; groups still queued stay 'queued' in the store and resume on the next start."""
+        self.stopping.set()
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout=RCA_TIMEOUT_SECONDS)
+        print(f"[rca-pipeline] stopped: {self.metrics}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Streams anomalies from log files into automatic root cause analysis.")
+    parser.add_argument('paths', nargs='+', help="Log files to follow ('-' for stdin)")
+    parser.add_argument('--rca-url', default=RCA_API_URL)
+    parser.add_argument('--db', default=RESULTS_DB_PATH)
+    parser.add_argument('--window', type=float, default=WINDOW_SECONDS, help="Seconds per anomaly window")
+    parser.add_argument('--rate', type=float, default=RCA_RATE_PER_MINUTE, help="RCA requests per minute")
+    parser.add_argument('--workers', type=int, default=RCA_WORKERS)
+    parser.add_argument('--from-start', action='store_true', help="Read files from the beginning instead of tailing")
+    parser.add_argument('--mmap-dir', help="Memory-mapped model artifacts (see model_store.py)")
+    args = parser.parse_args()
+
+    pipeline = AnomalyRCAPipeline(AnomalyDetector(mmap_dir=args.mmap_dir), ResultStore(args.db), args.rca_url,
+                                  window_seconds=args.window, rate_per_minute=args.rate, workers=args.workers)
+    print(f"Following {', '.join(args.paths)}; RCA via {args.rca_url}, results in {args.db}")
+    try:
+        pipeline.run(follow_logs(args.paths, from_start=args.from_start))
+    except KeyboardInterrupt:
+        pass  # run() has already stopped the workers
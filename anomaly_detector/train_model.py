@@ -1,19 +1,41 @@
+import os
+import sys
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
 from sklearn.ensemble import IsolationForest
+from sklearn.pipeline import make_pipeline
+import uuid
 import joblib
+from log_templates import TemplateMiner
+from detect_anomalies import ARTIFACT_VERSION_ATTR
 
-def train_and_save_model(normal_logs_path: str, model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib'):
+# --- Incremental Training Settings ---
+HASHING_FEATURES = 2 ** 18   # Fixed feature space, so no vocabulary has to be refit
+CSV_CHUNK_SIZE = 50000       # Rows read from the CSV at a time
+WINDOW_SIZE = 200000         # Most recent normal lines the forest is refit on
+
+def train_and_save_model(normal_logs_path: str, model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib',
+                         template_miner_path: str = 'log_templates.joblib'):
     """Trains an Isolation Forest model on normal log data and saves it."""
     
     print("Loading normal logs for training...")
     # Assume normal_logs.csv has a single column 'log_message'
     df = pd.read_csv(normal_logs_path)
     
-    # Vectorize the log messages using TF-IDF
-    print("Vectorizing log messages...")
+    # Collapse messages into templates so IDs, timestamps and paths don't bloat the vocabulary
+    print("Mining log templates...")
+    miner = TemplateMiner()
+    clusters = [miner.add_log_message(str(message)) for message in df['log_message']]
+    # Templates keep generalizing while mining, so read each one back only at the end
+    templates = [cluster.template for cluster in clusters]
+    print(f"Collapsed {len(templates)} log lines into {len(miner.clusters)} templates.")
+    
+    # Vectorize the log templates using TF-IDF
+    print("Vectorizing log templates...")
     vectorizer = TfidfVectorizer(max_features=5000)
-    X_train = vectorizer.fit_transform(df['log_message'])
+    X_train = vectorizer.fit_transform(templates)
     
     # Train the Isolation Forest model
     print("Training Isolation Forest model...")
@@ -21,12 +43,95 @@ def train_and_save_model(normal_logs_path: str, model_path: str = 'isolation_for
     model.fit(X_train)
     
     # Save the trained model and vectorizer
-    joblib.dump(model, model_path)
-    joblib.dump(vectorizer, vectorizer_path)
-    print(f"Model saved to {model_path} and vectorizer to {vectorizer_path}")
+    _save_artifacts(model, model_path, vectorizer, vectorizer_path, miner, template_miner_path)
+    print(f"Model saved to {model_path}, vectorizer to {vectorizer_path} and templates to {template_miner_path}")
+
+def _atomic_dump(obj, path: str):
+    """Writes an artifact next to its destination and renames it in, so readers never see a partial file."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def _save_artifacts(model, model_path: str, vectorizer, vectorizer_path: str, miner, template_miner_path: str):
+    """
+    Stamps the three artifacts with one version and renames each in, model first.
+    The renames are not atomic as a set: a detector loading in between sees
+    mismatched stamps and reloads (see detect_anomalies.artifacts_match).
+    """
+    version = uuid.uuid4().hex
+    for obj in (model, vectorizer, miner):
+        setattr(obj, ARTIFACT_VERSION_ATTR, version)
+    _atomic_dump(model, model_path)
+    _atomic_dump(vectorizer, vectorizer_path)
+    _atomic_dump(miner, template_miner_path)
+
+def train_incremental(normal_logs_path: str, model_path: str = 'isolation_forest.joblib', vectorizer_path: str = 'tfidf_vectorizer.joblib',
+                      template_miner_path: str = 'log_templates.joblib', state_path: str = 'incremental_state.joblib',
+                      window_size: int = WINDOW_SIZE, chunk_size: int = CSV_CHUNK_SIZE):
+    """
+    Updates the model with new normal logs without a full refit.
+    The CSV is streamed in chunks through a stateless HashingVectorizer; document
+    frequencies, the template miner and a sliding window of the most recent rows are
+    kept in state_path between runs. IDF is recomputed from the running counts and the
+    forest is refit on the window only, so peak memory depends on window_size,
+    not on how much data has been seen.
+    """
+    if os.path.exists(state_path):
+        print(f"Resuming from incremental state at {state_path}...")
+        state = joblib.load(state_path)
+    else:
+        state = {
+            'doc_freq': np.zeros(HASHING_FEATURES, dtype=np.int64),
+            'n_docs': 0,
+            'window': [],  # raw term-count CSR chunks, oldest first
+            'miner': TemplateMiner(),
+        }
+
+    hasher = HashingVectorizer(n_features=HASHING_FEATURES, alternate_sign=False, norm=None)
+    miner = state['miner']
+    window = state['window']
+
+    print("Streaming normal logs in chunks...")
+    for chunk in pd.read_csv(normal_logs_path, usecols=['log_message'], chunksize=chunk_size):
+        templates = [miner.add_log_message(str(message)).template for message in chunk['log_message']]
+        counts = hasher.transform(templates)
+        state['doc_freq'] += np.bincount(counts.indices, minlength=HASHING_FEATURES)
+        state['n_docs'] += counts.shape[0]
+        window.append(counts)
+
+        # Slide the window: drop whole chunks, then trim the oldest remaining one
+        excess = sum(c.shape[0] for c in window) - window_size
+        while excess > 0:
+            if window[0].shape[0] <= excess:
+                excess -= window.pop(0).shape[0]
+            else:
+                window[0] = window[0][excess:]
+                excess = 0
+        print(f"  Seen {state['n_docs']} lines, {len(miner.clusters)} templates.")
+
+    if not window:
+        print("No log lines found; keeping the current model.")
+        return
+
+    # Same smoothed IDF formula TfidfVectorizer uses, from the running counts
+    tfidf = TfidfTransformer()
+    tfidf.idf_ = np.log((1 + state['n_docs']) / (1 + state['doc_freq'])) + 1.0
+    vectorizer = make_pipeline(hasher, tfidf)
+
+    print(f"Refitting Isolation Forest on the {sum(c.shape[0] for c in window)} most recent lines...")
+    model = IsolationForest(contamination='auto', random_state=42)
+    model.fit(tfidf.transform(sp.vstack(window, format='csr')))
+
+    _save_artifacts(model, model_path, vectorizer, vectorizer_path, miner, template_miner_path)
+    _atomic_dump(state, state_path)
+    print(f"Swapped in updated model at {model_path} (state kept in {state_path})")
 
 if __name__ == '__main__':
     # You would replace 'data/normal_logs.csv' with a path to a CSV file
     # containing thousands of log lines from your application during
     # a period of normal, stable operation.
-    train_and_save_model('data/normal_logs.csv')
+    # Pass --incremental to fold new data into the existing model instead of refitting.
+    if '--incremental' in sys.argv:
+        train_incremental('data/normal_logs.csv')
+    else:
+        train_and_save_model('data/normal_logs.csv')
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Imports each entry-point module in a fresh interpreter and fails if it took longer than its
+# budget, or if importing it already created a client or pulled in a heavy client library.
+# Resources must be created lazily (see code_indexer/lazy_resource.py), on first use or warmup.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (component directory, module, budget in ms)
+MODULES = [
+    ('code_indexer', 'vector_store', 500),
+    ('code_indexer', 'bulk_indexer', 600),
+    ('rca_agent', 'rca_service', 600),
+    ('rca_agent', 'main_rca_agent_wihtout_api', 600),
+    ('rca_agent', 'main_rca_agent', 1200),  # FastAPI and pydantic included
+]
+# Client libraries that may only be imported when a provider is first used
+HEAVY_MODULES = ['chromadb', 'abc.langchain', 'langchain', 'torch']
+
+_PROBE = """
+import sys, json, time
+sys.path.insert(0, '.')
+started = time.perf_counter()
+__import__(sys.argv[1])
+elapsed_ms = (time.perf_counter() - started) * 1000
+import lazy_resource
+print(json.dumps({
+    'import_ms': elapsed_ms,
+    'loaded': [p.name for p in lazy_resource._providers if p.loaded],
+    'heavy': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def probe(component: str, module: str, runs: int) -> dict:
+    """Median import time over runs cold starts, plus what the import created or pulled in."""
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', _PROBE, module, json.dumps(HEAVY_MODULES)],
+                                   cwd=os.path.join(REPO_ROOT, component), capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    result = samples[-1]
+    result['import_ms'] = round(sorted(s['import_ms'] for s in samples)[len(samples) // 2], 1)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks that entry-point modules import within their time budget.")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplies every budget (e.g. 2 on slow CI machines)")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"--- Import-time budget (median of {args.runs} cold starts) ---")
+    for component, module, budget_ms in MODULES:
+        result = probe(component, module, args.runs)
+        budget_ms *= args.scale
+        if 'error' in result:
+            problems = [f"import failed: {result['error']}"]
+        else:
+            problems = []
+            if result['import_ms'] > budget_ms:
+                problems.append(f"over budget ({budget_ms:.0f} ms)")
+            if result['loaded']:
+                problems.append(f"created at import: {', '.join(result['loaded'])}")
+            if result['heavy']:
+                problems.append(f"imported: {', '.join(result['heavy'])}")
+        failures += bool(problems)
+        timing = f"{result['import_ms']:8.1f} ms" if 'import_ms' in result else '       - ms'
+        print(f"{component + '/' + module:45s} {timing}   {'; '.join(problems) or 'ok'}")
+    sys.exit(1 if failures else 0)
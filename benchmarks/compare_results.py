@@ -0,0 +1,66 @@
+import sys
+import json
+import argparse
+
+# Metrics where a smaller number is better; everything else numeric is treated as "higher is better"
+# only if it is a rate, and reported without a verdict otherwise (counts, sizes).
+LOWER_IS_BETTER = ('_ms', 'seconds')
+HIGHER_IS_BETTER = ('_per_s', 'hit_rate')
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def direction(metric: str) -> int:
+    """-1 when lower is better, 1 when higher is better, 0 when the metric is informational."""
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> int:
+    """Prints every shared metric with its change; returns how many moved the wrong way by more than threshold percent."""
+    old, new = flatten(baseline['results']), flatten(candidate['results'])
+    print(f"Baseline {baseline['meta']['git_commit']} ({baseline['meta']['timestamp']}) vs "
+          f"candidate {candidate['meta']['git_commit']} ({candidate['meta']['timestamp']})")
+    regressions = 0
+    for metric in sorted(old.keys() & new.keys()):
+        before, after = old[metric], new[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        better = direction(metric)
+        verdict = ''
+        if better and abs(change) > threshold:
+            if change * better > 0:
+                verdict = 'improved'
+            else:
+                verdict = 'REGRESSED'
+                regressions += 1
+        print(f"{metric:<45} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%  {verdict}")
+    for metric in sorted(old.keys() ^ new.keys()):
+        print(f"{metric:<45} only in {'baseline' if metric in old else 'candidate'}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diffs two run_benchmarks.py result files.")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Percent change that counts as a regression")
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    regressions = compare(baseline, candidate, args.threshold)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0f}%")
+    sys.exit(1 if regressions else 0)
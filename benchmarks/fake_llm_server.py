@@ -0,0 +1,85 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Stand-in for the Stork LLM gateway: answers POST {"prompt": ...} after a fixed latency,
+# as JSON {"result": ...} or, with "stream": true, as server-sent token events.
+# GET /stats returns how many generations were served, so benchmarks can count LLM calls.
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.2         # Seconds before the first byte
+    token_latency = 0.01  # Seconds between streamed tokens
+    tokens = 20
+    requests = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send(200, json.dumps({'requests': FakeGatewayHandler.requests}).encode())
+        else:
+            self._send(404, b'{}')
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with FakeGatewayHandler.lock:
+            FakeGatewayHandler.requests += 1
+        prompt = str(body.get('prompt', ''))
+        words = [f"cause{i} " for i in range(self.tokens)]
+        time.sleep(self.latency)
+
+        if not body.get('stream'):
+            result = f"Root cause analysis for a {len(prompt)}-character prompt: " + "".join(words)
+            self._send(200, json.dumps({'result': result}).encode())
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for word in words + [None]:
+            event = f"data: {json.dumps({'token': word})}\n\n" if word is not None else "data: [DONE]\n\n"
+            data = event.encode()
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+            if word is not None:
+                time.sleep(self.token_latency)
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def serve(port: int, latency: float, token_latency: float, tokens: int):
+    FakeGatewayHandler.latency = latency
+    FakeGatewayHandler.token_latency = token_latency
+    FakeGatewayHandler.tokens = tokens
+    ThreadingHTTPServer.request_queue_size = 1024
+    ThreadingHTTPServer.daemon_threads = True
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGatewayHandler)
+    print(f"Fake LLM gateway on http://127.0.0.1:{server.server_port} (latency {latency}s)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Stork LLM gateway.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--token-latency', type=float, default=0.01)
+    parser.add_argument('--tokens', type=int, default=20)
+    args = parser.parse_args()
+    try:
+        serve(args.port, args.latency, args.token_latency, args.tokens)
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from synthetic_corpus import write_corpus
+from scenarios import SCENARIOS, NEEDS_INDEX
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(REPO_ROOT, 'benchmarks')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def scenario_env(workdir: str, project: str, llm_port: int, backend: str) -> dict:
+    """Points every component at the run's scratch directory and at the local stand-ins."""
+    index_dir = os.path.join(workdir, 'index')
+    return {
+        **os.environ,
+        'PROJECT_PATH': project,
+        'CHROMA_DB_PATH': index_dir,
+        'VECTOR_STORE_BACKEND': backend,
+        'EMBEDDING_PROVIDER': 'hashing',
+        'EMBEDDING_CACHE_PATH': os.path.join(workdir, 'embedding_cache.sqlite3'),
+        'CONVERSATION_DB_PATH': os.path.join(workdir, 'conversations.sqlite3'),
+        'STORK_API_URL': f"http://127.0.0.1:{llm_port}/generate",
+        'PYTHONUNBUFFERED': '1',
+    }
+
+
+def run_scenario(name: str, params: dict, env: dict, workdir: str, verbose: bool) -> dict:
+    component = SCENARIOS[name][0]
+    params_path = os.path.join(workdir, f"{name}.params.json")
+    result_path = os.path.join(workdir, f"{name}.result.json")
+    with open(params_path, 'w') as f:
+        json.dump(params, f)
+
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, 'scenarios.py'), name, params_path, result_path],
+        cwd=os.path.join(REPO_ROOT, component), env=env, text=True,
+        stdout=None if verbose else subprocess.PIPE, stderr=subprocess.STDOUT if not verbose else None,
+    )
+    wall_seconds = round(time.perf_counter() - started, 3)
+    if completed.returncode != 0:
+        tail = (completed.stdout or '').strip().splitlines()[-20:]
+        return {'status': 'failed', 'wall_seconds': wall_seconds, 'error': "\n".join(tail)}
+    with open(result_path) as f:
+        return {'status': 'ok', 'wall_seconds': wall_seconds, **json.load(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks with a hashing embedder and a fake LLM gateway.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--files', type=int, default=300, help="Java files in the synthetic project")
+    parser.add_argument('--error-logs', type=int, default=100, help="Error logs for retrieval and /analyze")
+    parser.add_argument('--app-logs', type=int, default=100_000, help="Application log lines for anomaly scoring")
+    parser.add_argument('--watcher-edits', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent /analyze requests")
+    parser.add_argument('--batch-repeats', type=int, default=20, help="Copies of each error log in the /analyze/batch request")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Fake gateway seconds per generation")
+    parser.add_argument('--backend', default='local', choices=['local', 'chroma'], help="Vector store backend")
+    parser.add_argument('--workdir', help="Scratch directory (default: a temporary one, removed afterwards)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--verbose', action='store_true', help="Show each scenario's own output")
+    args = parser.parse_args()
+
+    selected = [name for name in SCENARIOS if name in args.scenarios.split(',')]
+    if NEEDS_INDEX & set(selected) and 'bulk_index' not in selected:
+        selected.insert(0, 'bulk_index')  # The other scenarios query the index it builds
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='rca-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    print(f"--- Benchmarks: {', '.join(selected)} (workdir {workdir}) ---")
+    corpus = write_corpus(workdir, args.files, args.error_logs, args.app_logs)
+    print(f"Synthetic corpus: {args.files} files, {corpus['methods']} methods, {args.error_logs} error logs, "
+          f"{args.app_logs} application log lines")
+
+    llm_port = free_port()
+    gateway = subprocess.Popen([sys.executable, os.path.join(BENCHMARKS_DIR, 'fake_llm_server.py'),
+                                '--port', str(llm_port), '--latency', str(args.llm_latency)],
+                               stdout=subprocess.DEVNULL)
+    env = scenario_env(workdir, corpus['project'], llm_port, args.backend)
+    params = {
+        'workdir': workdir, 'files': args.files, 'error_logs': corpus['error_logs'], 'app_logs': corpus['app_logs'],
+        'error_log_count': args.error_logs, 'watcher_edits': args.watcher_edits, 'concurrency': args.concurrency,
+        'llm_latency': args.llm_latency, 'batch_repeats': args.batch_repeats, 'rca_port': free_port(),
+    }
+
+    results = {}
+    try:
+        time.sleep(0.3)  # Let the fake gateway bind its port
+        for name in selected:
+            print(f"Running {name}...", flush=True)
+            results[name] = run_scenario(name, params, env, workdir, args.verbose)
+            print(json.dumps(results[name], indent=2))
+    finally:
+        gateway.terminate()
+        gateway.wait()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'git_commit': git_commit(),
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'verbose', 'workdir')},
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+    if any(result['status'] != 'ok' for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import random
+
+# Each scenario runs in its own interpreter with the working directory set to the component
+# it measures (see run_benchmarks.py), so every component imports its own config module.
+# Usage: python scenarios.py <scenario> <params.json> <result.json>
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def summarize(latencies_ms: list[float]) -> dict:
+    return {
+        'p50_ms': round(percentile(latencies_ms, 0.5), 3),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 3),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+        'max_ms': round(max(latencies_ms, default=0.0), 3),
+    }
+
+
+def bulk_index(params: dict) -> dict:
+    """Full index of the synthetic project, then a re-run with nothing changed."""
+    from bulk_indexer import crawl_and_index_project
+    from vector_store import get_collection
+
+    started = time.perf_counter()
+    crawl_and_index_project()
+    seconds = time.perf_counter() - started
+    chunks = get_collection().count()
+
+    started = time.perf_counter()
+    crawl_and_index_project()
+    noop_seconds = time.perf_counter() - started
+    return {
+        'files': params['files'], 'chunks': chunks, 'seconds': round(seconds, 3),
+        'files_per_s': round(params['files'] / seconds, 1), 'chunks_per_s': round(chunks / seconds, 1),
+        'noop_rerun_seconds': round(noop_seconds, 3),
+    }
+
+
+def watcher_reindex(params: dict) -> dict:
+    """Edits files one at a time and times each from event to re-indexed, through the watcher's worker."""
+    from main import DebouncedEventQueue, IndexingWorker
+    from index_manifest import IndexManifest
+
+    manifest = IndexManifest()
+    events = DebouncedEventQueue(window=0.0)  # The debounce wait is a fixed setting, not indexing cost
+    worker = IndexingWorker(events, manifest)
+    worker.start()
+
+    chosen = random.Random(3).sample(sorted(manifest.files), min(params['watcher_edits'], len(manifest.files)))
+    latencies = []
+    for i, file_path in enumerate(chosen):
+        with open(file_path) as f:
+            source = f.read().rstrip()
+        # A new method before the class's closing brace: one chunk to embed, the rest re-keyed or unchanged
+        source = source[:-1] + f"    public void benchmarkEdit{i}() {{\n        log.info(\"edit {i}\");\n    }}\n}}\n"
+        with open(file_path, 'w') as f:
+            f.write(source)
+        started = time.perf_counter()
+        events.push(file_path, 'upsert')
+        while worker.metrics['processed'] < i + 1:
+            time.sleep(0.0005)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    worker.stopping.set()
+    worker.join()
+    return {'files_edited': len(chosen), 'embedded': worker.metrics['embedded'],
+            'errors': worker.metrics['errors'], **summarize(latencies)}
+
+
+def retrieval(params: dict) -> dict:
+    """Embedding plus code retrieval per error log, and whether the top stack frame's file was retrieved."""
+    import rca_service
+
+    with open(params['error_logs']) as f:
+        logs = json.load(f)[:params['error_log_count']]
+    latencies, hits, top_hits = [], 0, 0
+    for log in logs:
+        started = time.perf_counter()
+        result = rca_service._retrieve(log['error_log'])
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += log['expected'] in result['files']
+        top_hits += result['files'][:1] == [log['expected']]
+    return {'queries': len(logs), 'file_hit_rate': round(hits / max(1, len(logs)), 3),
+            'top1_file_hit_rate': round(top_hits / max(1, len(logs)), 3), **summarize(latencies)}
+
+
+def _start_rca_server(port: int):
+    """Runs the RCA FastAPI app in a background thread; returns (server, thread) once it accepts requests."""
+    import threading
+    import uvicorn
+    from main_rca_agent import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _gateway_requests() -> int:
+    """Generations served so far by the fake gateway that STORK_API_URL points at."""
+    import httpx
+    return httpx.get(os.environ['STORK_API_URL'].rsplit('/', 1)[0] + '/stats').json()['requests']
+
+
+def analyze_throughput(params: dict) -> dict:
+    """POST /analyze under concurrent load against the fake gateway: a cold pass, then a cached repeat."""
+    import asyncio
+    from collections import Counter
+    import httpx
+
+    with open(params['error_logs']) as f:
+        logs = [log['error_log'] for log in json.load(f)[:params['error_log_count']]]
+    server, thread = _start_rca_server(params['rca_port'])
+
+    async def run_pass() -> dict:
+        slots = asyncio.Semaphore(params['concurrency'])
+        latencies, errors, outcomes = [], 0, Counter()
+        limits = httpx.Limits(max_connections=params['concurrency'])
+        async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+            async def one(error_log: str):
+                nonlocal errors
+                async with slots:
+                    started = time.perf_counter()
+                    response = await client.post(f"http://127.0.0.1:{params['rca_port']}/analyze", json={'error_log': error_log})
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code == 200:
+                        outcomes[response.json().get('cache', 'unknown')] += 1
+                    else:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(error_log) for error_log in logs))
+            seconds = time.perf_counter() - started
+        return {'requests': len(logs), 'seconds': round(seconds, 3), 'requests_per_s': round(len(logs) / seconds, 1),
+                'errors': errors, 'cache': dict(outcomes), **summarize(latencies)}
+
+    cold = asyncio.run(run_pass())
+    warm = asyncio.run(run_pass())
+    server.should_exit = True
+    thread.join()
+    return {'concurrency': params['concurrency'], 'llm_latency_s': params['llm_latency'], 'cold': cold, 'warm': warm}
+
+
+def analyze_batch(params: dict) -> dict:
+    """
+    One POST /analyze/batch with every error log repeated batch_repeats times (new timestamps and
+    threads each time), as during an incident; LLM calls should track distinct failures, not volume.
+    """
+    import re
+    import httpx
+
+    with open(params['error_logs']) as f:
+        distinct = [log['error_log'] for log in json.load(f)[:params['error_log_count']]]
+    rng = random.Random(5)
+    def recur(log: str) -> str:
+        log = re.sub(r'\d\d\.\d{3} ERROR', f"{rng.randint(10, 59)}.{rng.randint(100, 999)} ERROR", log)
+        return re.sub(r'exec-\d+', f"exec-{rng.randint(1, 200)}", log)
+    batch = [recur(log) for log in distinct for _ in range(params['batch_repeats'])]
+    rng.shuffle(batch)
+    server, thread = _start_rca_server(params['rca_port'])
+
+    gateway_before = _gateway_requests()
+    started = time.perf_counter()
+    response = httpx.post(f"http://127.0.0.1:{params['rca_port']}/analyze/batch", json={'error_logs': batch}, timeout=600)
+    seconds = time.perf_counter() - started
+    response.raise_for_status()
+    result = response.json()
+    gateway_calls = _gateway_requests() - gateway_before
+
+    server.should_exit = True
+    thread.join()
+    sizes = [cluster['size'] for cluster in result['clusters']]
+    return {'logs': len(batch), 'distinct_logs': len(distinct), 'clusters': len(sizes),
+            'largest_cluster': max(sizes), 'llm_calls': result['llm_calls'], 'gateway_requests': gateway_calls,
+            'seconds': round(seconds, 3), 'logs_per_s': round(len(batch) / seconds, 1)}
+
+
+def anomaly_scoring(params: dict) -> dict:
+    """Trains on the first half of the synthetic application log, then scores the second half in batches."""
+    import pandas as pd
+    from train_model import train_and_save_model
+    from detect_anomalies import AnomalyDetector, STREAM_BATCH_SIZE
+
+    with open(params['app_logs']) as f:
+        lines = f.read().splitlines()
+    half = len(lines) // 2
+    workdir = params['workdir']
+    artifacts = [os.path.join(workdir, name) for name in ('isolation_forest.joblib', 'tfidf_vectorizer.joblib', 'log_templates.joblib')]
+    training_csv = os.path.join(workdir, 'normal_logs.csv')
+    pd.DataFrame({'log_message': lines[:half]}).to_csv(training_csv, index=False)
+
+    started = time.perf_counter()
+    train_and_save_model(training_csv, *artifacts)
+    train_seconds = time.perf_counter() - started
+
+    detector = AnomalyDetector(*artifacts)
+    to_score = lines[half:]
+    passes = {}
+    for name in ('cold', 'warm'):  # The second pass finds every template in the detector's cache
+        anomalies = 0
+        started = time.perf_counter()
+        for i in range(0, len(to_score), STREAM_BATCH_SIZE):
+            _, labels = detector.score(to_score[i:i + STREAM_BATCH_SIZE])
+            anomalies += labels.count(-1)
+        seconds = time.perf_counter() - started
+        passes[name] = {'lines': len(to_score), 'seconds': round(seconds, 3),
+                        'lines_per_s': round(len(to_score) / seconds, 1), 'anomalies': anomalies}
+    return {'train_lines': half, 'train_seconds': round(train_seconds, 3), **passes}
+
+
+# name -> (component directory, scenario); run_benchmarks.py runs them in this order
+SCENARIOS = {
+    'bulk_index': ('code_indexer', bulk_index),
+    'retrieval': ('rca_agent', retrieval),
+    'analyze_throughput': ('rca_agent', analyze_throughput),
+    'analyze_batch': ('rca_agent', analyze_batch),
+    'watcher_reindex': ('code_indexer', watcher_reindex),
+    'anomaly_scoring': ('anomaly_detector', anomaly_scoring),
+}
+NEEDS_INDEX = {'retrieval', 'analyze_throughput', 'analyze_batch', 'watcher_reindex'}
+
+if __name__ == "__main__":
+    name, params_path, result_path = sys.argv[1:4]
+    with open(params_path) as f:
+        params = json.load(f)
+    sys.path.insert(0, os.getcwd())
+    result = SCENARIOS[name][1](params)
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
@@ -0,0 +1,159 @@
+import os
+import json
+import random
+
+# Deterministic inputs for the benchmark suite: a Java project, error logs whose stack
+# frames point at real methods in it, and application log lines for anomaly scoring.
+
+MODULES = ['orders', 'payments', 'users', 'inventory', 'shipping', 'auth', 'billing', 'catalog', 'search', 'notifications']
+LAYERS = ['service', 'controller', 'repository', 'client', 'util']
+NOUNS = ['Order', 'Payment', 'User', 'Stock', 'Shipment', 'Token', 'Invoice', 'Product', 'Query', 'Message',
+         'Cart', 'Refund', 'Session', 'Account', 'Coupon', 'Address', 'Review', 'Report', 'Ledger', 'Quote']
+VERBS = ['process', 'validate', 'load', 'save', 'find', 'update', 'cancel', 'apply', 'resolve', 'publish',
+         'calculate', 'refresh', 'merge', 'dispatch', 'verify', 'archive', 'import', 'export', 'notify', 'retry']
+EXCEPTIONS = [
+    ('java.lang.NullPointerException', 'Cannot invoke "{noun}.getId()" because "{var}" is null'),
+    ('java.lang.IllegalStateException', '{noun} {id} is not in a valid state for {verb}'),
+    ('java.sql.SQLTimeoutException', 'Query timed out after {ms}ms on table {table}'),
+    ('org.springframework.dao.DataIntegrityViolationException', 'could not execute statement; constraint [{table}_pkey]'),
+    ('java.util.concurrent.TimeoutException', 'Timed out waiting for {noun} response after {ms} ms'),
+    ('java.lang.IllegalArgumentException', 'Invalid {var}: {id}'),
+]
+FRAMEWORK_FRAMES = [
+    'org.springframework.aop.framework.ReflectiveMethodInvocation.proceed(ReflectiveMethodInvocation.java:186)',
+    'org.springframework.transaction.interceptor.TransactionInterceptor.invoke(TransactionInterceptor.java:119)',
+    'org.springframework.web.servlet.FrameworkServlet.service(FrameworkServlet.java:883)',
+    'java.base/java.util.concurrent.ThreadPoolExecutor.runWorker(ThreadPoolExecutor.java:1136)',
+    'java.base/java.lang.Thread.run(Thread.java:833)',
+]
+
+
+def _statement(rng: random.Random, noun: str, depth: int) -> list[str]:
+    var = noun[0].lower() + noun[1:]
+    kind = rng.randrange(6)
+    pad = '        ' + '    ' * depth
+    if kind == 0 and depth < 2:
+        body = [line for _ in range(rng.randint(1, 3)) for line in _statement(rng, noun, depth + 1)]
+        return [f"{pad}if ({var} != null && {var}.isActive()) {{"] + body + [f"{pad}}}"]
+    if kind == 1 and depth < 2:
+        body = [line for _ in range(rng.randint(1, 3)) for line in _statement(rng, rng.choice(NOUNS), depth + 1)]
+        return [f"{pad}for ({noun} item : {var}List) {{"] + body + [f"{pad}}}"]
+    if kind == 2:
+        return [f'{pad}log.info("{rng.choice(VERBS)} {noun} {{}} took {{}} ms", {var}.getId(), elapsed);']
+    if kind == 3:
+        return [f'{pad}throw new IllegalStateException("{noun} " + {var}.getId() + " is not valid");']
+    if kind == 4:
+        other = rng.choice(NOUNS)
+        return [f"{pad}{other} {other.lower()}Result = {other.lower()}Client.{rng.choice(VERBS)}{other}({var}.getId());"]
+    return [f"{pad}{var}.set{rng.choice(NOUNS)}Count({var}.get{rng.choice(NOUNS)}Count() + {rng.randint(1, 9)});"]
+
+
+def _java_file(rng: random.Random, package: str, class_name: str, noun: str, methods: int):
+    """Source of one class plus (method name, start line, end line) for each method."""
+    lines = [f"package {package};", "",
+             "import java.util.List;", "import java.util.function.Function;",
+             "import org.slf4j.Logger;", "import org.slf4j.LoggerFactory;", "",
+             f"public class {class_name} {{",
+             f"    private static final Logger log = LoggerFactory.getLogger({class_name}.class);",
+             f"    private final Function<{noun}, String> describe = {noun.lower()} -> {noun.lower()}.toString();", ""]
+    spans = []
+    for _ in range(methods):
+        verb = rng.choice(VERBS)
+        name = f"{verb}{noun}{rng.randint(0, 99)}"
+        start = len(lines) + 1
+        lines.append(f"    public {noun} {name}({noun} {noun[0].lower() + noun[1:]}, List<{noun}> {noun[0].lower() + noun[1:]}List) {{")
+        lines.append("        long elapsed = System.nanoTime();")
+        for _ in range(rng.randint(2, 12)):
+            lines.extend(_statement(rng, noun, 0))
+        lines.append(f"        return {noun[0].lower() + noun[1:]};")
+        lines.append("    }")
+        spans.append((name, start, len(lines)))
+        lines.append("")
+    lines.append(f"    static class {noun}Holder {{")
+    lines.append(f"        {noun} value;")
+    lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n", spans
+
+
+def generate_corpus(root: str, files: int = 500, seed: int = 7) -> list[dict]:
+    """Writes files Java classes under root and returns every method as a frame target."""
+    rng = random.Random(seed)
+    methods = []
+    for i in range(files):
+        module, layer, noun = MODULES[i % len(MODULES)], LAYERS[(i // len(MODULES)) % len(LAYERS)], rng.choice(NOUNS)
+        package = f"com.example.{module}.{layer}"
+        class_name = f"{noun}{layer.capitalize()}{i}"
+        source, spans = _java_file(rng, package, class_name, noun, rng.randint(3, 12))
+        directory = os.path.join(root, 'src', 'main', 'java', *package.split('.'))
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, f"{class_name}.java")
+        with open(file_path, 'w') as f:
+            f.write(source)
+        for name, start, end in spans:
+            methods.append({'file_path': file_path, 'package': package, 'class_name': class_name,
+                            'method_name': name, 'start_line': start, 'end_line': end})
+    return methods
+
+
+def generate_error_logs(methods: list[dict], count: int = 200, seed: int = 11) -> list[dict]:
+    """Stack traces through random corpus methods; 'expected' is the file of the top application frame."""
+    rng = random.Random(seed)
+    logs = []
+    for i in range(count):
+        chain = rng.sample(methods, rng.randint(2, 5))
+        exception, message = rng.choice(EXCEPTIONS)
+        noun = rng.choice(NOUNS)
+        message = message.format(noun=noun, var=noun.lower(), id=rng.randint(1000, 99999), verb=rng.choice(VERBS),
+                                 ms=rng.randint(100, 30000), table=f"{noun.lower()}s")
+        lines = [f"2024-05-{1 + i % 28:02d} 12:{i % 60:02d}:{rng.randint(0, 59):02d}.{rng.randint(0, 999):03d} ERROR "
+                 f"[http-nio-8080-exec-{rng.randint(1, 200)}] c.e.{chain[0]['class_name']} - Request failed",
+                 f"{exception}: {message}"]
+        for method in chain:
+            line = rng.randint(method['start_line'] + 1, method['end_line'] - 1)
+            lines.append(f"\tat {method['package']}.{method['class_name']}.{method['method_name']}"
+                         f"({method['class_name']}.java:{line})")
+        lines.extend(f"\tat {frame}" for frame in rng.sample(FRAMEWORK_FRAMES, 3))
+        logs.append({'error_log': "\n".join(lines), 'expected': chain[0]['file_path']})
+    return logs
+
+
+def generate_app_logs(count: int = 100_000, anomaly_rate: float = 0.002, seed: int = 13) -> list[str]:
+    """Application log lines: a few dozen normal templates with varying values, plus rare anomalous lines."""
+    rng = random.Random(seed)
+    normal = [
+        "INFO: User '{user}' logged in successfully from {ip}.",
+        "INFO: Request GET /api/{noun}s/{id} completed in {ms} ms with status 200.",
+        "INFO: {noun} {id} saved by {user}.",
+        "DEBUG: Cache hit for {noun}:{id}.",
+        "INFO: Scheduled job {verb}{noun}s finished in {ms} ms, {n} records.",
+        "WARN: Slow query on {noun}s took {ms} ms.",
+        "INFO: Published {noun}Event {id} to topic {noun}s.",
+    ]
+    anomalous = [
+        "ERROR: Database connection failed: timeout expired after {ms} ms.",
+        "FATAL: OutOfMemoryError in worker thread {n}; heap exhausted.",
+        "ERROR: Payment gateway returned HTTP 503 for {noun} {id}.",
+    ]
+    lines = []
+    for _ in range(count):
+        template = rng.choice(anomalous if rng.random() < anomaly_rate else normal)
+        noun = rng.choice(NOUNS)
+        lines.append(template.format(user=f"user{rng.randint(1, 5000)}", ip=f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                                     noun=noun, id=rng.randint(1, 10 ** 6), ms=rng.randint(1, 5000),
+                                     verb=rng.choice(VERBS), n=rng.randint(1, 1000)))
+    return lines
+
+
+def write_corpus(workdir: str, files: int, error_logs: int, app_logs: int) -> dict:
+    """Generates everything a benchmark run needs under workdir and returns the paths."""
+    project = os.path.join(workdir, 'project')
+    methods = generate_corpus(project, files)
+    paths = {'project': project, 'error_logs': os.path.join(workdir, 'error_logs.json'),
+             'app_logs': os.path.join(workdir, 'app_logs.txt')}
+    with open(paths['error_logs'], 'w') as f:
+        json.dump(generate_error_logs(methods, error_logs), f)
+    with open(paths['app_logs'], 'w') as f:
+        f.write("\n".join(generate_app_logs(app_logs)) + "\n")
+    paths['methods'] = len(methods)
+    return paths
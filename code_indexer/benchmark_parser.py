@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+from collections import Counter
+from config import PROJECT_PATH
+from parser import parser, extract_method_chunks
+
+def load_sources(project_path: str) -> list[tuple[str, bytes]]:
+    sources = []
+    for root, dirs, files in os.walk(project_path):
+        for file in files:
+            if file.endswith(".java"):
+                file_path = os.path.join(root, file)
+                with open(file_path, 'rb') as f:
+                    sources.append((file_path, f.read()))
+    return sources
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def benchmark(project_path: str):
+    """
+    Times the chunker over every Java file in a project, with the sources already in
+    memory so disk speed does not count. Parse-only time is reported separately to
+    show how much the extraction itself adds on top of tree-sitter.
+    """
+    sources = load_sources(project_path)
+    total_bytes = sum(len(source) for _, source in sources)
+    print(f"--- Chunker benchmark: {len(sources)} files, {total_bytes / 1e6:.1f} MB from {project_path} ---")
+    if not sources:
+        return
+
+    started = time.perf_counter()
+    for _, source in sources:
+        parser.parse(source)
+    parse_seconds = time.perf_counter() - started
+
+    per_file_ms, kinds, parts = [], Counter(), 0
+    started = time.perf_counter()
+    for file_path, source in sources:
+        file_started = time.perf_counter()
+        chunks = extract_method_chunks(file_path, source)
+        per_file_ms.append((time.perf_counter() - file_started) * 1000)
+        for chunk in chunks:
+            kinds[chunk['metadata']['kind']] += 1
+            parts += 'part' in chunk['metadata']
+    seconds = time.perf_counter() - started
+
+    print(f"Parse only:        {parse_seconds:.2f}s")
+    print(f"Parse + chunking:  {seconds:.2f}s ({len(sources) / seconds:.0f} files/s, {total_bytes / 1e6 / seconds:.1f} MB/s)")
+    print(f"Per file:          p50 {percentile(per_file_ms, 0.5):.2f} ms, p99 {percentile(per_file_ms, 0.99):.2f} ms")
+    print(f"Chunks:            {sum(kinds.values())} ({', '.join(f'{kind}={count}' for kind, count in kinds.most_common())})")
+    print(f"Split-method parts: {parts}")
+
+if __name__ == "__main__":
+    # Usage: python benchmark_parser.py [project_path]
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else PROJECT_PATH)
@@ -0,0 +1,68 @@
+import sys
+import time
+import numpy as np
+from config import CHROMA_DB_PATH, CHROMA_COLLECTION_NAME, LOCAL_VECTOR_STORE_PATH
+from local_vector_store import LocalVectorStore, open_collection
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+def sample_queries(store: LocalVectorStore, n_queries: int, noise: float, seed: int = 0) -> np.ndarray:
+    """Stored vectors with Gaussian noise, so queries sit near real chunks without matching one exactly."""
+    rng = np.random.default_rng(seed)
+    total = store.count()
+    vectors = [store.get(include=['embeddings'], limit=1, offset=int(offset))['embeddings'][0]
+               for offset in rng.choice(total, min(n_queries, total), replace=False)]
+    queries = np.asarray(vectors, dtype=np.float32)
+    scale = noise * np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+    return queries + rng.normal(size=queries.shape).astype(np.float32) * scale
+
+def measure(label: str, search, queries: np.ndarray, truth: list[list[str]], k: int):
+    """Per-query latency (one query per call, as on the RCA hot path) and recall@k against exact search."""
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        ids = search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(ids) & set(expected)) / max(1, len(expected)))
+    print(f"{label:<24} recall@{k} {np.mean(recalls):.3f}   p50 {percentile(latencies, 0.5):7.2f} ms   "
+          f"p99 {percentile(latencies, 0.99):7.2f} ms")
+
+def benchmark(n_queries: int = 200, k: int = 10, noise: float = 0.3):
+    """
+    Compares the local store (exact scan and IVF at several nprobe settings) with ChromaDB
+    on the same vectors. Exact local search is the ground truth for recall. Run after
+    migrate_vector_store.py so both stores hold the same chunks.
+    """
+    store = LocalVectorStore(LOCAL_VECTOR_STORE_PATH)
+    if not store.count():
+        print(f"No vectors in {LOCAL_VECTOR_STORE_PATH}; run migrate_vector_store.py first.")
+        return
+    queries = sample_queries(store, n_queries, noise)
+    print(f"--- Vector store benchmark: {store.count()} vectors, {len(queries)} queries, top {k} ---")
+
+    truth = [store.query(query, n_results=k, include=[], exact=True)['ids'][0] for query in queries]
+    measure("local exact", lambda q: store.query(q, n_results=k, include=[], exact=True)['ids'][0], queries, truth, k)
+    store._refresh(force=True)
+    if store.ivf is not None:
+        n_lists = len(store.ivf['centroids'])
+        for nprobe in sorted({4, 8, 16, 32, 64} & set(range(1, n_lists + 1))):
+            measure(f"local ivf nprobe={nprobe}",
+                    lambda q: store.query(q, n_results=k, include=[], nprobe=nprobe)['ids'][0], queries, truth, k)
+    else:
+        print("(No IVF index: the store is below the IVF threshold and always searched exactly.)")
+
+    try:
+        chroma = open_collection('chroma', CHROMA_DB_PATH, CHROMA_COLLECTION_NAME, LOCAL_VECTOR_STORE_PATH, create=False)
+    except Exception as e:
+        print(f"ChromaDB not compared: {e}")
+        return
+    if chroma.count() != store.count():
+        print(f"Note: ChromaDB holds {chroma.count()} vectors, the local store {store.count()}.")
+    measure("chroma (hnsw)", lambda q: chroma.query(query_embeddings=[q.tolist()], n_results=k, include=[])['ids'][0],
+            queries, truth, k)
+
+if __name__ == "__main__":
+    # Usage: python benchmark_vector_store.py [n_queries] [k]
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
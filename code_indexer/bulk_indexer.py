@@ -1,37 +1,53 @@
 import os
+import instrumentation
 from config import PROJECT_PATH
-from parser import extract_method_chunks
-from vector_store import upsert_to_chromadb
+from index_manifest import IndexManifest, remove_file
+from index_pipeline import run_index_pipeline
+from vector_store import (
+    get_embedding_cache, get_keyword_index, get_symbol_index, get_collection, rebuild_local_indexes, maintain_vector_store
+)
 
 def crawl_and_index_project():
     """
     Crawls the entire project directory, finds all Java files,
-    and indexes them in a single run.
+    and brings the index up to date in a single run. Only files that changed since
+    the last run are parsed, only changed methods are embedded, and chunks of
+    deleted files or methods are removed. Parsing and embedding run in parallel
+    (see index_pipeline).
     """
     print(f"--- Starting bulk indexing for project at: {PROJECT_PATH} ---")
-    
-    java_files_found = 0
-    chunks_indexed = 0
-    
-    # os.walk recursively visits all directories and files from the root path
-    for root, dirs, files in os.walk(PROJECT_PATH):
-        for file in files:
-            if file.endswith(".java"):
-                file_path = os.path.join(root, file)
-                java_files_found += 1
-                
-                print(f"Processing: {file_path}")
-                
-                # Use the existing parsing and upserting logic
-                chunks = extract_method_chunks(file_path)
-                
-                if chunks:
-                    upsert_to_chromadb(chunks)
-                    chunks_indexed += len(chunks)
+
+    manifest = IndexManifest()
+    if (len(get_keyword_index()) == 0 or len(get_symbol_index()) == 0) and get_collection().count() > 0:
+        rebuild_local_indexes()
+    stats, seen_files = run_index_pipeline(PROJECT_PATH, manifest)
+
+    # Files indexed on a previous run that are gone now
+    project_root = os.path.join(os.path.abspath(PROJECT_PATH), '')
+    for file_path in list(manifest.files):
+        if file_path not in seen_files and os.path.abspath(file_path).startswith(project_root):
+            print(f"Removing deleted file: {file_path}")
+            stats['deleted'] += remove_file(file_path, manifest)
+
+    manifest.save()
+    maintain_vector_store()
 
     print("\n--- Bulk Indexing Complete ---")
-    print(f"Total Java files found: {java_files_found}")
-    print(f"Total method chunks indexed: {chunks_indexed}")
+    print(f"Total Java files found: {len(seen_files)}")
+    print(f"Files re-parsed: {stats['parsed']}")
+    print(f"Method chunks embedded: {stats['embedded']}")
+    print(f"Method chunks re-keyed without re-embedding: {stats['reused']}")
+    print(f"Stale method chunks deleted: {stats['deleted']}")
+    if stats['failed_files']:
+        print(f"Files to retry on the next run: {stats['failed_files']}")
+    cache_stats = get_embedding_cache().stats()
+    print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    print(f"Elapsed: {stats['seconds']}s")
+    if instrumentation.is_enabled():
+        timings = instrumentation.snapshot()
+        print("Stage timings:")
+        for name, span in sorted(timings['spans'].items(), key=lambda item: -item[1]['total_s']):
+            print(f"  {name}: {span['count']} calls, {span['total_s']}s total, {span['mean_ms']} ms mean")
 
 
 if __name__ == "__main__":
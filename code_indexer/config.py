@@ -6,3 +6,41 @@ PROJECT_PATH = os.getenv("PROJECT_PATH", "/path/to/your/java-project")
 # --- ChromaDB Settings ---
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db_storage")
 CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "java_code_analysis")
+
+# --- Vector Store Backend Settings ---
+# "chroma" or "local" (memory-mapped NumPy store, see local_vector_store.py); rca_agent must use the same
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", os.path.join(CHROMA_DB_PATH, "local_vectors"))
+
+# --- Embedding Settings ---
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "textembedding-gecko@001")
+# "stork" (remote model) or "hashing" (deterministic local stand-in for benchmarks); must match across services
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "stork")
+HASHING_EMBEDDING_DIMENSION = int(os.getenv("HASHING_EMBEDDING_DIMENSION", "768"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+
+# --- Incremental Indexing Settings ---
+# Kept inside the ChromaDB directory so deleting the database also resets the manifest
+MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(CHROMA_DB_PATH, "index_manifest.json"))
+
+# --- Chunking Settings ---
+CHUNK_MAX_LINES = int(os.getenv("CHUNK_MAX_LINES", "150"))          # Longer methods are split into parts
+CHUNK_OVERLAP_LINES = int(os.getenv("CHUNK_OVERLAP_LINES", "20"))   # Lines shared by consecutive parts
+
+# --- Keyword Index Settings ---
+# BM25 inverted index over the same chunks, written alongside ChromaDB
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "keyword_index.sqlite3"))
+# Stack-frame lookup table: (package, file, line range) and (class, method) -> chunk id
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "symbol_index.sqlite3"))
+
+# --- Parallel Indexing Pipeline Settings ---
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))        # Chunks per embedding request, across files
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))        # Embedding requests in flight at once
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "1000"))     # Chunks per ChromaDB upsert
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "256"))  # Items buffered between stages
+
+# --- Instrumentation Settings ---
+# Timed spans and counters (see instrumentation.py); bulk indexing prints a summary when enabled
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() in ("1", "true", "yes")
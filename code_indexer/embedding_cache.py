@@ -0,0 +1,106 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+LOOKUP_CHUNK = 500        # Keys per SQL IN (...) lookup, below SQLite's variable limit
+EVICTION_SLACK = 0.05     # Let the cache overshoot max_entries by 5% before trimming
+EVICTION_CHECK_EVERY = 10000  # Rows written by this process between size checks (COUNT(*) scans the table)
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by model id + SHA-256 of the text, backed by SQLite
+    so several processes (indexer, watcher, RCA workers) can share it. Entries are
+    evicted least-recently-used once the cache grows past max_entries.
+    """
+
+    def __init__(self, path: str, model_id: str, max_entries: int = 1_000_000):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.written_since_check = EVICTION_CHECK_EVERY  # So the first write checks a cache left oversized
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode('utf8')).hexdigest()
+
+    def get_many(self, texts: list[str]) -> list:
+        """Returns the cached embedding for each text, or None where it is not cached."""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = list(set(keys[i:i + LOOKUP_CHUNK]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk)
+                for key, blob in rows:
+                    found[key] = array('d', blob).tolist()
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self.conn.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: list[str], embeddings: list[list[float]]):
+        now = time.time()
+        rows = [(self._key(text), array('d', embedding).tobytes(), now) for text, embedding in zip(texts, embeddings)]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self.conn.commit()
+            self.written_since_check += len(rows)
+            if self.written_since_check >= min(EVICTION_CHECK_EVERY, self.max_entries * EVICTION_SLACK):
+                self.written_since_check = 0
+                self._evict()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries * (1 + EVICTION_SLACK):
+            return
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (count - self.max_entries,)
+        )
+        self.conn.commit()
+
+    def get_or_embed(self, texts: list[str], embed_fn) -> list[list[float]]:
+        """
+        Looks all texts up in one pass and calls embed_fn once with the distinct misses.
+        Returns [] if embed_fn fails to return embeddings, like the callers' error path.
+        """
+        results = self.get_many(texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if missing:
+            new_embeddings = embed_fn(missing)
+            if not new_embeddings or len(new_embeddings) != len(missing):
+                if new_embeddings:
+                    print(f"Embedding call returned {len(new_embeddings)} vectors for {len(missing)} texts; discarding them.")
+                return []
+            self.put_many(missing, new_embeddings)
+            by_text = dict(zip(missing, new_embeddings))
+            results = [result if result is not None else by_text[text] for text, result in zip(texts, results)]
+        return results
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
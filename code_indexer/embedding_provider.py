@@ -0,0 +1,71 @@
+import re
+import zlib
+import numpy as np
+
+_TOKEN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+_CAMEL_PART = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+
+class HashingEmbeddings:
+    """
+    Deterministic local stand-in for StorkEmbeddings, with the same embed_documents /
+    embed_query calls. Identifiers, their camelCase parts and adjacent-token pairs are
+    feature-hashed (CRC32, so stable across processes) into a signed vector of the given
+    dimension, then L2-normalized. Texts sharing symbols land close together, which is
+    enough for benchmarks and local runs without the remote model.
+    """
+
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+        self.buckets = {}  # feature -> (index, sign)
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        bucket = self.buckets.get(feature)
+        if bucket is None:
+            h = zlib.crc32(feature.encode('utf8'))
+            bucket = self.buckets[feature] = (h % self.dimension, 1.0 if h & 0x80000000 else -1.0)
+            if len(self.buckets) > 1_000_000:
+                self.buckets.clear()
+        return bucket
+
+    def _embed(self, text: str) -> list[float]:
+        features, previous = [], None
+        for token in _TOKEN.findall(text):
+            lowered = token.lower()
+            features.append(lowered)
+            parts = _CAMEL_PART.findall(token)
+            if len(parts) > 1:
+                features.extend(part.lower() for part in parts)
+            if previous is not None:
+                features.append(f"{previous} {lowered}")
+            previous = lowered
+
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        if features:
+            indices, signs = zip(*(self._bucket(feature) for feature in features))
+            np.add.at(vector, np.array(indices), np.array(signs, dtype=np.float32))
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def create_embed_model(provider: str, model_id: str, dimension: int = 768):
+    """'stork' for the remote StorkEmbeddings model, or 'hashing' for the local HashingEmbeddings stand-in."""
+    if provider == 'hashing':
+        return HashingEmbeddings(dimension)
+    if provider != 'stork':
+        raise ValueError(f"Unknown embedding provider: {provider!r} (expected 'stork' or 'hashing')")
+    from abc.langchain.embeddings import StorkEmbeddings  # Internal package, only needed for the remote model
+    return StorkEmbeddings(provider='GCP_VERTEX_AI', provider_id=model_id)
+
+
+def embedding_model_key(provider: str, model_id: str, dimension: int = 768) -> str:
+    """Identifies the vectors a provider produces, so caches never mix vectors of different models."""
+    return f"hashing-{dimension}" if provider == 'hashing' else model_id
@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+from config import MANIFEST_PATH
+from parser import parse_if_changed, CHUNKER_VERSION
+from vector_store import upsert_to_chromadb, get_stored_embeddings, delete_from_chromadb
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class IndexManifest:
+    """
+    Persistent record of what is already in ChromaDB: for each file its mtime, size
+    and content hash, plus the hash of every method chunk stored under it.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.files = json.load(f)
+
+    def save(self):
+        """Writes to a temp file and renames it in, so a crash never leaves a truncated manifest."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.files, f)
+        os.replace(tmp_path, self.path)
+
+
+def diff_chunks(old_chunks: dict, chunks: list[dict]) -> tuple[list[dict], dict, list[str], dict]:
+    """
+    Compares freshly parsed chunks against the chunk hashes recorded for a file.
+    Returns (chunks to upsert, {new id: old id whose vector can be reused}, stale ids, new chunk hashes).
+    A method that only moved (same body, new line range) gets a new id but keeps its vector.
+    """
+    new_chunks = {chunk['id']: content_hash(chunk['code'].encode('utf8')) for chunk in chunks}
+    stale_ids = [chunk_id for chunk_id in old_chunks if chunk_id not in new_chunks]
+    to_upsert = [chunk for chunk in chunks if old_chunks.get(chunk['id']) != new_chunks[chunk['id']]]
+
+    stale_by_hash = {old_chunks[chunk_id]: chunk_id for chunk_id in stale_ids}
+    reuse = {chunk['id']: stale_by_hash[new_chunks[chunk['id']]]
+             for chunk in to_upsert if new_chunks[chunk['id']] in stale_by_hash}
+    return to_upsert, reuse, stale_ids, new_chunks
+
+
+def is_unchanged(file_path: str, manifest: IndexManifest) -> bool:
+    """Cheap check on mtime and size only; no file read. Files chunked by an older chunker count as changed."""
+    entry = manifest.files.get(file_path)
+    if not entry or entry.get('chunker') != CHUNKER_VERSION:
+        return False
+    st = os.stat(file_path)
+    return entry['mtime'] == st.st_mtime and entry['size'] == st.st_size
+
+
+def known_sha256(file_path: str, manifest: IndexManifest):
+    """The recorded content hash, if the file's chunks are current; lets the parser skip unchanged content."""
+    entry = manifest.files.get(file_path)
+    return entry['sha256'] if entry and entry.get('chunker') == CHUNKER_VERSION else None
+
+
+def plan_file_update(parsed: dict, manifest: IndexManifest):
+    """
+    Turns the output of parser.parse_if_changed into the work needed to update the index.
+    Returns (chunks to upsert, {chunk id: reusable vector}, stale chunk ids, new manifest entry),
+    or None if the content is unchanged (the entry's mtime/size are refreshed in place).
+    """
+    file_path = parsed['file_path']
+    entry = manifest.files.get(file_path)
+    if parsed['chunks'] is None:
+        # Touched but not edited (e.g. a branch switch back and forth)
+        entry['mtime'], entry['size'] = parsed['mtime'], parsed['size']
+        return None
+
+    to_upsert, reuse, stale_ids, new_chunks = diff_chunks(entry['chunks'] if entry else {}, parsed['chunks'])
+    stored = get_stored_embeddings(list(reuse.values()))
+    known_embeddings = {new_id: stored[old_id] for new_id, old_id in reuse.items() if old_id in stored}
+    new_entry = {'mtime': parsed['mtime'], 'size': parsed['size'], 'sha256': parsed['sha256'],
+                 'chunker': parsed['chunker'], 'chunks': new_chunks}
+    return to_upsert, known_embeddings, stale_ids, new_entry
+
+
+def sync_file(file_path: str, manifest: IndexManifest) -> dict:
+    """
+    Brings one file's chunks in ChromaDB up to date with the file on disk.
+    Unchanged files are skipped on mtime/size (or content hash), and only new or
+    edited methods are sent to the embedding model. Returns per-file counters.
+    """
+    stats = {'parsed': 0, 'embedded': 0, 'reused': 0, 'deleted': 0}
+    if is_unchanged(file_path, manifest):
+        return stats
+
+    plan = plan_file_update(parse_if_changed(file_path, known_sha256(file_path, manifest)), manifest)
+    if plan is None:
+        return stats
+
+    to_upsert, known_embeddings, stale_ids, new_entry = plan
+    stats['parsed'] = 1
+    if upsert_to_chromadb(to_upsert, known_embeddings) < len(to_upsert):
+        # Leave the manifest entry untouched so the next run retries this file
+        print(f"Incomplete upsert for {file_path}; will retry on the next run.")
+        return stats
+    delete_from_chromadb(stale_ids)
+
+    manifest.files[file_path] = new_entry
+    stats['embedded'] = len(to_upsert) - len(known_embeddings)
+    stats['reused'] = len(known_embeddings)
+    stats['deleted'] = len(stale_ids)
+    return stats
+
+
+def remove_file(file_path: str, manifest: IndexManifest) -> int:
+    """Deletes every chunk recorded for a file that no longer exists. Returns how many were removed."""
+    entry = manifest.files.pop(file_path, None)
+    if not entry:
+        return 0
+    delete_from_chromadb(list(entry['chunks']))
+    return len(entry['chunks'])
@@ -0,0 +1,259 @@
+import os
+import time
+import queue
+import threading
+import instrumentation
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from config import (
+    PARSE_WORKERS,
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
+    UPSERT_BATCH_SIZE,
+    PIPELINE_QUEUE_SIZE,
+)
+from parser import parse_if_changed
+from vector_store import embed_chunks, upsert_embedded_chunks, delete_from_chromadb
+from index_manifest import IndexManifest, is_unchanged, known_sha256, plan_file_update
+
+_DONE = object()  # End-of-stream marker passed down every queue
+MANIFEST_SAVE_EVERY = 500  # Committed files between manifest checkpoints
+
+
+class _FileTracker:
+    """
+    Tracks how many chunks of each file are still on their way to ChromaDB.
+    A file's stale chunks are deleted and its manifest entry committed only once
+    every chunk from it has been upserted, so an interrupted run is retried cleanly.
+    """
+
+    def __init__(self, manifest: IndexManifest):
+        self.manifest = manifest
+        self.lock = threading.Lock()
+        self.pending = {}  # file_path -> [chunks left, stale ids, new manifest entry]
+        self.failed = set()
+        self.stats = {'parsed': 0, 'embedded': 0, 'reused': 0, 'deleted': 0, 'failed_files': 0}
+        self.committed = 0
+
+    def register(self, file_path: str, chunk_count: int, stale_ids: list[str], new_entry: dict):
+        with self.lock:
+            self.stats['parsed'] += 1
+            self.pending[file_path] = [chunk_count, stale_ids, new_entry]
+        if chunk_count == 0:
+            self._finish(file_path)
+
+    def chunks_done(self, chunks: list[dict], succeeded: bool):
+        finished = []
+        with self.lock:
+            for chunk in chunks:
+                file_path = chunk['metadata']['file_path']
+                if not succeeded:
+                    self.failed.add(file_path)
+                entry = self.pending[file_path]
+                entry[0] -= 1
+                if entry[0] == 0:
+                    finished.append(file_path)
+        for file_path in finished:
+            self._finish(file_path)
+
+    def _finish(self, file_path: str):
+        with self.lock:
+            _, stale_ids, new_entry = self.pending.pop(file_path)
+            if file_path in self.failed:
+                # Leave the old manifest entry so the next run retries this file
+                self.stats['failed_files'] += 1
+                return
+        try:
+            delete_from_chromadb(stale_ids)
+        except Exception as e:
+            print(f"Error deleting stale chunks of {file_path}: {e}")
+            self.file_failed(file_path)
+            return
+        with self.lock:
+            self.manifest.files[file_path] = new_entry
+            self.stats['deleted'] += len(stale_ids)
+            self.committed += 1
+            if self.committed % MANIFEST_SAVE_EVERY == 0:
+                self.manifest.save()
+
+    def file_failed(self, file_path: str):
+        """Counts a file that never reached ChromaDB; its manifest entry is left for the next run to retry."""
+        with self.lock:
+            self.stats['failed_files'] += 1
+
+
+def _drain(q: queue.Queue, on_item=None):
+    """Consumes a queue up to its end marker after a stage has failed, so the stages before it never block."""
+    while (item := q.get()) is not _DONE:
+        if on_item:
+            on_item(item)
+
+
+def _discover(project_path: str, manifest: IndexManifest, paths: queue.Queue, seen_files: set):
+    """Stage 1: walk the tree and queue Java files whose mtime/size changed."""
+    try:
+        for root, dirs, files in os.walk(project_path):
+            for file in files:
+                if file.endswith(".java"):
+                    file_path = os.path.join(root, file)
+                    try:
+                        changed = not is_unchanged(file_path, manifest)
+                    except OSError:
+                        continue  # Deleted during the walk; its chunks are removed as a missing file
+                    seen_files.add(file_path)
+                    if changed:
+                        paths.put((file_path, known_sha256(file_path, manifest)))
+    except Exception as e:
+        print(f"Error discovering files: {e}")
+    finally:
+        paths.put(_DONE)
+
+
+def _parse(paths: queue.Queue, parsed: queue.Queue, workers: int, tracker: _FileTracker):
+    """
+    Stage 2: parse files in a process pool, keeping a bounded number of files in flight.
+    Futures are queued from this thread in submission order; the pool's own threads only release a slot.
+    """
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while (item := paths.get()) is not _DONE:
+                in_flight.acquire()
+                try:
+                    future = pool.submit(parse_if_changed, *item)
+                except Exception as e:
+                    # e.g. BrokenProcessPool: nothing more can be parsed this run
+                    in_flight.release()
+                    print(f"Error submitting {item[0]} for parsing: {e}")
+                    tracker.file_failed(item[0])
+                    _drain(paths, lambda rest: tracker.file_failed(rest[0]))
+                    break
+                future.add_done_callback(lambda f: in_flight.release())
+                parsed.put((item[0], future))
+    except Exception as e:
+        print(f"Error in parse stage: {e}")
+    finally:
+        parsed.put(_DONE)
+
+
+def _batch(parsed: queue.Queue, batches: queue.Queue, manifest: IndexManifest, tracker: _FileTracker):
+    """Stage 3: diff parsed files against the manifest and pack changed chunks into full embedding batches."""
+    batch, known = [], {}
+
+    def flush(batch: list[dict]):
+        # Only this batch's reusable vectors go with it; the rest wait for their chunks in later batches
+        batches.put((batch, {c['id']: known.pop(c['id']) for c in batch if c['id'] in known}))
+
+    try:
+        while (item := parsed.get()) is not _DONE:
+            file_path, future = item
+            try:
+                result = future.result()
+                if result['chunks'] is not None:
+                    instrumentation.observe('extract_method_chunks', result['parse_seconds'])
+                plan = plan_file_update(result, manifest)
+            except Exception as e:
+                print(f"Error parsing {file_path}: {e}")
+                tracker.file_failed(file_path)
+                continue
+            if plan is None:
+                continue
+
+            to_upsert, known_embeddings, stale_ids, new_entry = plan
+            tracker.register(file_path, len(to_upsert), stale_ids, new_entry)
+            known.update(known_embeddings)
+            for chunk in to_upsert:
+                batch.append(chunk)
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    flush(batch)
+                    batch = []
+        if batch:
+            flush(batch)
+    except Exception as e:
+        print(f"Error in batch stage: {e}")
+        _drain(parsed, lambda rest: tracker.file_failed(rest[0]))
+    finally:
+        batches.put(_DONE)
+
+
+def _embed(batches: queue.Queue, embedded: queue.Queue, tracker: _FileTracker):
+    """Stage 4: call the embedding model with at most EMBED_CONCURRENCY requests in flight."""
+    in_flight = threading.BoundedSemaphore(EMBED_CONCURRENCY)
+
+    def embed_batch(batch: list[dict], known: dict):
+        try:
+            embeddings = embed_chunks(batch, known)
+        except Exception as e:
+            print(f"Error embedding batch: {e}")
+            embeddings = []
+        finally:
+            in_flight.release()
+        if embeddings:
+            with tracker.lock:
+                tracker.stats['embedded'] += len(batch) - sum(1 for c in batch if c['id'] in known)
+                tracker.stats['reused'] += sum(1 for c in batch if c['id'] in known)
+        embedded.put((batch, embeddings))
+
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as pool:
+        while (item := batches.get()) is not _DONE:
+            in_flight.acquire()
+            pool.submit(embed_batch, *item)
+    embedded.put(_DONE)
+
+
+def _upsert(embedded: queue.Queue, tracker: _FileTracker):
+    """Stage 5: write embedded chunks to ChromaDB in large bulk upserts."""
+    chunks, embeddings = [], []
+
+    def flush():
+        try:
+            upsert_embedded_chunks(chunks, embeddings)
+            print(f"Upserted {len(chunks)} vectors to ChromaDB.")
+            tracker.chunks_done(chunks, succeeded=True)
+        except Exception as e:
+            print(f"Error upserting batch: {e}")
+            tracker.chunks_done(chunks, succeeded=False)
+
+    while (item := embedded.get()) is not _DONE:
+        batch, batch_embeddings = item
+        if not batch_embeddings:
+            print("Skipping batch due to embedding generation failure.")
+            tracker.chunks_done(batch, succeeded=False)
+            continue
+        chunks.extend(batch)
+        embeddings.extend(batch_embeddings)
+        if len(chunks) >= UPSERT_BATCH_SIZE:
+            flush()
+            chunks, embeddings = [], []
+    if chunks:
+        flush()
+
+
+def run_index_pipeline(project_path: str, manifest: IndexManifest, workers: int = PARSE_WORKERS) -> tuple[dict, set]:
+    """
+    Indexes a project through five stages connected by bounded queues:
+    discovery -> parsing (process pool) -> cross-file batching -> concurrent embedding -> bulk upsert.
+    A slow stage fills its input queue and blocks the stages before it, so memory stays bounded.
+    Returns (counters, set of Java files seen on disk).
+    """
+    paths = queue.Queue(PIPELINE_QUEUE_SIZE)
+    parsed = queue.Queue(PIPELINE_QUEUE_SIZE)
+    batches = queue.Queue(max(1, PIPELINE_QUEUE_SIZE // EMBED_BATCH_SIZE) + EMBED_CONCURRENCY)
+    embedded = queue.Queue(EMBED_CONCURRENCY * 2)
+    tracker = _FileTracker(manifest)
+    seen_files = set()
+
+    started = time.perf_counter()
+    stages = [
+        threading.Thread(target=_discover, args=(project_path, manifest, paths, seen_files), name="discover"),
+        threading.Thread(target=_parse, args=(paths, parsed, workers, tracker), name="parse"),
+        threading.Thread(target=_batch, args=(parsed, batches, manifest, tracker), name="batch"),
+        threading.Thread(target=_embed, args=(batches, embedded, tracker), name="embed"),
+        threading.Thread(target=_upsert, args=(embedded, tracker), name="upsert"),
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    tracker.stats['seconds'] = round(time.perf_counter() - started, 2)
+    return tracker.stats, seen_files
@@ -0,0 +1,182 @@
+import time
+import inspect
+import threading
+import functools
+import contextvars
+
+# Spans time a block into a per-name histogram and, when a request trace is active in the
+# current context, into that trace too. Disabled, span() hands back one shared no-op object
+# and @timed functions are called straight through, so the cost is a global lookup.
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # span name -> [count per bucket..., +Inf count, sum of seconds]
+_current_trace = contextvars.ContextVar('instrumentation_trace', default=None)
+
+
+def configure(enabled: bool):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def observe(name: str, seconds: float):
+    """Records one duration for name, in its histogram and in the active trace."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[len(BUCKETS)] += 1
+        histogram[-1] += seconds
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def count(name: str, value: int = 1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def span(name: str):
+    """Context manager timing its block under name."""
+    return _Span(name) if _enabled else _NOOP_SPAN
+
+
+def timed(name: str = None):
+    """Decorator form of span for sync and async functions; the span defaults to the function name."""
+    def decorate(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with _Span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Trace:
+    """Per-request timings: milliseconds and call count per span name, accumulated across threads sharing the context."""
+    __slots__ = ('spans', 'started')
+
+    def __init__(self):
+        self.spans = {}
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def to_dict(self) -> dict:
+        timings = {name: {'ms': round(seconds * 1000, 3), 'calls': calls} for name, (calls, seconds) in self.spans.items()}
+        return {'total_ms': round((time.perf_counter() - self.started) * 1000, 3), 'spans': timings}
+
+
+def start_trace():
+    """Starts collecting spans for the current context (request/task); returns the Trace, or None when disabled."""
+    if not _enabled:
+        return None
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def snapshot() -> dict:
+    """Totals per span and counter, for printed summaries."""
+    with _lock:
+        spans = {name: {'count': sum(h[:-1]), 'total_s': round(h[-1], 3), 'mean_ms': round(h[-1] * 1000 / max(1, sum(h[:-1])), 3)}
+                 for name, h in _histograms.items()}
+        counters = {name + ''.join(f",{k}={v}" for k, v in labels): value for (name, labels), value in _counters.items()}
+    return {'spans': spans, 'counters': counters}
+
+
+def _labels(pairs) -> str:
+    return ','.join(f'{k}="{str(v)}"' for k, v in pairs)
+
+
+def render_prometheus(prefix: str) -> str:
+    """Text exposition format: {prefix}_<counter>_total and one {prefix}_span_seconds histogram labelled by span."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((name, list(h)) for name, h in _histograms.items())
+    lines = []
+    for name in sorted({name for (name, _), _ in counters}):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for (counter, labels), value in counters:
+            if counter == name:
+                lines.append(f"{prefix}_{name}_total{{{_labels(labels)}}} {value}" if labels else f"{prefix}_{name}_total {value}")
+    if histograms:
+        lines.append(f"# TYPE {prefix}_span_seconds histogram")
+    for name, h in histograms:
+        cumulative = 0
+        for bound, hits in zip(BUCKETS + ('+Inf',), h[:-1]):
+            cumulative += hits
+            lines.append(f'{prefix}_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_span_seconds_sum{{span="{name}"}} {h[-1]:.6f}')
+        lines.append(f'{prefix}_span_seconds_count{{span="{name}"}} {cumulative}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
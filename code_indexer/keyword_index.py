@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_BOOST = 3          # Method and class names count this many times over body identifiers
+RELOAD_CHECK_SECONDS = 5.0
+MAX_QUERY_TERMS = 32
+MAX_POSTINGS_PER_TERM = 1000  # Highest-impact postings read per query term; bounds work for common terms
+RRF_K = 60               # Reciprocal rank fusion constant
+
+_IDENTIFIER = re.compile(r'[A-Za-z_$][A-Za-z0-9_$]*')
+_CAMEL_PART = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+')
+_FRAME = re.compile(r'at\s+((?:[\w$]+\.)+)([\w$<>]+)\(')
+_EXCEPTION = re.compile(r'\b([A-Z][\w$]*(?:Exception|Error))\b')
+_CAMEL_IDENTIFIER = re.compile(r'\b[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]*)+\b')
+_JDK_PACKAGES = ('java.', 'javax.', 'sun.', 'jdk.', 'com.sun.')
+STOP_WORDS = {
+    'abstract', 'boolean', 'break', 'byte', 'case', 'catch', 'char', 'class', 'continue', 'default', 'do',
+    'double', 'else', 'enum', 'extends', 'false', 'final', 'finally', 'float', 'for', 'if', 'implements',
+    'import', 'instanceof', 'int', 'interface', 'long', 'new', 'null', 'package', 'private', 'protected',
+    'public', 'return', 'short', 'static', 'super', 'switch', 'synchronized', 'this', 'throw', 'throws',
+    'true', 'try', 'void', 'var', 'while', 'string', 'java', 'get', 'set', 'the', 'and', 'of', 'to', 'in', 'is',
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-cased identifiers plus their camelCase parts, so 'UserService' matches both
+    'userservice' and 'user'/'service'. Words inside string literals are picked up too.
+    """
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        lowered = identifier.lower()
+        if lowered in STOP_WORDS:
+            continue
+        terms.append(lowered)
+        parts = _CAMEL_PART.findall(identifier)
+        if len(parts) > 1:
+            terms.extend(p.lower() for p in parts if len(p) > 2 and p.lower() not in STOP_WORDS)
+    return terms
+
+
+def chunk_terms(chunk: dict) -> Counter:
+    """Term frequencies for one chunk: its code plus boosted method and class names."""
+    terms = Counter(tokenize(chunk['code']))
+    metadata = chunk.get('metadata', {})
+    for field in ('method_name', 'class_name'):
+        if metadata.get(field):
+            # Simple names only; package segments would be boosted on every chunk of the package
+            for term in tokenize(metadata[field].rsplit('.', 1)[-1]):
+                terms[term] += FIELD_BOOST
+    file_name = os.path.splitext(os.path.basename(metadata.get('file_path', '')))[0]
+    for term in tokenize(file_name):
+        terms[term] += FIELD_BOOST
+    return terms
+
+
+def extract_query_terms(error_log: str, extra_terms: list[str] = ()) -> list[str]:
+    """
+    Exact symbols from an error log: exception types, application class and method names
+    from stack frames (JDK frames are skipped as noise) and CamelCase identifiers.
+    """
+    symbols = list(extra_terms)
+    for line in error_log.splitlines():
+        symbols += _EXCEPTION.findall(line)
+        frame = _FRAME.search(line)
+        if frame is None:
+            symbols += _CAMEL_IDENTIFIER.findall(line)
+        elif not frame.group(1).startswith(_JDK_PACKAGES):
+            symbols.append(frame.group(1).rstrip('.').rsplit('.', 1)[-1])
+            symbols.append(frame.group(2))
+    terms = dict.fromkeys(term for symbol in symbols for term in tokenize(symbol))
+    return list(terms)[:MAX_QUERY_TERMS]
+
+
+def reciprocal_rank_fusion(ranked_lists: list[list[str]], weights: list[float] = None, k: int = RRF_K) -> list[str]:
+    """
+    Merges ranked id lists by summing weight / (k + rank). Ties keep first-seen order,
+    so the fused ranking is deterministic.
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    scores = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, item in enumerate(ranked):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank + 1)
+    first_seen = {item: i for i, item in enumerate(scores)}
+    return sorted(scores, key=lambda item: (-scores[item], first_seen[item]))
+
+
+class KeywordIndex:
+    """
+    Persistent inverted index over code chunks, queried with BM25. Term frequencies are
+    stored per chunk in SQLite (written by the indexer alongside ChromaDB). Readers build
+    in-memory postings on first search and rebuild them in the background when the index changes: each
+    term holds its chunks sorted by precomputed BM25 impact, so a lookup reads at most
+    MAX_POSTINGS_PER_TERM entries per term and does no I/O.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, terms TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        self.conn.commit()
+
+        # In-memory search state, rebuilt when the stored generation moves on
+        self.loaded_generation = None
+        self.last_check = 0.0
+        self.rebuilding = False
+        self.ids = []
+        self.postings = {}  # term -> (chunk positions, BM25 impacts), highest impact first
+
+    # --- Index-time writes ---
+    def _bump_generation(self):
+        self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def upsert(self, chunks: list[dict]):
+        if not chunks:
+            return
+        rows = [(chunk['id'], json.dumps(chunk_terms(chunk))) for chunk in chunks]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO chunks (id, terms) VALUES (?, ?)", rows)
+            self._bump_generation()
+            self.conn.commit()
+
+    def delete(self, ids: list[str]):
+        if not ids:
+            return
+        with self.lock:
+            self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+            self._bump_generation()
+            self.conn.commit()
+
+    # --- Query-time reads ---
+    def _generation(self) -> int:
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _refresh(self):
+        """
+        Picks up index changes. Only the first search in a process builds the postings inline;
+        later changes are rebuilt on a background thread while searches keep using the current ones.
+        """
+        now = time.monotonic()
+        if self.loaded_generation is not None and now - self.last_check < RELOAD_CHECK_SECONDS:
+            return
+        self.last_check = now
+        generation = self._generation()
+        if generation == self.loaded_generation:
+            return
+        if self.loaded_generation is None:
+            self._swap(*self._build())
+        elif not self.rebuilding:
+            self.rebuilding = True
+            threading.Thread(target=self._rebuild, name="keyword-index-rebuild", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            built = self._build()
+        except Exception as e:
+            print(f"Error rebuilding keyword index: {e}")
+            built = None
+        with self.lock:
+            self.rebuilding = False
+            if built is not None:
+                self._swap(*built)
+
+    def _swap(self, generation: int, ids: list[str], postings: dict):
+        self.ids = ids
+        self.postings = postings
+        self.loaded_generation = generation
+
+    def _build(self) -> tuple[int, list[str], dict]:
+        """Reads every chunk's terms over its own connection and returns (generation, ids, postings)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Read before the rows: a write in between only means the next check rebuilds again
+            generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+            ids, lengths, positions, frequencies = [], [], {}, {}
+            for chunk_id, terms_json in conn.execute("SELECT id, terms FROM chunks"):
+                position = len(ids)
+                ids.append(chunk_id)
+                terms = json.loads(terms_json)
+                lengths.append(sum(terms.values()))
+                for term, tf in terms.items():
+                    positions.setdefault(term, []).append(position)
+                    frequencies.setdefault(term, []).append(tf)
+        finally:
+            conn.close()
+
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = float(lengths.mean()) if ids else 0.0
+        postings = {}
+        for term, term_positions in positions.items():
+            term_positions = np.asarray(term_positions, dtype=np.int32)
+            tf = np.asarray(frequencies[term], dtype=np.float32)
+            idf = np.log1p((len(ids) - len(term_positions) + 0.5) / (len(term_positions) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[term_positions] / avg_length)
+            impacts = (idf * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+            order = np.argsort(-impacts, kind='stable')
+            postings[term] = (term_positions[order], impacts[order])
+        return generation, ids, postings
+
+    def search(self, query_terms: list[str], top_k: int = 10) -> list[tuple[str, float]]:
+        """Returns up to top_k (chunk id, BM25 score) pairs, best first."""
+        with self.lock:
+            self._refresh()
+            all_positions, all_scores = [], []
+            for term in dict.fromkeys(query_terms):
+                posting = self.postings.get(term)
+                if posting is not None:
+                    all_positions.append(posting[0][:MAX_POSTINGS_PER_TERM])
+                    all_scores.append(posting[1][:MAX_POSTINGS_PER_TERM])
+            if not all_positions:
+                return []
+
+            positions, inverse = np.unique(np.concatenate(all_positions), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+            else:
+                best = np.arange(len(scores))
+            # Position breaks ties so results are stable across runs
+            best = sorted(best, key=lambda i: (-scores[i], positions[i]))
+            return [(self.ids[positions[i]], float(scores[i])) for i in best]
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+
+# Process-wide clients (vector collection, embedding model, SQLite indexes, HTTP pools) are
+# created on first use instead of at import, so importing a module stays cheap and a missing
+# collection only fails the call that needs it. Each instance belongs to the process that
+# created it: a forked child (uvicorn/gunicorn workers, process pools) builds its own rather
+# than sharing the parent's connections, locks and threads.
+
+_providers = []
+_inherited = []  # Parent-process instances seen after a fork; kept referenced so their finalizers never run in the child
+
+
+class LazyResource:
+    """A callable provider: get_thing() returns this process's instance, creating it on the first call."""
+
+    def __init__(self, name: str, factory, close=None):
+        self.name = name
+        self.factory = factory
+        self.close = close
+        self.lock = threading.Lock()
+        self.instance = None
+        self.pid = None
+        _providers.append(self)
+
+    def __call__(self):
+        instance = self.instance
+        if instance is not None and self.pid == os.getpid():
+            return instance
+        with self.lock:
+            if self.pid != os.getpid():
+                _forget(self)
+            if self.instance is None:
+                # A failing factory (e.g. the collection does not exist yet) is retried on the next call
+                self.instance = self.factory()
+                self.pid = os.getpid()
+            return self.instance
+
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None and self.pid == os.getpid()
+
+    def reset(self):
+        """Drops (and closes) this process's instance; the next call creates a fresh one."""
+        with self.lock:
+            instance, owned = self.instance, self.pid == os.getpid()
+            self.instance = self.pid = None
+        if instance is not None and owned and self.close:
+            self.close(instance)
+
+
+def _forget(provider: LazyResource):
+    if provider.instance is not None:
+        _inherited.append(provider.instance)
+    provider.instance = provider.pid = None
+
+
+def _after_fork_in_child():
+    for provider in _providers:
+        provider.lock = threading.Lock()  # Another parent thread may have held it at fork time
+        _forget(provider)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def warmup(*providers: LazyResource) -> dict:
+    """
+    Creates providers ahead of the first request (all registered ones by default) and returns
+    the milliseconds each took. Failures are reported and left for the first real call to retry.
+    """
+    timings = {}
+    for provider in providers or list(_providers):
+        started = time.perf_counter()
+        try:
+            provider()
+        except Exception as e:
+            print(f"Warmup of {provider.name} failed: {e}")
+            continue
+        timings[provider.name] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
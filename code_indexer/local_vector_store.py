@@ -0,0 +1,509 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+
+LOOKUP_CHUNK = 500          # Ids per SQL IN (...) lookup, below SQLite's variable limit
+BRUTE_FORCE_BLOCK = 65536   # Rows per matrix product when scanning everything
+IVF_MIN_ROWS = 50_000       # Below this a full scan is both exact and fast enough
+IVF_NPROBE = 16             # Inverted lists searched per query
+IVF_TRAIN_SAMPLE = 100_000
+IVF_ITERATIONS = 12
+IVF_REBUILD_FRACTION = 0.10 # Rebuild once rows added since the last build reach this share
+COMPACT_FRACTION = 0.25     # Rewrite the matrix once this share of rows are dead
+RELOAD_CHECK_SECONDS = 1.0
+
+_IVF_FILES = ('.centroids.npy', '.order.npy', '.offsets.npy', '.vectors.npy', '.norms.npy')
+_OPERATORS = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+
+def _where_sql(where: dict) -> tuple[str, list]:
+    """Translates a Chroma-style metadata filter ({field: value}, $eq/$ne/$gt/.../$in/$nin, $and/$or) to SQL."""
+    clauses, params = [], []
+    for key, condition in where.items():
+        if key in ('$and', '$or'):
+            parts = [_where_sql(sub) for sub in condition]
+            joiner = ' AND ' if key == '$and' else ' OR '
+            clauses.append('(' + joiner.join(sql for sql, _ in parts) + ')')
+            params += [param for _, sub_params in parts for param in sub_params]
+            continue
+        field = f"json_extract(metadata, '$.{key}')"
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, value in condition.items():
+            if operator in ('$in', '$nin'):
+                placeholders = ','.join('?' * len(value))
+                clauses.append(f"{field} {'IN' if operator == '$in' else 'NOT IN'} ({placeholders})")
+                params += list(value)
+            elif operator in _OPERATORS:
+                clauses.append(f"{field} {_OPERATORS[operator]} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported where operator {operator!r} on {key!r}")
+    return ' AND '.join(clauses) or '1', params
+
+
+def _top_k(rows: np.ndarray, distances: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """The k smallest distances and their rows, nearest first; ties broken by row for stable results."""
+    if len(distances) > k:
+        keep = np.argpartition(distances, k - 1)[:k]
+        rows, distances = rows[keep], distances[keep]
+    order = np.lexsort((rows, distances))
+    return rows[order], distances[order]
+
+
+class LocalVectorStore:
+    """
+    In-process vector store with the subset of the Chroma collection API this repo uses
+    (upsert, query, get, delete, count), so it can stand in for collection anywhere.
+
+    Vectors live in an append-only float32 matrix memory-mapped from disk, with squared
+    L2 distances like Chroma's default. Ids, documents and metadata are kept in SQLite;
+    replaced or deleted rows are tombstoned and reclaimed by compact(). Small collections
+    are searched exactly with blocked matrix products. Past IVF_MIN_ROWS, build_index()
+    clusters rows into an IVF index (k-means inverted lists), and queries scan only the
+    IVF_NPROBE nearest lists plus rows added since the last build.
+
+    One process writes (the indexer); any number read. Readers re-map the files when
+    the stored generation changes.
+    """
+
+    def __init__(self, path: str, nprobe: int = IVF_NPROBE):
+        self.path = path
+        self.nprobe = nprobe
+        self.lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(path, 'rows.sqlite3'), check_same_thread=False, timeout=30,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables(self.conn, 'rows')
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        for key, value in (('generation', '0'), ('layout', '0'), ('rows', '0'), ('vectors_file', 'vectors.0')):
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+        # Mapped state, rebuilt when the generation moves on
+        self.loaded_generation = None
+        self.loaded_layout = None
+        self.last_check = 0.0
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.live = np.zeros(0, dtype=bool)
+        self.ivf = None
+
+    @staticmethod
+    def _create_tables(conn, table: str):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (row INTEGER PRIMARY KEY, id TEXT NOT NULL, "
+                     f"document TEXT, metadata TEXT NOT NULL, live INTEGER NOT NULL DEFAULT 1)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_id ON {table} (id, live)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_file_path ON {table} (json_extract(metadata, '$.file_path'))")
+
+    def _meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _bump(self, layout: bool = False):
+        self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        if layout:
+            # Row numbers changed (compaction): readers must not mix old and new numbering
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'layout'")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # --- Writes (indexer) ---
+    @staticmethod
+    def _write_rows(file_path: str, offset_rows: int, width: int, data: np.ndarray):
+        # Write at the committed end, overwriting any tail left by an interrupted write
+        with open(file_path, 'r+b' if os.path.exists(file_path) else 'wb') as f:
+            f.seek(offset_rows * width * 4)
+            f.write(np.ascontiguousarray(data, dtype=np.float32).tobytes())
+            f.truncate()
+
+    def upsert(self, ids: list[str], embeddings, documents: list[str] = None, metadatas: list[dict] = None):
+        # A repeated id in one call keeps its last occurrence, like a sequence of upserts
+        last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        keep = sorted(last.values())
+        vectors = np.asarray(embeddings, dtype=np.float32)[keep]
+        ids = [ids[i] for i in keep]
+        documents = [documents[i] for i in keep] if documents is not None else [None] * len(ids)
+        metadatas = [metadatas[i] or {} for i in keep] if metadatas is not None else [{}] * len(ids)
+        if not ids:
+            return
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                dimension = int(self._meta('dimension', vectors.shape[1]))
+                if vectors.shape[1] != dimension:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {dimension}")
+                self._set_meta('dimension', dimension)
+                n = int(self._meta('rows'))
+                prefix = self._meta('vectors_file')
+                self._write_rows(self._file(f"{prefix}.f32"), n, dimension, vectors)
+                self._write_rows(self._file(f"{prefix}.norms.f32"), n, 1, np.einsum('ij,ij->i', vectors, vectors))
+
+                for i in range(0, len(ids), LOOKUP_CHUNK):
+                    chunk = ids[i:i + LOOKUP_CHUNK]
+                    self.conn.execute(f"UPDATE rows SET live = 0 WHERE live = 1 AND id IN ({','.join('?' * len(chunk))})", chunk)
+                self.conn.executemany(
+                    "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(n + i, chunk_id, document, json.dumps(metadata))
+                     for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas))]
+                )
+                self._set_meta('rows', n + len(ids))
+                self._bump()
+                self.conn.execute("COMMIT")
+                self.last_check = 0.0  # The writer sees its own writes immediately
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, ids: list[str] = None, where: dict = None):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if ids:
+                    for i in range(0, len(ids), LOOKUP_CHUNK):
+                        chunk = ids[i:i + LOOKUP_CHUNK]
+                        self.conn.execute(f"UPDATE rows SET live = 0 WHERE live = 1 AND id IN ({','.join('?' * len(chunk))})", chunk)
+                if where:
+                    sql, params = _where_sql(where)
+                    self.conn.execute(f"UPDATE rows SET live = 0 WHERE live = 1 AND {sql}", params)
+                self._bump()
+                self.conn.execute("COMMIT")
+                self.last_check = 0.0
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM rows WHERE live = 1").fetchone()[0]
+
+    # --- Reads ---
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self.loaded_generation is not None and now - self.last_check < RELOAD_CHECK_SECONDS:
+            return
+        self.last_check = now
+        self.conn.execute("BEGIN")
+        try:
+            generation = self._meta('generation')
+            if generation == self.loaded_generation:
+                return
+            n, dimension = int(self._meta('rows')), int(self._meta('dimension', 0))
+            prefix, ivf_prefix = self._meta('vectors_file'), self._meta('ivf_file', '')
+            ivf_rows = int(self._meta('ivf_rows', 0))
+            layout = self._meta('layout')
+            dead = [row for (row,) in self.conn.execute("SELECT row FROM rows WHERE live = 0")]
+        finally:
+            self.conn.execute("COMMIT")
+
+        if n and dimension:
+            self.vectors = np.memmap(self._file(f"{prefix}.f32"), dtype=np.float32, mode='r', shape=(n, dimension))
+            self.norms = np.memmap(self._file(f"{prefix}.norms.f32"), dtype=np.float32, mode='r', shape=(n,))
+        else:
+            self.vectors = np.zeros((0, dimension), dtype=np.float32)
+            self.norms = np.zeros(0, dtype=np.float32)
+        self.live = np.ones(n, dtype=bool)
+        self.live[dead] = False
+        self.ivf = None
+        if ivf_prefix:
+            self.ivf = {
+                'centroids': np.load(self._file(f"{ivf_prefix}.centroids.npy")),
+                'order': np.load(self._file(f"{ivf_prefix}.order.npy"), mmap_mode='r'),
+                'offsets': np.load(self._file(f"{ivf_prefix}.offsets.npy")),
+                'vectors': np.load(self._file(f"{ivf_prefix}.vectors.npy"), mmap_mode='r'),
+                'norms': np.load(self._file(f"{ivf_prefix}.norms.npy"), mmap_mode='r'),
+                'rows': ivf_rows,
+            }
+        self.loaded_generation, self.loaded_layout = generation, layout
+
+    def _distances(self, rows: np.ndarray, query: np.ndarray, query_norm: float) -> np.ndarray:
+        return self.norms[rows] - 2 * (self.vectors[rows] @ query) + query_norm
+
+    def _search_all(self, queries: np.ndarray, k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Exact search of every live row, a block of rows at a time for all queries at once."""
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        best = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+        for start in range(0, len(self.vectors), BRUTE_FORCE_BLOCK):
+            block = slice(start, start + BRUTE_FORCE_BLOCK)
+            distances = self.norms[block, None] - 2 * (self.vectors[block] @ queries.T) + query_norms[None, :]
+            live_rows = np.flatnonzero(self.live[block])
+            for q in range(len(queries)):
+                rows = np.concatenate([best[q][0], live_rows + start])
+                best[q] = _top_k(rows, np.concatenate([best[q][1], distances[live_rows, q]]), k)
+        return best
+
+    def _search_rows(self, queries: np.ndarray, candidates, k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Exact search restricted to candidate rows (per query, or one array shared by all queries)."""
+        results = []
+        for q, query in enumerate(queries):
+            rows = candidates[q] if isinstance(candidates, list) else candidates
+            rows = rows[self.live[rows]]
+            results.append(_top_k(rows, self._distances(rows, query, float(query @ query)), k))
+        return results
+
+    def _search_ivf(self, queries: np.ndarray, nprobe: int, k: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Scans the nprobe nearest inverted lists (contiguous in the list-ordered copy) plus rows added since the build."""
+        ivf = self.ivf
+        centroids, offsets = ivf['centroids'], ivf['offsets']
+        centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+        nearest = np.argsort(centroid_norms[None, :] - 2 * queries @ centroids.T, axis=1)[:, :nprobe]
+        tail = np.arange(ivf['rows'], len(self.vectors))
+        tail = tail[self.live[tail]]
+        results = []
+        for query, lists in zip(queries, nearest):
+            query_norm = float(query @ query)
+            rows, distances = [tail], [self._distances(tail, query, query_norm)]
+            for c in lists:
+                start, end = offsets[c], offsets[c + 1]
+                if start == end:
+                    continue
+                rows.append(np.asarray(ivf['order'][start:end]))
+                distances.append(ivf['norms'][start:end] - 2 * (ivf['vectors'][start:end] @ query) + query_norm)
+            rows, distances = np.concatenate(rows), np.concatenate(distances)
+            live = self.live[rows]
+            results.append(_top_k(rows[live], distances[live], k))
+        return results
+
+    def _fetch(self, rows: list[int]) -> dict:
+        found = {}
+        for i in range(0, len(rows), LOOKUP_CHUNK):
+            chunk = rows[i:i + LOOKUP_CHUNK]
+            query = f"SELECT row, id, document, metadata FROM rows WHERE row IN ({','.join('?' * len(chunk))})"
+            for row, chunk_id, document, metadata in self.conn.execute(query, chunk):
+                found[row] = (chunk_id, document, json.loads(metadata))
+        return found
+
+    def query(self, query_embeddings, n_results: int = 10, where: dict = None,
+              include=('documents', 'metadatas', 'distances'), nprobe: int = None, exact: bool = False) -> dict:
+        """Nearest rows per query embedding, in Chroma's result shape (one list per query)."""
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        with self.lock:
+            for _ in range(2):
+                self._refresh()
+                if not len(self.vectors):
+                    hits = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+                elif where:
+                    sql, params = _where_sql(where)
+                    allowed = np.array([row for (row,) in self.conn.execute(
+                        f"SELECT row FROM rows WHERE live = 1 AND {sql}", params) if row < len(self.vectors)], dtype=np.int64)
+                    hits = self._search_rows(queries, allowed, n_results)
+                elif self.ivf is not None and not exact:
+                    hits = self._search_ivf(queries, nprobe or self.nprobe, n_results)
+                else:
+                    hits = self._search_all(queries, n_results)
+
+                # Read rows in one snapshot and make sure no compaction renumbered them meanwhile
+                self.conn.execute("BEGIN")
+                try:
+                    layout = self._meta('layout')
+                    rows = self._fetch(sorted({int(row) for rows, _ in hits for row in rows}))
+                finally:
+                    self.conn.execute("COMMIT")
+                if layout == self.loaded_layout:
+                    break
+                self._refresh(force=True)
+
+        results = {'ids': [], 'documents': None, 'metadatas': None, 'distances': None, 'embeddings': None}
+        for key in ('documents', 'metadatas', 'distances', 'embeddings'):
+            if key in include:
+                results[key] = []
+        for hit_rows, distances in hits:
+            found = [(int(row), float(distance)) for row, distance in zip(hit_rows, distances) if int(row) in rows]
+            results['ids'].append([rows[row][0] for row, _ in found])
+            if 'documents' in include:
+                results['documents'].append([rows[row][1] for row, _ in found])
+            if 'metadatas' in include:
+                results['metadatas'].append([rows[row][2] for row, _ in found])
+            if 'distances' in include:
+                results['distances'].append([distance for _, distance in found])
+            if 'embeddings' in include:
+                results['embeddings'].append([self.vectors[row].tolist() for row, _ in found])
+        return results
+
+    def get(self, ids: list[str] = None, where: dict = None, limit: int = None, offset: int = None,
+            include=('documents', 'metadatas')) -> dict:
+        """Rows by id and/or metadata filter, in Chroma's get() result shape."""
+        clauses, params = ['live = 1'], []
+        if where:
+            sql, where_params = _where_sql(where)
+            clauses.append(sql)
+            params += where_params
+        with self.lock:
+            self._refresh()
+            self.conn.execute("BEGIN")
+            try:
+                layout = self._meta('layout')
+                if ids is not None:
+                    fetched = []
+                    for i in range(0, len(ids), LOOKUP_CHUNK):
+                        chunk = ids[i:i + LOOKUP_CHUNK]
+                        fetched += self.conn.execute(
+                            f"SELECT row, id, document, metadata FROM rows WHERE {' AND '.join(clauses)} "
+                            f"AND id IN ({','.join('?' * len(chunk))})", params + chunk).fetchall()
+                    by_id = {row[1]: row for row in fetched}
+                    fetched = [by_id[chunk_id] for chunk_id in dict.fromkeys(ids) if chunk_id in by_id]
+                    fetched = fetched[offset or 0:(offset or 0) + limit if limit else None]
+                else:
+                    fetched = self.conn.execute(
+                        f"SELECT row, id, document, metadata FROM rows WHERE {' AND '.join(clauses)} ORDER BY row "
+                        f"LIMIT ? OFFSET ?", params + [limit if limit is not None else -1, offset or 0]).fetchall()
+            finally:
+                self.conn.execute("COMMIT")
+            if 'embeddings' in include and layout != self.loaded_layout:
+                self._refresh(force=True)
+            return {
+                'ids': [row[1] for row in fetched],
+                'documents': [row[2] for row in fetched] if 'documents' in include else None,
+                'metadatas': [json.loads(row[3]) for row in fetched] if 'metadatas' in include else None,
+                'embeddings': [self.vectors[row[0]].tolist() for row in fetched] if 'embeddings' in include else None,
+            }
+
+    # --- Maintenance (indexer) ---
+    def build_index(self, n_lists: int = None, iterations: int = IVF_ITERATIONS, seed: int = 0):
+        """
+        (Re)builds the IVF index over all live rows: k-means centroids trained on a sample,
+        then every row assigned to its nearest centroid. Collections smaller than
+        IVF_MIN_ROWS drop the index and are searched exactly.
+        """
+        with self.lock:
+            self._refresh(force=True)
+            live_rows = np.flatnonzero(self.live)
+            generation = int(self._meta('generation'))
+            if len(live_rows) < IVF_MIN_ROWS:
+                old_prefix = self._meta('ivf_file', '')
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._set_meta('ivf_file', '')
+                self._bump()
+                self.conn.execute("COMMIT")
+                self._remove_files(old_prefix, _IVF_FILES)
+                return
+
+            rng = np.random.default_rng(seed)
+            n_lists = n_lists or int(np.sqrt(len(live_rows)))
+            sample = np.sort(rng.choice(live_rows, min(IVF_TRAIN_SAMPLE, len(live_rows)), replace=False))
+            training = np.asarray(self.vectors[sample])
+            centroids = training[rng.choice(len(training), n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                labels = self._nearest_centroid(training, centroids)
+                counts = np.bincount(labels, minlength=n_lists)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, training)
+                empty = counts == 0
+                centroids[~empty] = sums[~empty] / counts[~empty, None]
+                # Re-seed empty lists from random training rows
+                centroids[empty] = training[rng.choice(len(training), int(empty.sum()), replace=False)]
+
+            labels = np.concatenate([self._nearest_centroid(np.asarray(self.vectors[live_rows[i:i + BRUTE_FORCE_BLOCK]]), centroids)
+                                     for i in range(0, len(live_rows), BRUTE_FORCE_BLOCK)])
+            order = np.argsort(labels, kind='stable')
+            offsets = np.searchsorted(labels[order], np.arange(n_lists + 1))
+
+            prefix = f"ivf.{generation}"
+            np.save(self._file(f"{prefix}.centroids.npy"), centroids)
+            np.save(self._file(f"{prefix}.order.npy"), live_rows[order].astype(np.int64))
+            np.save(self._file(f"{prefix}.offsets.npy"), offsets.astype(np.int64))
+            # A copy of the vectors in list order, so each probed list is one contiguous read
+            ordered = np.lib.format.open_memmap(self._file(f"{prefix}.vectors.npy"), mode='w+', dtype=np.float32,
+                                                shape=(len(order), self.vectors.shape[1]))
+            norms = np.lib.format.open_memmap(self._file(f"{prefix}.norms.npy"), mode='w+', dtype=np.float32,
+                                              shape=(len(order),))
+            for i in range(0, len(order), BRUTE_FORCE_BLOCK):
+                block = np.sort(live_rows[order[i:i + BRUTE_FORCE_BLOCK]])
+                positions = np.argsort(live_rows[order[i:i + BRUTE_FORCE_BLOCK]])
+                ordered[i + positions] = self.vectors[block]
+                norms[i + positions] = self.norms[block]
+            ordered.flush()
+            norms.flush()
+            del ordered, norms
+            old_prefix = self._meta('ivf_file', '')
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._set_meta('ivf_file', prefix)
+            self._set_meta('ivf_rows', len(self.vectors))
+            self._bump()
+            self.conn.execute("COMMIT")
+            self._remove_files(old_prefix, _IVF_FILES)
+            print(f"Built IVF index: {n_lists} lists over {len(live_rows)} vectors.")
+
+    @staticmethod
+    def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+        return np.argmin(centroid_norms[None, :] - 2 * vectors @ centroids.T, axis=1)
+
+    def _remove_files(self, prefix: str, suffixes: tuple):
+        # Readers that still map the old files keep them alive until they re-map
+        for suffix in suffixes if prefix else ():
+            try:
+                os.remove(self._file(f"{prefix}{suffix}"))
+            except OSError:
+                pass
+
+    def compact(self):
+        """Rewrites the matrix and row table without dead rows, renumbering rows from zero."""
+        with self.lock:
+            self._refresh(force=True)
+            live_rows = np.flatnonzero(self.live)
+            old_prefix, old_ivf_prefix = self._meta('vectors_file'), self._meta('ivf_file', '')
+            prefix = f"vectors.{int(self._meta('generation')) + 1}"
+            dimension = self.vectors.shape[1]
+            for i in range(0, len(live_rows), BRUTE_FORCE_BLOCK):
+                block = live_rows[i:i + BRUTE_FORCE_BLOCK]
+                self._write_rows(self._file(f"{prefix}.f32"), i, dimension, self.vectors[block])
+                self._write_rows(self._file(f"{prefix}.norms.f32"), i, 1, self.norms[block])
+
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("DROP TABLE IF EXISTS rows_compacted")
+                self._create_tables(self.conn, 'rows_compacted')
+                self.conn.execute("INSERT INTO rows_compacted (row, id, document, metadata) "
+                                  "SELECT ROW_NUMBER() OVER (ORDER BY row) - 1, id, document, metadata FROM rows WHERE live = 1")
+                self.conn.execute("DROP TABLE rows")
+                self.conn.execute("ALTER TABLE rows_compacted RENAME TO rows")
+                self._set_meta('rows', len(live_rows))
+                self._set_meta('vectors_file', prefix)
+                self._set_meta('ivf_file', '')
+                self._bump(layout=True)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._remove_files(old_prefix, ('.f32', '.norms.f32'))
+            self._remove_files(old_ivf_prefix, _IVF_FILES)
+            print(f"Compacted vector store: {len(self.live) - len(live_rows)} dead rows removed.")
+
+    def maintain(self):
+        """Compacts when enough rows are dead and rebuilds the IVF index once enough rows were added."""
+        with self.lock:
+            self._refresh(force=True)
+            total = len(self.live)
+            if total and (total - int(self.live.sum())) / total >= COMPACT_FRACTION:
+                self.compact()
+                self._refresh(force=True)
+            live = int(self.live.sum())
+            if self.ivf is None:
+                if live >= IVF_MIN_ROWS:
+                    self.build_index()
+            elif len(self.vectors) - self.ivf['rows'] >= IVF_REBUILD_FRACTION * self.ivf['rows'] or live < IVF_MIN_ROWS:
+                self.build_index()
+
+
+def open_collection(backend: str, chroma_path: str, collection_name: str, local_path: str, create: bool = True,
+                    nprobe: int = IVF_NPROBE):
+    """
+    The vector collection for the configured backend: 'chroma' (a ChromaDB collection)
+    or 'local' (LocalVectorStore). Both expose the same upsert/query/get/delete/count calls.
+    """
+    if backend == 'local':
+        return LocalVectorStore(local_path, nprobe)
+    if backend != 'chroma':
+        raise ValueError(f"Unknown vector store backend: {backend!r} (expected 'chroma' or 'local')")
+    import chromadb  # Only needed for the Chroma backend
+    client = chromadb.PersistentClient(path=chroma_path)
+    return client.get_or_create_collection(name=collection_name) if create else client.get_collection(name=collection_name)
@@ -1,31 +1,156 @@
+import os
 import time
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from config import PROJECT_PATH
-from parser import extract_method_chunks
-from vector_store import upsert_to_chromadb
+from index_manifest import IndexManifest, sync_file, remove_file
+from lazy_resource import warmup
+
+DEBOUNCE_SECONDS = float(os.getenv("WATCHER_DEBOUNCE_SECONDS", "2.0"))  # Quiet time before a path is indexed
+METRICS_INTERVAL = 10  # Seconds between metric printouts
+
+class DebouncedEventQueue:
+    """
+    Coalesces file events per path. Repeated events for a path only push its
+    deadline back, and the latest event wins (a create then delete is just a delete),
+    so a save burst or branch checkout indexes each file once.
+    """
+
+    def __init__(self, window: float = DEBOUNCE_SECONDS):
+        self.window = window
+        self.pending = {}  # path -> [action, first event time, last event time]
+        self.cond = threading.Condition()
+
+    def push(self, path: str, action: str):
+        now = time.monotonic()
+        with self.cond:
+            entry = self.pending.get(path)
+            if entry:
+                entry[0], entry[2] = action, now
+            else:
+                self.pending[path] = [action, now, now]
+            self.cond.notify()
+
+    def pop_ready(self, timeout: float = 1.0) -> list[tuple[str, str, float]]:
+        """Waits for paths that have been quiet for the debounce window; returns (path, action, first event time)."""
+        with self.cond:
+            deadline = time.monotonic() + timeout
+            while True:
+                now = time.monotonic()
+                ready = [path for path, entry in self.pending.items() if now - entry[2] >= self.window]
+                if ready or now >= deadline:
+                    return [(path, *self.pending.pop(path)[:2]) for path in ready]
+                next_due = min((entry[2] + self.window for entry in self.pending.values()), default=deadline)
+                self.cond.wait(max(0.0, min(next_due, deadline) - now))
+
+    def depth(self) -> int:
+        with self.cond:
+            return len(self.pending)
+
+
+class IndexingWorker(threading.Thread):
+    """Background thread that applies debounced events through the incremental indexer."""
+
+    def __init__(self, events: DebouncedEventQueue, manifest: IndexManifest):
+        super().__init__(daemon=True, name="indexing-worker")
+        self.events = events
+        self.manifest = manifest
+        self.stopping = threading.Event()
+        self.metrics = {'processed': 0, 'embedded': 0, 'deleted': 0, 'errors': 0, 'last_lag': 0.0, 'max_lag': 0.0}
+
+    def run(self):
+        while not self.stopping.is_set():
+            ready = self.events.pop_ready()
+            for path, action, first_seen in ready:
+                self._apply(path, action)
+                lag = time.monotonic() - first_seen
+                self.metrics['processed'] += 1
+                self.metrics['last_lag'] = lag
+                self.metrics['max_lag'] = max(self.metrics['max_lag'], lag)
+            if ready:
+                self.manifest.save()
+
+    def _apply(self, path: str, action: str):
+        try:
+            if action == 'upsert' and os.path.exists(path):
+                print(f"Re-indexing: {path}")
+                stats = sync_file(path, self.manifest)
+                self.metrics['embedded'] += stats['embedded']
+                self.metrics['deleted'] += stats['deleted']
+            else:
+                print(f"Removing from index: {path}")
+                self.metrics['deleted'] += remove_file(path, self.manifest)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            print(f"Error indexing {path}: {e}")
+
 
 class CodeChangeHandler(FileSystemEventHandler):
-    """Handles file system events for Java source files."""
+    """Handles file system events for Java source files by queueing them for the indexing worker."""
+
+    def __init__(self, events: DebouncedEventQueue, manifest: IndexManifest):
+        self.events = events
+        self.manifest = manifest
+
+    def _queue_directory(self, directory: str, action: str):
+        if action == 'delete':
+            # The files are gone, so find what we had indexed under the directory
+            prefix = os.path.join(directory, '')
+            for file_path in list(self.manifest.files):
+                if file_path.startswith(prefix):
+                    self.events.push(file_path, 'delete')
+        else:
+            for root, dirs, files in os.walk(directory):
+                for file in files:
+                    if file.endswith(".java"):
+                        self.events.push(os.path.join(root, file), 'upsert')
+
+    def _queue(self, path: str, action: str, is_directory: bool):
+        if is_directory:
+            self._queue_directory(path, action)
+        elif path.endswith(".java"):
+            self.events.push(path, action)
+
+    def on_created(self, event):
+        self._queue(event.src_path, 'upsert', event.is_directory)
+
     def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith(".java"):
-            print(f"Change detected in: {event.src_path}")
-            chunks = extract_method_chunks(event.src_path)
-            if chunks:
-                upsert_to_chromadb(chunks)
+        if not event.is_directory:
+            self._queue(event.src_path, 'upsert', False)
+
+    def on_deleted(self, event):
+        self._queue(event.src_path, 'delete', event.is_directory)
+
+    def on_moved(self, event):
+        self._queue(event.src_path, 'delete', event.is_directory)
+        self._queue(event.dest_path, 'upsert', event.is_directory)
 
 def main():
     print(f"Starting file watcher for directory: {PROJECT_PATH}")
-    event_handler = CodeChangeHandler()
+    # Connect to the store and model now, so the first edit is not also paying for startup
+    print(f"Warmed up: {warmup()}")
+    manifest = IndexManifest()
+    events = DebouncedEventQueue()
+    worker = IndexingWorker(events, manifest)
+    worker.start()
+
+    event_handler = CodeChangeHandler(events, manifest)
     observer = Observer()
     observer.schedule(event_handler, PROJECT_PATH, recursive=True)
     observer.start()
     try:
         while True:
-            time.sleep(10)
+            time.sleep(METRICS_INTERVAL)
+            m = worker.metrics
+            print(f"[watcher] queue depth={events.depth()} processed={m['processed']} embedded={m['embedded']} "
+                  f"deleted={m['deleted']} errors={m['errors']} lag last={m['last_lag']:.1f}s max={m['max_lag']:.1f}s")
     except KeyboardInterrupt:
         observer.stop()
+        worker.stopping.set()
     observer.join()
+    worker.join()
+    manifest.save()
 
 if __name__ == "__main__":
     main()
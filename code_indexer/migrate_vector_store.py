@@ -0,0 +1,33 @@
+import sys
+import time
+from config import CHROMA_DB_PATH, CHROMA_COLLECTION_NAME, LOCAL_VECTOR_STORE_PATH
+from local_vector_store import LocalVectorStore, open_collection
+
+def migrate_chroma_to_local(batch_size: int = 1000) -> int:
+    """
+    Copies every chunk (id, vector, code and metadata) from the ChromaDB collection into
+    the local vector store, then builds its IVF index if the collection is large enough.
+    No re-embedding is needed. Safe to re-run: chunks already copied are overwritten.
+    Switch both services over with VECTOR_STORE_BACKEND=local afterwards.
+    """
+    source = open_collection('chroma', CHROMA_DB_PATH, CHROMA_COLLECTION_NAME, LOCAL_VECTOR_STORE_PATH, create=False)
+    target = LocalVectorStore(LOCAL_VECTOR_STORE_PATH)
+    total = source.count()
+    print(f"--- Migrating {total} vectors from {CHROMA_DB_PATH} to {LOCAL_VECTOR_STORE_PATH} ---")
+
+    started = time.perf_counter()
+    for offset in range(0, total, batch_size):
+        results = source.get(include=['embeddings', 'documents', 'metadatas'], limit=batch_size, offset=offset)
+        target.upsert(ids=results['ids'], embeddings=results['embeddings'],
+                      documents=results['documents'], metadatas=results['metadatas'])
+        print(f"Copied {min(offset + batch_size, total)}/{total} vectors.")
+
+    target.maintain()
+    print(f"Migration complete: {target.count()} vectors in {time.perf_counter() - started:.1f}s.")
+    if target.count() != total:
+        print(f"Warning: ChromaDB reported {total} vectors; check for duplicate ids.")
+    return target.count()
+
+if __name__ == "__main__":
+    # Usage: python migrate_vector_store.py [batch_size]
+    migrate_chroma_to_local(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -1,48 +1,164 @@
 # code_indexer/parser.py
 
-from tree_sitter_languages import get_parser
+import os
+import time
+import hashlib
+import instrumentation
+from tree_sitter_languages import get_parser, get_language
+from config import CHUNK_MAX_LINES, CHUNK_OVERLAP_LINES
 
 # Get a pre-configured parser for the Java language.
 # This automatically handles loading the correct compiled grammar.
 parser = get_parser('java')
 
-def extract_method_chunks(file_path: str) -> list[dict]:
-    """Parses a Java file and extracts all method declarations as chunks."""
+# Bumped whenever chunk boundaries, ids or metadata change, so the indexer re-chunks
+# every file once (unchanged method bodies keep their vectors).
+CHUNKER_VERSION = 2
+
+# One query finds every declaration we chunk or name scopes by; captures come back in
+# document order, so a single pass with a stack of enclosing types assigns binary names.
+_DECLARATIONS = get_language('java').query("""
+(package_declaration [(scoped_identifier) (identifier)] @package)
+(class_declaration) @type
+(interface_declaration) @type
+(enum_declaration) @type
+(record_declaration) @type
+(annotation_type_declaration) @type
+(object_creation_expression (class_body) @anonymous)
+(enum_constant (class_body) @anonymous)
+(method_declaration) @method
+(constructor_declaration) @constructor
+(compact_constructor_declaration) @constructor
+(static_initializer) @static_initializer
+(field_declaration (variable_declarator value: (lambda_expression)) @lambda_field)
+""")
+_MEMBER_CONTAINERS = {'class_body', 'interface_body', 'enum_body', 'enum_body_declarations', 'annotation_type_body', 'program'}
+
+
+def _name(node, source: bytes) -> str:
+    name_node = node.child_by_field_name('name')
+    return source[name_node.start_byte:name_node.end_byte].decode('utf8') if name_node else ""
+
+
+def _split_lines(code: str, start_line: int) -> list[tuple[str, int, int]]:
+    """Splits an oversize method into overlapping windows of CHUNK_MAX_LINES lines."""
+    lines = code.split('\n')
+    if len(lines) <= CHUNK_MAX_LINES:
+        return [(code, start_line, start_line + len(lines) - 1)]
+    step = max(1, CHUNK_MAX_LINES - CHUNK_OVERLAP_LINES)
+    parts = []
+    for offset in range(0, len(lines), step):
+        window = lines[offset:offset + CHUNK_MAX_LINES]
+        parts.append(('\n'.join(window), start_line + offset, start_line + offset + len(window) - 1))
+        if offset + CHUNK_MAX_LINES >= len(lines):
+            break
+    return parts
+
+
+@instrumentation.timed()
+def extract_method_chunks(file_path: str, source_code_bytes: bytes = None) -> list[dict]:
+    """
+    Parses a Java file and extracts every executable member as a chunk: methods (including
+    interface default/static methods), constructors, record compact constructors, static
+    initializers and lambdas assigned to fields, in top-level, nested, inner, local,
+    anonymous and enum-constant classes. class_name is the JVM binary name (Outer$Inner,
+    Outer$1), so it lines up with stack frames. Methods longer than CHUNK_MAX_LINES are
+    split into overlapping parts.
+    """
     try:
-        with open(file_path, 'rb') as f:
-            source_code_bytes = f.read()
+        if source_code_bytes is None:
+            with open(file_path, 'rb') as f:
+                source_code_bytes = f.read()
         
         tree = parser.parse(source_code_bytes)
         chunks = []
-        
-        # This parsing logic remains the same, as it operates on the AST
-        for node in tree.root_node.children:
-            if node.type == 'class_declaration':
-                for class_body_node in node.children:
-                    if class_body_node.type == 'class_body':
-                        for method_node in class_body_node.children:
-                            if method_node.type == 'method_declaration':
-                                method_name_node = method_node.child_by_field_name('name')
-                                if method_name_node:
-                                    method_name = method_name_node.text.decode('utf8')
-                                    start_line = method_node.start_point[0] + 1
-                                    end_line = method_node.end_point[0] + 1
-                                    code_snippet = method_node.text.decode('utf8')
-                                    
-                                    # Create a stable, unique ID for each method chunk
-                                    chunk_id = f"{file_path}::{method_name}::{start_line}-{end_line}"
-                                    
-                                    chunks.append({
-                                        "id": chunk_id,
-                                        "code": code_snippet,
-                                        "metadata": {
-                                            "file_path": file_path,
-                                            "method_name": method_name,
-                                            "start_line": start_line,
-                                            "end_line": end_line
-                                        }
-                                    })
+        package = ""
+        scopes = []  # Enclosing types: [end byte, binary name, anonymous class count, local class counts by name]
+
+        for node, capture in _DECLARATIONS.captures(tree.root_node):
+            while scopes and scopes[-1][0] <= node.start_byte:
+                scopes.pop()
+
+            if capture == 'package':
+                package = source_code_bytes[node.start_byte:node.end_byte].decode('utf8')
+                continue
+            if capture in ('type', 'anonymous'):
+                if not scopes:
+                    binary_name = f"{package}.{_name(node, source_code_bytes)}" if package else _name(node, source_code_bytes)
+                else:
+                    outer = scopes[-1]
+                    if capture == 'anonymous':
+                        outer[2] += 1
+                        binary_name = f"{outer[1]}${outer[2]}"
+                    elif node.parent.type in _MEMBER_CONTAINERS:
+                        binary_name = f"{outer[1]}${_name(node, source_code_bytes)}"
+                    else:
+                        # Local class declared inside a method body, numbered per name like javac
+                        local_name = _name(node, source_code_bytes)
+                        outer[3][local_name] = outer[3].get(local_name, 0) + 1
+                        binary_name = f"{outer[1]}${outer[3][local_name]}{local_name}"
+                scopes.append([node.end_byte, binary_name, 0, {}])
+                continue
+            if not scopes:
+                continue
+
+            if capture == 'method':
+                if node.child_by_field_name('body') is None:
+                    continue  # Abstract and interface methods have nothing to analyze
+                method_name = _name(node, source_code_bytes)
+            elif capture == 'constructor':
+                method_name = '<init>'
+            elif capture == 'static_initializer':
+                method_name = '<clinit>'
+            else:
+                method_name = _name(node, source_code_bytes)
+                node = node.parent  # The whole field declaration, with its type and modifiers
+
+            class_name = scopes[-1][1]
+            qualified_name = f"{class_name.rsplit('.', 1)[-1]}.{method_name}"
+            code = source_code_bytes[node.start_byte:node.end_byte].decode('utf8', errors='replace')
+            parts = _split_lines(code, node.start_point[0] + 1)
+            for part, (code_snippet, start_line, end_line) in enumerate(parts):
+                # Create a stable, unique ID for each method chunk
+                chunk_id = f"{file_path}::{qualified_name}::{start_line}-{end_line}"
+                metadata = {
+                    "file_path": file_path,
+                    "method_name": method_name,
+                    "package": package,
+                    "class_name": class_name,
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "kind": capture,
+                }
+                if len(parts) > 1:
+                    metadata["part"] = part + 1
+                    metadata["parts"] = len(parts)
+                chunks.append({"id": chunk_id, "code": code_snippet, "metadata": metadata})
         return chunks
     except Exception as e:
         print(f"Error parsing {file_path}: {e}")
         return []
+
+
+def parse_if_changed(file_path: str, known_sha256: str = None) -> dict:
+    """
+    Reads and hashes a file and, unless its content matches known_sha256, extracts its chunks.
+    Self-contained so it can run in a worker process: it returns plain data only.
+    """
+    st = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        source_code_bytes = f.read()
+    digest = hashlib.sha256(source_code_bytes).hexdigest()
+    unchanged = digest == known_sha256
+    started = time.perf_counter()
+    chunks = None if unchanged else extract_method_chunks(file_path, source_code_bytes)
+    return {
+        'file_path': file_path,
+        'mtime': st.st_mtime,
+        'size': st.st_size,
+        'sha256': digest,
+        'chunker': CHUNKER_VERSION,
+        'chunks': chunks,
+        # Worker processes keep their own metrics; the pipeline records this in the parent instead
+        'parse_seconds': time.perf_counter() - started,
+    }
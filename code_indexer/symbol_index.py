@@ -0,0 +1,231 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+
+RELOAD_CHECK_SECONDS = 5.0
+_FRAME = re.compile(r'at\s+(?:[\w.$/@-]+/)?((?:[\w$]+\.)*[\w$]+)\.([\w$<>]+)\(([^:)]*)(?::(\d+))?\)')
+_JDK_PACKAGES = ('java.', 'javax.', 'sun.', 'jdk.', 'com.sun.')
+
+
+class IntervalTree:
+    """
+    Static interval tree: intervals sorted by start and laid out as an implicit balanced
+    binary search tree, each node holding the largest end in its subtree. A stabbing
+    query visits O(log n + k) nodes for k matches.
+    """
+
+    def __init__(self, intervals: list[tuple[int, int, str]]):
+        self.items = sorted(intervals)
+        self.max_end = [0] * len(self.items)
+        self._build(0, len(self.items) - 1)
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo > hi:
+            return -1
+        mid = (lo + hi) // 2
+        self.max_end[mid] = max(self.items[mid][1], self._build(lo, mid - 1), self._build(mid + 1, hi))
+        return self.max_end[mid]
+
+    def stab(self, point: int) -> list[tuple[int, int, str]]:
+        """All intervals containing point."""
+        found, stack = [], [(0, len(self.items) - 1)]
+        while stack:
+            lo, hi = stack.pop()
+            if lo > hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < point:
+                continue
+            stack.append((lo, mid - 1))
+            start, end, value = self.items[mid]
+            if start <= point:
+                if point <= end:
+                    found.append(self.items[mid])
+                stack.append((mid + 1, hi))
+        return found
+
+    def innermost(self, point: int):
+        """The narrowest interval containing point (the enclosing method of a nested lambda or class), or None."""
+        hits = self.stab(point)
+        return min(hits, key=lambda item: item[1] - item[0]) if hits else None
+
+
+def parse_frames(error_log: str, skip_jdk: bool = True) -> list[dict]:
+    """
+    Stack frames as dicts with class_name, package, method_name, file_name and line (None if unknown).
+    Frames are ordered for relevance: the top application frame of each exception, innermost cause
+    first, then every other frame in log order.
+    """
+    blocks = [[]]
+    for line in error_log.splitlines():
+        frame = _FRAME.search(line)
+        if frame is None:
+            if 'Exception' in line or 'Error' in line or line.lstrip().startswith('Caused by'):
+                blocks.append([])
+            continue
+        class_name, method_name, file_name, line_number = frame.groups()
+        if skip_jdk and class_name.startswith(_JDK_PACKAGES):
+            continue
+        # Inner, anonymous and lambda classes live in their outer class's source file
+        outer = class_name.split('$', 1)[0]
+        blocks[-1].append({
+            'class_name': class_name,
+            'package': outer.rsplit('.', 1)[0] if '.' in outer else '',
+            'method_name': method_name,
+            'file_name': file_name if file_name.endswith('.java') else f"{outer.rsplit('.', 1)[-1]}.java",
+            'line': int(line_number) if line_number else None,
+        })
+
+    ordered = [block[0] for block in reversed(blocks) if block]
+    ordered += [frame for block in blocks for frame in block[1:]]
+    return ordered
+
+
+class SymbolIndex:
+    """
+    Maps stack frames straight to method chunks. Each chunk's source file, class, method and
+    line range is stored in SQLite (written by the indexer alongside ChromaDB). Readers keep
+    one IntervalTree per source file, keyed by package and file name, plus a (class, method)
+    table for frames without line numbers, rebuilt in the background when the index changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS symbols (id TEXT PRIMARY KEY, package TEXT NOT NULL, file_name TEXT NOT NULL, "
+            "class_name TEXT NOT NULL, method_name TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        self.conn.commit()
+
+        # In-memory lookup state, rebuilt when the stored generation moves on
+        self.loaded_generation = None
+        self.last_check = 0.0
+        self.rebuilding = False
+        self.trees = {}        # (package, file name) -> IntervalTree of (start, end, chunk id)
+        self.by_file_name = {} # file name -> [(package, file name)], for chunks indexed without a package
+        self.methods = {}      # (class name, method name) -> [chunk id]
+
+    # --- Index-time writes ---
+    def upsert(self, chunks: list[dict]):
+        rows = []
+        for chunk in chunks:
+            metadata = chunk.get('metadata', {})
+            if not metadata.get('start_line'):
+                continue
+            rows.append((
+                chunk['id'], metadata.get('package', ''), os.path.basename(metadata.get('file_path', '')),
+                metadata.get('class_name', ''), metadata.get('method_name', ''),
+                metadata['start_line'], metadata.get('end_line', metadata['start_line']),
+            ))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            self.conn.commit()
+
+    def delete(self, ids: list[str]):
+        if not ids:
+            return
+        with self.lock:
+            self.conn.executemany("DELETE FROM symbols WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            self.conn.commit()
+
+    # --- Query-time reads ---
+    def _refresh(self):
+        """
+        Picks up index changes. Only the first lookup in a process builds the tables inline;
+        later changes are rebuilt on a background thread while lookups keep using the current ones.
+        """
+        now = time.monotonic()
+        if self.loaded_generation is not None and now - self.last_check < RELOAD_CHECK_SECONDS:
+            return
+        self.last_check = now
+        generation = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        if generation == self.loaded_generation:
+            return
+        if self.loaded_generation is None:
+            self._swap(*self._build())
+        elif not self.rebuilding:
+            self.rebuilding = True
+            threading.Thread(target=self._rebuild, name="symbol-index-rebuild", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            built = self._build()
+        except Exception as e:
+            print(f"Error rebuilding symbol index: {e}")
+            built = None
+        with self.lock:
+            self.rebuilding = False
+            if built is not None:
+                self._swap(*built)
+
+    def _swap(self, generation: int, trees: dict, by_file_name: dict, methods: dict):
+        self.trees = trees
+        self.by_file_name = by_file_name
+        self.methods = methods
+        self.loaded_generation = generation
+
+    def _build(self) -> tuple[int, dict, dict, dict]:
+        """Reads every symbol over its own connection and returns (generation, trees, by_file_name, methods)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Read before the rows: a write in between only means the next check rebuilds again
+            generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+            intervals, methods = {}, {}
+            rows = conn.execute("SELECT id, package, file_name, class_name, method_name, start_line, end_line FROM symbols")
+            for chunk_id, package, file_name, class_name, method_name, start_line, end_line in rows:
+                intervals.setdefault((package, file_name), []).append((start_line, end_line, chunk_id))
+                methods.setdefault((class_name, method_name), []).append(chunk_id)
+        finally:
+            conn.close()
+
+        by_file_name = {}
+        for key in intervals:
+            by_file_name.setdefault(key[1], []).append(key)
+        return generation, {key: IntervalTree(items) for key, items in intervals.items()}, by_file_name, methods
+
+    def _resolve(self, frame: dict):
+        if frame['line'] is None:
+            # Chunks carry JVM binary class names; older ones only the top-level class
+            chunk_ids = (self.methods.get((frame['class_name'], frame['method_name']))
+                         or self.methods.get((frame['class_name'].split('$', 1)[0], frame['method_name'])))
+            return chunk_ids[0] if chunk_ids else None
+
+        keys = [(frame['package'], frame['file_name'])]
+        if keys[0] not in self.trees:
+            # Chunks indexed without package metadata: fall back to the file name alone
+            keys = [key for key in self.by_file_name.get(frame['file_name'], ()) if not key[0]]
+        for key in keys:
+            hit = self.trees[key].innermost(frame['line'])
+            if hit is not None:
+                return hit[2]
+        return None
+
+    def resolve(self, error_log: str, limit: int = None) -> list[str]:
+        """Chunk ids of the methods the log's stack frames point into, most relevant first, without duplicates."""
+        frames = parse_frames(error_log)
+        resolved = []
+        with self.lock:
+            self._refresh()
+            for frame in frames:
+                chunk_id = self._resolve(frame)
+                if chunk_id is not None and chunk_id not in resolved:
+                    resolved.append(chunk_id)
+                    if limit and len(resolved) >= limit:
+                        break
+        return resolved
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
@@ -1,55 +1,175 @@
-import chromadb
-from abc.langchain.embeddings import StorkEmbeddings
+import re
+import instrumentation
+from lazy_resource import LazyResource
+from embedding_cache import EmbeddingCache
+from keyword_index import KeywordIndex
+from symbol_index import SymbolIndex
+from local_vector_store import LocalVectorStore, open_collection
+from embedding_provider import create_embed_model, embedding_model_key
 from config import (
     CHROMA_DB_PATH,
     CHROMA_COLLECTION_NAME,
+    VECTOR_STORE_BACKEND,
+    LOCAL_VECTOR_STORE_PATH,
+    EMBEDDING_MODEL_ID,
+    EMBEDDING_PROVIDER,
+    HASHING_EMBEDDING_DIMENSION,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    KEYWORD_INDEX_PATH,
+    SYMBOL_INDEX_PATH,
+    INSTRUMENTATION_ENABLED,
 )
 
-# --- Initialize ChromaDB Client ---
-client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-collection = client.get_or_create_collection(name=CHROMA_COLLECTION_NAME)
+instrumentation.configure(INSTRUMENTATION_ENABLED)
 
-# --- Initialize Stork Embeddings ---
-embedModel = StorkEmbeddings(
-    provider='GCP_VERTEX_AI', 
-    provider_id='textembedding-gecko@001'
-)
+# Every client below is created on first use, once per process (see lazy_resource.py),
+# so importing this module costs no connections and parse workers never open any.
+
+# --- Vector Store ---
+# ChromaDB or the local memory-mapped store, chosen by VECTOR_STORE_BACKEND; same collection API either way
+get_collection = LazyResource('vector collection', lambda: open_collection(
+    VECTOR_STORE_BACKEND, CHROMA_DB_PATH, CHROMA_COLLECTION_NAME, LOCAL_VECTOR_STORE_PATH))
+
+# --- Embedding Model ---
+# Stork by default; EMBEDDING_PROVIDER=hashing swaps in a deterministic local embedder
+get_embed_model = LazyResource('embedding model', lambda: create_embed_model(
+    EMBEDDING_PROVIDER, EMBEDDING_MODEL_ID, HASHING_EMBEDDING_DIMENSION))
+EMBEDDING_MODEL_KEY = embedding_model_key(EMBEDDING_PROVIDER, EMBEDDING_MODEL_ID, HASHING_EMBEDDING_DIMENSION)
 
+# --- Embedding Cache ---
+# Shared with rca_agent; document and query embeddings are kept apart by the model id suffix
+get_embedding_cache = LazyResource('embedding cache', lambda: EmbeddingCache(
+    EMBEDDING_CACHE_PATH, f"{EMBEDDING_MODEL_KEY}:document", EMBEDDING_CACHE_MAX_ENTRIES))
+
+# --- Keyword and Symbol Indexes ---
+# Every write below goes to all three stores, so BM25, stack-frame and vector lookups see the same chunks
+get_keyword_index = LazyResource('keyword index', lambda: KeywordIndex(KEYWORD_INDEX_PATH))
+get_symbol_index = LazyResource('symbol index', lambda: SymbolIndex(SYMBOL_INDEX_PATH))
+
+@instrumentation.timed()
 def get_embeddings_from_stork(texts: list[str]) -> list[list[float]]:
-    """Generates embeddings using Stork's LangChain integration."""
+    """Generates embeddings using Stork's LangChain integration, skipping texts already in the cache."""
     try:
         # LangChain's embed_documents method handles batch processing
-        embeddings = embedModel.embed_documents(texts)
+        embeddings = get_embedding_cache().get_or_embed(texts, _embed_documents)
         return embeddings
     except Exception as e:
         print(f"Error calling Stork embeddings: {e}")
         return []
 
-def upsert_to_chromadb(chunks: list[dict]):
-    """Generates embeddings via Stork and upserts chunks into ChromaDB in batches."""
+def _embed_documents(texts: list[str]) -> list[list[float]]:
+    """The model call for cache misses only, timed apart from cache lookups."""
+    instrumentation.count('embedded_texts', len(texts))
+    with instrumentation.span('embedding_model'):
+        return get_embed_model().embed_documents(texts)
+
+def embed_chunks(chunks: list[dict], known_embeddings: dict = None) -> list[list[float]]:
+    """
+    Returns one embedding per chunk, calling Stork only for chunks whose id is not in
+    known_embeddings. Returns [] if the embedding call failed.
+    """
+    known_embeddings = known_embeddings or {}
+    missing = [j for j, chunk in enumerate(chunks) if chunk['id'] not in known_embeddings]
+    new_embeddings = get_embeddings_from_stork([chunks[j]['code'] for j in missing]) if missing else []
+    if missing and not new_embeddings:
+        return []
+
+    new_by_position = dict(zip(missing, new_embeddings))
+    return [new_by_position[j] if j in new_by_position else known_embeddings[chunk['id']]
+            for j, chunk in enumerate(chunks)]
+
+def upsert_embedded_chunks(chunks: list[dict], embeddings: list[list[float]]):
+    """Writes chunks whose embeddings are already computed to ChromaDB in one call."""
+    with instrumentation.span('collection_upsert'):
+        get_collection().upsert(
+            ids=[chunk['id'] for chunk in chunks],
+            embeddings=embeddings,
+            documents=[chunk['code'] for chunk in chunks],
+            metadatas=[chunk['metadata'] for chunk in chunks]
+        )
+    with instrumentation.span('local_index_upsert'):
+        get_keyword_index().upsert(chunks)
+        get_symbol_index().upsert(chunks)
+    instrumentation.count('chunks_upserted', len(chunks))
+
+def upsert_to_chromadb(chunks: list[dict], known_embeddings: dict = None) -> int:
+    """
+    Generates embeddings via Stork and upserts chunks into ChromaDB in batches.
+    Chunks whose id is in known_embeddings reuse that vector instead of calling Stork.
+    Returns how many chunks were upserted.
+    """
     if not chunks:
-        return
+        return 0
 
+    upserted = 0
     batch_size = 50  # Process chunks in batches for efficiency
     for i in range(0, len(chunks), batch_size):
         batch_chunks = chunks[i:i + batch_size]
         
-        ids = [chunk['id'] for chunk in batch_chunks]
-        documents = [chunk['code'] for chunk in batch_chunks]
-        metadatas = [chunk['metadata'] for chunk in batch_chunks]
-        
-        # Generate embeddings using Stork
-        embeddings = get_embeddings_from_stork(documents)
+        # Generate embeddings using Stork, only for chunks we don't already have a vector for
+        embeddings = embed_chunks(batch_chunks, known_embeddings)
         
         if not embeddings:
             print("Skipping batch due to embedding generation failure.")
             continue
         
         # Upsert the batch to ChromaDB
-        collection.upsert(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
-        )
+        upsert_embedded_chunks(batch_chunks, embeddings)
+        upserted += len(batch_chunks)
         print(f"Upserted {len(batch_chunks)} vectors to ChromaDB via Stork.")
+    return upserted
+
+def get_stored_embeddings(ids: list[str]) -> dict:
+    """Fetches already-stored vectors by chunk id, so unchanged code can be re-keyed without re-embedding."""
+    if not ids:
+        return {}
+    results = get_collection().get(ids=ids, include=['embeddings'])
+    return {chunk_id: list(embedding) for chunk_id, embedding in zip(results['ids'], results['embeddings'])}
+
+def delete_from_chromadb(ids: list[str]):
+    """Removes chunks that no longer exist in the source tree."""
+    if not ids:
+        return
+    with instrumentation.span('collection_delete'):
+        get_collection().delete(ids=ids)
+        get_keyword_index().delete(ids)
+        get_symbol_index().delete(ids)
+    instrumentation.count('chunks_deleted', len(ids))
+    print(f"Deleted {len(ids)} stale vectors from ChromaDB.")
+
+_PACKAGE = re.compile(rb'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+
+def _with_package(metadata: dict, packages: dict) -> dict:
+    """Fills in the package for chunks indexed before the parser recorded it, read from the source file."""
+    if 'package' in metadata or not metadata.get('file_path'):
+        return metadata
+    file_path = metadata['file_path']
+    if file_path not in packages:
+        try:
+            with open(file_path, 'rb') as f:
+                match = _PACKAGE.search(f.read(65536))
+            packages[file_path] = match.group(1).decode('utf8') if match else ''
+        except OSError:
+            packages[file_path] = ''
+    return {**metadata, 'package': packages[file_path]}
+
+def rebuild_local_indexes(batch_size: int = 1000) -> int:
+    """Backfills the keyword and symbol indexes from what is already in ChromaDB (e.g. chunks indexed before they existed)."""
+    collection, keyword_index, symbol_index = get_collection(), get_keyword_index(), get_symbol_index()
+    total = collection.count()
+    packages = {}
+    for offset in range(0, total, batch_size):
+        results = collection.get(include=['documents', 'metadatas'], limit=batch_size, offset=offset)
+        chunks = [{'id': chunk_id, 'code': document, 'metadata': _with_package(metadata or {}, packages)}
+                  for chunk_id, document, metadata in zip(results['ids'], results['documents'], results['metadatas'])]
+        keyword_index.upsert(chunks)
+        symbol_index.upsert(chunks)
+    print(f"Rebuilt keyword and symbol indexes for {total} chunks.")
+    return total
+
+def maintain_vector_store():
+    """Compacts the local store and (re)builds its IVF index when due; ChromaDB maintains its own index."""
+    collection = get_collection()
+    if isinstance(collection, LocalVectorStore):
+        collection.maintain()
@@ -1,28 +1,70 @@
+import re
+from typing import Dict, List
+from config import (
+    CONVERSATION_DB_PATH, CONVERSATION_MAX_SESSIONS, CONVERSATION_TTL_SECONDS,
+    CONVERSATION_MAX_MESSAGES, CONVERSATION_FLUSH_SECONDS
+)
+from conversation_store import ConversationSessionStore
+from enhanced_code_retrieval import EnhancedRetriever
+
+_FOLLOWUP = re.compile(
+    r'^\s*(?:and|also|what about|how about|then|so|why|but)\b'
+    r'|\b(?:it|that|this|those|these|same|again|above|earlier|previous)\b',
+    re.IGNORECASE,
+)
+
+_default_store = None
+
+
+def default_session_store() -> ConversationSessionStore:
+    """One store per process, shared by every manager so sessions are not duplicated in memory."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ConversationSessionStore(
+            CONVERSATION_DB_PATH,
+            max_sessions=CONVERSATION_MAX_SESSIONS,
+            ttl_seconds=CONVERSATION_TTL_SECONDS,
+            max_messages=CONVERSATION_MAX_MESSAGES,
+            flush_seconds=CONVERSATION_FLUSH_SECONDS,
+        )
+    return _default_store
+
+
+def default_code_retrieval() -> EnhancedRetriever:
+    """A retriever over rca_service's shared clients, so managers search the real index instead of returning mocks."""
+    # Deferred: importing rca_service sets up its caches, which only a real search needs.
+    # Not memoized here: the providers already hand out one client per process, also after a fork.
+    from rca_service import get_collection, get_embed_model, get_keyword_index, get_embedding_cache
+    return EnhancedRetriever(get_collection(), get_embed_model(), get_keyword_index(), get_embedding_cache())
+
+
 class ContextAwareConversationManager:
-    def __init__(self):
-        self.conversation_memory = {}
-        self.code_retrieval = EnhancedCodeRetrieval()
-    
-    def build_enhanced_context(self, query: str, session_id: str, 
+    def __init__(self, session_store: ConversationSessionStore = None, code_retrieval: EnhancedRetriever = None):
+        # Bounded LRU + SQLite write-behind instead of an ever-growing dict, shared across workers
+        self.conversation_memory = session_store or default_session_store()
+        self.code_retrieval = code_retrieval or default_code_retrieval()
+
+    def build_enhanced_context(self, query: str, session_id: str,
                              jira_logs: List[Dict] = None) -> Dict:
         """Build comprehensive context for the query."""
-        
+
         # Get conversation history
         conversation_history = self.get_conversation_history(session_id)
-        
+
         # Enhanced search with all context
-        search_results = self.code_retrieval.enhanced_search(
-            query=query,
-            conversation_history=conversation_history,
-            jira_logs=jira_logs
+        error_log = "\n".join(log.get('content', '') for log in jira_logs or []) or query
+        search_results = self.code_retrieval.find_relevant_code(
+            user_query=query,
+            error_log=error_log,
+            chat_history=conversation_history
         )
-        
-        # Build conversation themes
-        themes = self.extract_conversation_themes(conversation_history)
-        
+
+        # Themes are counted as messages are stored, not re-extracted from the history
+        themes = self.extract_conversation_themes(session_id)
+
         # Determine if this is a follow-up question
-        is_followup = self.is_followup_question(query, conversation_history)
-        
+        is_followup = self.is_followup_question(query, conversation_history, themes)
+
         return {
             'search_results': search_results,
             'conversation_history': conversation_history[-6:],  # Last 3 exchanges
@@ -35,23 +77,24 @@ class ContextAwareConversationManager:
                 'search_strategy': search_results.get('search_strategy')
             }
         }
-    
-    def extract_conversation_themes(self, history: List[Dict]) -> List[str]:
-        """Extract recurring themes from conversation."""
-        themes = []
-        all_content = ' '.join([msg.get('content', '') for msg in history])
-        
-        # Extract common technical terms
-        tech_patterns = [
-            r'\b([A-Z][a-zA-Z0-9_]*Service)\b',
-            r'\b([A-Z][a-zA-Z0-9_]*Controller)\b',
-            r'\b(database|api|rest|http|json|authentication)\b',
-            r'\b([a-z][a-zA-Z0-9_]*Exception)\b'
-        ]
-        
-        for pattern in tech_patterns:
-            matches = re.findall(pattern, all_content, re.IGNORECASE)
-            themes.extend(matches)
-        
-        # Return unique themes
-        return list(set(themes))
+
+    def get_conversation_history(self, session_id: str, limit: int = None) -> List[Dict]:
+        return self.conversation_memory.history(session_id, limit)
+
+    def add_to_conversation_history(self, session_id: str, query: str, analysis: str):
+        """Stores one exchange: the user's query and the analysis returned for it."""
+        self.conversation_memory.append(session_id, 'user', query)
+        self.conversation_memory.append(session_id, 'assistant', analysis)
+
+    def extract_conversation_themes(self, session_id: str, limit: int = 10) -> List[str]:
+        """Recurring services, controllers, exceptions and topics of the conversation, most mentioned first."""
+        return self.conversation_memory.themes(session_id, limit)
+
+    def is_followup_question(self, query: str, history: List[Dict], themes: List[str] = ()) -> bool:
+        """A question refers back to the conversation if it uses referring words or names an earlier theme."""
+        if not history:
+            return False
+        if _FOLLOWUP.search(query):
+            return True
+        query_lower = query.lower()
+        return any(theme.lower() in query_lower for theme in themes)
@@ -0,0 +1,70 @@
+import re
+import sys
+import time
+from query_processor import EnhancedQueryProcessor
+
+# The classifier as it was before the single-pass rewrite: one uncompiled findall per pattern
+LEGACY_PATTERNS = [
+    r'\b[A-Z][a-zA-Z0-9_]*Service\b', r'\b[A-Z][a-zA-Z0-9_]*Controller\b', r'\b[A-Z][a-zA-Z0-9_]*Repository\b',
+    r'\bclass\s+[A-Z][a-zA-Z0-9_]*\b', r'\b[a-z][a-zA-Z0-9_]*\(\)', r'\bmethod\s+[a-z][a-zA-Z0-9_]*\b',
+    r'\bfunction\s+[a-z][a-zA-Z0-9_]*\b', r'\b(?:exception|error|null|timeout|connection|failed)\b',
+    r'\b(?:stack trace|stacktrace)\b', r'\b(?:why.*fail|what.*wrong|cause.*error)\b', r'\b(?:log|logging|trace|debug)\b',
+    r'\b(?:show.*log|find.*log|log.*show)\b', r'\b(?:how.*work|what.*do|explain.*flow)\b', r'\b(?:process|workflow|sequence)\b',
+]
+LEGACY_ENTITIES = [
+    r'\b[A-Z][a-zA-Z0-9_]*(?:Service|Controller|Repository)\b', r'\b[a-z][a-zA-Z0-9_]*\(\)',
+    r'\b(?:exception|error|null|timeout|connection|failed)\b', r'\b(?:database|api|rest|http|sql|json)\b',
+]
+
+def legacy_classify(query: str):
+    query_lower = query.lower()
+    entities = [re.findall(pattern, query_lower if i > 1 else query) for i, pattern in enumerate(LEGACY_ENTITIES)]
+    return sum(len(re.findall(pattern, query_lower)) for pattern in LEGACY_PATTERNS), entities
+
+def pasted_stack_trace(size: int) -> str:
+    """A user question followed by a realistic Java stack trace with nested causes, about size characters long."""
+    lines = ["why does the payment flow fail with this error? what's wrong with OrderService?",
+             "2024-05-01 12:00:00.123 ERROR [http-nio-8080-exec-7] c.e.p.PaymentController - Request failed"]
+    depth = 0
+    while sum(len(line) + 1 for line in lines) < size:
+        if depth % 40 == 0:
+            lines.append(f"Caused by: java.sql.SQLTimeoutException: Connection to database timed out after {depth}ms")
+        lines.append(f"\tat com.example.payments.service.PaymentService{depth % 7}.process(PaymentService{depth % 7}.java:{100 + depth})")
+        lines.append("\tat org.springframework.transaction.interceptor.TransactionInterceptor.invoke(TransactionInterceptor.java:119)")
+        depth += 1
+    return "\n".join(lines)[:size]
+
+def time_per_call(function, argument, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        function(argument)
+    return (time.perf_counter() - started) / repeats * 1000
+
+def benchmark(size: int = 100_000, repeats: int = 20):
+    """Per-query classification cost on a pasted stack trace, old per-pattern findall vs the single compiled scan."""
+    processor = EnhancedQueryProcessor()
+    query = pasted_stack_trace(size)
+    print(f"--- Query classifier benchmark: {len(query) / 1000:.0f} KB pasted stack trace, {repeats} runs ---")
+
+    legacy_ms = time_per_call(legacy_classify, query, repeats)
+    single_ms = time_per_call(processor.classify_query, query, repeats)
+    uncapped = EnhancedQueryProcessor(max_chars=len(query))
+    uncapped_ms = time_per_call(uncapped.classify_query, query, repeats)
+    short = ["why does UserService fail with NullPointerException?", "show me the logs for getUser()",
+             "how does the checkout workflow work?", "explain class OrderController"] * 250
+    batch_ms = time_per_call(processor.classify_queries, short, max(1, repeats // 4)) / len(short)
+    single_short_ms = time_per_call(lambda queries: [processor.classify_query(q) for q in queries], short,
+                                    max(1, repeats // 4)) / len(short)
+
+    best_type, confidence, entities = processor.classify_query(query)
+    print(f"Legacy (per-pattern findall):     {legacy_ms:8.2f} ms/query")
+    print(f"Single pass, uncapped:            {uncapped_ms:8.2f} ms/query")
+    print(f"Single pass, capped at {processor.max_chars} chars: {single_ms:8.2f} ms/query")
+    print(f"Short queries, one by one:        {single_short_ms * 1000:8.1f} us/query")
+    print(f"Short queries, batched:           {batch_ms * 1000:8.1f} us/query")
+    print(f"Result: {best_type.value} (confidence {confidence:.3f}), "
+          f"{sum(len(values) for values in entities.values())} entities")
+
+if __name__ == "__main__":
+    # Usage: python benchmark_query_processor.py [size_in_chars]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -4,6 +4,79 @@ import os
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "../code_indexer/chroma_db_storage")
 CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "java_code_analysis")
 
+# --- Vector Store Backend Settings ---
+# Must match the code indexer: "chroma" or "local" (memory-mapped NumPy store)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", os.path.join(CHROMA_DB_PATH, "local_vectors"))
+LOCAL_VECTOR_NPROBE = int(os.getenv("LOCAL_VECTOR_NPROBE", "16"))  # IVF lists scanned per query on large stores
+
+# --- Shared Code Indexer Modules ---
+# Config-free helpers (embedding cache, indexes) are imported from the indexer's directory
+CODE_INDEXER_PATH = os.getenv("CODE_INDEXER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code_indexer"))
+
+# --- Keyword Index Settings ---
+# BM25 index the code indexer writes next to ChromaDB; fused with vector results by rank
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "keyword_index.sqlite3"))
+KEYWORD_FUSION_WEIGHT = float(os.getenv("KEYWORD_FUSION_WEIGHT", "1.2"))  # Relative to 1.0 for the vector ranking
+# Stack-frame -> method chunk table, also written by the code indexer
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join(CHROMA_DB_PATH, "symbol_index.sqlite3"))
+
+# --- Embedding Settings ---
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "textembedding-gecko@001")
+# "stork" (remote model) or "hashing" (deterministic local stand-in for benchmarks); must match across services
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "stork")
+HASHING_EMBEDDING_DIMENSION = int(os.getenv("HASHING_EMBEDDING_DIMENSION", "768"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "../code_indexer/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+
 # --- Stork LLM Gateway Settings ---
 STORK_API_URL = os.getenv("STORK_API_URL", "http://stork.internal.yourcompany.com/api/v1/generate")
 STORK_API_KEY = os.getenv("STORK_API_KEY")
+
+# --- HTTP / Concurrency Settings ---
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))      # Per gateway host
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "16"))             # Threads for blocking embedding/Chroma calls
+MAX_CONCURRENT_RCA = int(os.getenv("MAX_CONCURRENT_RCA", "256"))          # In-flight /analyze requests per worker
+RCA_QUEUE_TIMEOUT_SECONDS = float(os.getenv("RCA_QUEUE_TIMEOUT_SECONDS", "30"))
+# Connect to the vector store, embedding model and indexes when the server starts rather than on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# --- RCA Response Cache Settings ---
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.97"))  # Cosine similarity for near-duplicates
+# The indexer's manifest; a cached analysis is dropped once a file it used is re-indexed
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(CHROMA_DB_PATH, "index_manifest.json"))
+INDEX_MANIFEST_POLL_SECONDS = float(os.getenv("INDEX_MANIFEST_POLL_SECONDS", "2"))  # How often a changed manifest is re-read
+
+# --- Batch Analysis Settings (/analyze/batch) ---
+BATCH_MAX_LOGS = int(os.getenv("BATCH_MAX_LOGS", "10000"))                      # Error logs accepted per request
+BATCH_CLUSTER_SIMILARITY = float(os.getenv("BATCH_CLUSTER_SIMILARITY", "0.95"))  # Cosine similarity to merge signatures
+BATCH_MAX_CONCURRENT_ANALYSES = int(os.getenv("BATCH_MAX_CONCURRENT_ANALYSES", "16"))  # Clusters analyzed at once per batch
+BATCH_EMBED_CONCURRENCY = int(os.getenv("BATCH_EMBED_CONCURRENCY", "8"))         # Embedding calls in flight for a batch
+
+# --- Anomaly Pipeline Results ---
+# Written by anomaly_detector/rca_pipeline.py; served read-only on GET /anomalies
+ANOMALY_RCA_DB_PATH = os.getenv("ANOMALY_RCA_DB_PATH", "../anomaly_detector/anomaly_rca.sqlite3")
+
+# --- Conversation Session Store Settings ---
+# Shared by every worker; sessions are cached in memory (LRU + idle TTL) and written behind to SQLite
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", "./conversation_sessions.sqlite3")
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))      # In memory, per worker
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "86400"))     # Idle sessions are dropped after this
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "50"))        # Most recent messages kept per session
+CONVERSATION_FLUSH_SECONDS = float(os.getenv("CONVERSATION_FLUSH_SECONDS", "2"))
+
+# --- Instrumentation Settings ---
+# Per-stage timings in /analyze responses and histograms on /metrics; "false" makes every span a no-op
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# --- Prompt Budget Settings ---
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))       # Whole prompt, template included
+PROMPT_LOG_SHARE = float(os.getenv("PROMPT_LOG_SHARE", "0.35"))            # Starting split; unused share moves to the others
+PROMPT_CODE_SHARE = float(os.getenv("PROMPT_CODE_SHARE", "0.55"))
+PROMPT_HISTORY_SHARE = float(os.getenv("PROMPT_HISTORY_SHARE", "0.10"))
+SNIPPET_CONTEXT_LINES = int(os.getenv("SNIPPET_CONTEXT_LINES", "12"))     # Lines kept either side of a stack-trace line
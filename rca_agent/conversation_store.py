@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+# --- Theme and Entity Extraction ---
+# One alternation, compiled once and run over each message as it is appended
+_ENTITY_PATTERN = re.compile(
+    r'\b(?P<service>[A-Z][a-zA-Z0-9_]*Service)\b'
+    r'|\b(?P<controller>[A-Z][a-zA-Z0-9_]*Controller)\b'
+    r'|\b(?P<exception>(?:[a-z_][\w$]*\.)*[A-Za-z_][\w$]*(?:Exception|Error))\b'
+    r'|\b(?P<topic>database|api|rest|http|json|authentication)\b',
+    re.IGNORECASE,
+)
+_CAMEL_SUFFIXES = {'service': 'Service', 'controller': 'Controller'}
+
+
+def extract_entities(text: str) -> dict:
+    """Services, controllers, exceptions and general topics mentioned in one message, as {kind: Counter}."""
+    entities = {}
+    for match in _ENTITY_PATTERN.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'topic':
+            value = value.lower()
+        elif kind in _CAMEL_SUFFIXES and not value.endswith(_CAMEL_SUFFIXES[kind]):
+            continue  # "userservice" in prose is not a class name
+        entities.setdefault(kind, Counter())[value] += 1
+    return entities
+
+
+class ConversationSession:
+    """One conversation: its most recent messages plus theme counts accumulated over every message."""
+
+    __slots__ = ('session_id', 'messages', 'entities', 'total', 'persisted', 'updated')
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.messages = []     # Most recent messages, oldest first
+        self.entities = {}     # kind -> Counter, over the whole conversation
+        self.total = 0         # Messages ever appended, including trimmed ones
+        self.persisted = 0     # Of those, how many are already in SQLite
+        self.updated = time.time()
+
+    def append(self, message: dict, max_messages: int):
+        self.messages.append(message)
+        del self.messages[:-max_messages]
+        for kind, counts in extract_entities(message.get('content', '')).items():
+            self.entities.setdefault(kind, Counter()).update(counts)
+        self.total += 1
+        self.updated = time.time()
+
+    def themes(self) -> list[str]:
+        """Every extracted theme, most mentioned first."""
+        combined = Counter()
+        for counts in self.entities.values():
+            combined.update(counts)
+        return [theme for theme, _ in combined.most_common()]
+
+
+class ConversationSessionStore:
+    """
+    Conversation memory shared by every worker of the RCA agent.
+
+    Sessions live in an in-memory LRU (bounded by max_sessions and an idle TTL) and are
+    persisted to SQLite write-behind: appends only touch memory, and a background thread
+    writes new messages and the cached theme counts every flush_seconds. A worker that
+    does not hold a session, or holds an older copy, loads it from SQLite, so requests
+    of one conversation can land on any worker. Each session keeps its last max_messages
+    messages; themes are counted as messages are appended and never recomputed.
+    """
+
+    def __init__(self, path: str, max_sessions: int = 1000, ttl_seconds: float = 86400,
+                 max_messages: int = 50, flush_seconds: float = 2.0):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.flush_seconds = flush_seconds
+        self.sessions = OrderedDict()  # session_id -> ConversationSession, least recently used first
+        self.dirty = set()
+        self.lock = threading.RLock()
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0, 'flushes': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, total INTEGER NOT NULL, "
+            "entities TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages (session_id TEXT NOT NULL, seq INTEGER NOT NULL, "
+            "message TEXT NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+        self.conn.commit()
+
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, name="conversation-flush", daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    # --- Session lookup ---
+    def _stored_total(self, session_id: str):
+        row = self.conn.execute("SELECT total FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def _load(self, session_id: str) -> ConversationSession:
+        session = ConversationSession(session_id)
+        row = self.conn.execute("SELECT total, entities, updated FROM sessions WHERE session_id = ?",
+                                (session_id,)).fetchone()
+        if row:
+            session.total = session.persisted = row[0]
+            session.entities = {kind: Counter(counts) for kind, counts in json.loads(row[1]).items()}
+            session.updated = row[2]
+            session.messages = [json.loads(message) for (message,) in self.conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, self.max_messages))][::-1]
+        return session
+
+    def _session(self, session_id: str) -> ConversationSession:
+        """The session, from memory when it is current, otherwise (re)loaded from SQLite."""
+        session = self.sessions.get(session_id)
+        if session is not None and time.time() - session.updated > self.ttl_seconds:
+            self.sessions.pop(session_id)
+            self.dirty.discard(session_id)
+            session = None
+        if session is not None:
+            stored = self._stored_total(session_id)
+            if stored is not None and stored > session.persisted:
+                session = self._reload(session)
+            else:
+                self.stats['hits'] += 1
+        else:
+            session = self._load(session_id)
+            self.stats['loads'] += 1
+            if session.total and time.time() - session.updated > self.ttl_seconds:
+                self._delete_stored(session_id)
+                session = ConversationSession(session_id)
+
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        self._evict()
+        return session
+
+    def _reload(self, stale: ConversationSession) -> ConversationSession:
+        """Another worker appended to this conversation: take the stored copy, then replay our unflushed messages on top."""
+        unflushed = stale.messages[-(stale.total - stale.persisted):] if stale.total > stale.persisted else []
+        session = self._load(stale.session_id)
+        self.stats['loads'] += 1
+        for message in unflushed:
+            session.append(message, self.max_messages)
+        if session.session_id in self.sessions:
+            self.sessions[session.session_id] = session
+        return session
+
+    def _delete_stored(self, session_id: str):
+        self.conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        self.conn.commit()
+
+    def _evict(self):
+        while len(self.sessions) > self.max_sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session_id in self.dirty:
+                self._flush_sessions([session])
+            self.sessions.pop(session_id)
+            self.stats['evictions'] += 1
+
+    # --- Public API ---
+    def append(self, session_id: str, role: str, content: str, **extra):
+        """Adds a message to a session; it reaches SQLite on the next flush."""
+        with self.lock:
+            session = self._session(session_id)
+            session.append({'role': role, 'content': content, 'timestamp': time.time(), **extra}, self.max_messages)
+            self.dirty.add(session_id)
+
+    def history(self, session_id: str, limit: int = None) -> list[dict]:
+        """The session's most recent messages, oldest first (a copy)."""
+        with self.lock:
+            messages = self._session(session_id).messages
+            return list(messages[-limit:] if limit else messages)
+
+    def themes(self, session_id: str, limit: int = None) -> list[str]:
+        with self.lock:
+            themes = self._session(session_id).themes()
+        return themes[:limit] if limit else themes
+
+    def entities(self, session_id: str) -> dict:
+        """{kind: [value, ...]} for services, controllers, exceptions and topics, most mentioned first."""
+        with self.lock:
+            session = self._session(session_id)
+            return {kind: [value for value, _ in counts.most_common()] for kind, counts in session.entities.items()}
+
+    def clear(self, session_id: str):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+            self.dirty.discard(session_id)
+            self._delete_stored(session_id)
+
+    # --- Write-behind ---
+    def _flush_sessions(self, sessions: list[ConversationSession]):
+        if not sessions:
+            return
+        # One write transaction, so two workers flushing the same conversation cannot interleave
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for session in sessions:
+                stored = self._stored_total(session.session_id)
+                if stored is not None and stored > session.persisted:
+                    session = self._reload(session)
+                new_count = session.total - session.persisted
+                new_messages = session.messages[-new_count:] if new_count else []
+                first_seq = session.total - len(new_messages)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO messages (session_id, seq, message) VALUES (?, ?, ?)",
+                    [(session.session_id, first_seq + i, json.dumps(message)) for i, message in enumerate(new_messages)]
+                )
+                # Messages older than the last max_messages are never read again
+                self.conn.execute("DELETE FROM messages WHERE session_id = ? AND seq < ?",
+                                  (session.session_id, session.total - self.max_messages))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, total, entities, updated) VALUES (?, ?, ?, ?)",
+                    (session.session_id, session.total, json.dumps(session.entities), session.updated)
+                )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        for session in sessions:
+            current = self.sessions.get(session.session_id, session)
+            current.persisted = current.total
+            self.dirty.discard(session.session_id)
+
+    def flush(self):
+        """Writes every changed session to SQLite and drops sessions idle past the TTL (in memory and on disk)."""
+        with self.lock:
+            self._flush_sessions([self.sessions[session_id] for session_id in list(self.dirty) if session_id in self.sessions])
+            expired_before = time.time() - self.ttl_seconds
+            for session_id in [sid for sid, session in self.sessions.items() if session.updated < expired_before]:
+                self.sessions.pop(session_id)
+            self.conn.execute("DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE updated < ?)",
+                              (expired_before,))
+            self.conn.execute("DELETE FROM sessions WHERE updated < ?", (expired_before,))
+            self.conn.commit()
+            self.stats['flushes'] += 1
+
+    def _flush_loop(self):
+        while not self.stopped.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error flushing conversation sessions: {e}")
+
+    def close(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.flush()
@@ -1,78 +1,154 @@
 # enhanced_retrieval.py
 
 import re
-import chromadb
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import CODE_INDEXER_PATH, BATCH_EMBED_CONCURRENCY
+
+sys.path.append(CODE_INDEXER_PATH)
+import instrumentation
+from keyword_index import extract_query_terms, reciprocal_rank_fusion
 # from your_embedding_module import embedModel # Your embedding model
-# Note: For this example, we'll simulate the embedding model and DB client.
+# Note: Without a collection and embedding model the retriever simulates results.
 
 class EnhancedRetriever:
-    def __init__(self):
-        # self.client = chromadb.PersistentClient(path="/path/to/your/db")
-        # self.collection = self.client.get_collection("java_code_analysis")
-        # self.embedModel = embedModel
+    def __init__(self, collection=None, embed_model=None, keyword_index=None, embedding_cache=None):
+        # collection: e.g. local_vector_store.open_collection(...) (a ChromaDB collection or LocalVectorStore)
+        # embed_model: your embedding model (StorkEmbeddings)
+        # keyword_index: the code indexer's KeywordIndex (BM25 over exact symbols)
+        # embedding_cache: optional EmbeddingCache of query vectors, e.g. rca_service's
+        # Without a collection and model the retriever falls back to simulated results.
+        self.collection = collection
+        self.embedModel = embed_model
+        self.keyword_index = keyword_index
+        self.embedding_cache = embedding_cache
         print(" retriever initialized.")
 
-    def _query_collection(self, query_text: str, top_k: int = 5) -> list:
-        """Simulates querying the ChromaDB collection."""
-        print(f"  -> Searching for: '{query_text[:50]}...'")
-        # In a real scenario:
-        # query_embedding = self.embedModel.embed_query(query_text)
-        # results = self.collection.query(
-        #     query_embeddings=[query_embedding],
-        #     n_results=top_k
-        # )
-        # return results['documents'][0] if results['documents'] else []
-        return [f"// Mock code snippet found for query: {query_text}\npublic void exampleMethod() {{}}"] # Placeholder
+    def _embed_queries(self, texts: list[str]) -> list[list[float]]:
+        # embed_query, not embed_documents: query vectors must match the single-log path (and its cache entries)
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_EMBED_CONCURRENCY, len(texts)))) as pool:
+            return list(pool.map(self.embedModel.embed_query, texts))
+
+    def _query_collection_many(self, queries: list[tuple[str, int]]) -> tuple[list[list], dict]:
+        """
+        Runs several (query_text, top_k) searches with concurrent, cached query embeddings
+        and one multi-vector collection.query, instead of one round trip pair per query.
+        Returns ((chunk id, snippet) pairs per query, stage timings in ms).
+        """
+        for query_text, _ in queries:
+            print(f"  -> Searching for: '{query_text[:50]}...'")
+        if not queries:
+            return [], {'embedding_ms': 0.0, 'vector_query_ms': 0.0}
+
+        if self.collection is None or self.embedModel is None:
+            # Simulated results
+            mocks = [f"// Mock code snippet found for query: {query_text}\npublic void exampleMethod() {{}}"
+                     for query_text, _ in queries]
+            results = [[(mock, mock)] for mock in mocks]
+            return results, {'embedding_ms': 0.0, 'vector_query_ms': 0.0}
+
+        started = time.perf_counter()
+        texts = [query_text for query_text, _ in queries]
+        if self.embedding_cache is not None:
+            query_embeddings = self.embedding_cache.get_or_embed(texts, self._embed_queries)
+        else:
+            query_embeddings = self._embed_queries(texts)
+        embedded = time.perf_counter()
+        if not query_embeddings:
+            instrumentation.observe('embedding_model', embedded - started)
+            return [[] for _ in queries], {'embedding_ms': round((embedded - started) * 1000, 2), 'vector_query_ms': 0.0}
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=max(top_k for _, top_k in queries)
+        )
+        queried = time.perf_counter()
+        instrumentation.observe('embedding_model', embedded - started)
+        instrumentation.observe('collection_query', queried - embedded)
+
+        documents = results['documents'] if results and results['documents'] else [[] for _ in queries]
+        ids = results['ids'] if results and results['ids'] else [[] for _ in queries]
+        snippets = [list(zip(chunk_ids, docs))[:top_k] for chunk_ids, docs, (_, top_k) in zip(ids, documents, queries)]
+        return snippets, {
+            'embedding_ms': round((embedded - started) * 1000, 2),
+            'vector_query_ms': round((queried - embedded) * 1000, 2),
+        }
+
+    def _keyword_search(self, error_log: str, log_keywords: list, top_k: int) -> list:
+        """BM25 lookup of the log's exact symbols; returns (chunk id, snippet) pairs. Local only."""
+        query_terms = extract_query_terms(error_log, log_keywords)
+        chunk_ids = [chunk_id for chunk_id, _ in self.keyword_index.search(query_terms, top_k)]
+        if not chunk_ids:
+            return []
+        fetched = self.collection.get(ids=chunk_ids, include=['documents'])
+        documents = dict(zip(fetched['ids'], fetched['documents']))
+        return [(chunk_id, documents[chunk_id]) for chunk_id in chunk_ids if chunk_id in documents]
 
     def _extract_log_keywords(self, error_log: str) -> list:
         """Extracts key technical terms from error logs for keyword search."""
         keywords = re.findall(r'([a-zA-Z0-9_]*Exception|FATAL|ERROR|timeout|[A-Z][a-zA-Z]+Service)', error_log)
-        return list(set(keywords))
+        return list(dict.fromkeys(keywords))  # Dedupe in first-seen order so query text is stable across runs
 
     def _extract_history_themes(self, chat_history: list[dict]) -> list:
         """Extracts key nouns and technical terms from conversation history."""
         full_text = " ".join([turn.get('content', '') for turn in chat_history])
         themes = re.findall(r'([A-Z][a-zA-Z]+Service|database|API|authentication)', full_text)
-        return list(set(themes))
+        return list(dict.fromkeys(themes))
 
+    @instrumentation.timed()
     def find_relevant_code(self, user_query: str, error_log: str, chat_history: list[dict], top_k: int = 10) -> dict:
         """
         Performs multiple targeted searches and combines results for maximum relevance.
+        All semantic searches go out in one batched round trip; exact symbols from the log
+        are looked up in the BM25 keyword index, and every ranking is merged by weighted
+        reciprocal rank fusion. Per-stage timings are returned.
         """
         print("🔎 Performing multi-query hybrid search...")
-        all_snippets = {}
-
-        # 1. Semantic search on the user's direct query
-        user_query_results = self._query_collection(user_query, top_k=3)
-        for snippet in user_query_results:
-            all_snippets[snippet] = all_snippets.get(snippet, 0) + 1.5 # Higher weight for direct query
+        started = time.perf_counter()
 
-        # 2. Semantic search on the raw error log
-        log_query_results = self._query_collection(error_log, top_k=3)
-        for snippet in log_query_results:
-            all_snippets[snippet] = all_snippets.get(snippet, 0) + 1.0
+        # Sub-queries as (query text, top_k, weight), in a fixed order so the merge is deterministic
+        sub_queries = [
+            (user_query, 3, 1.5),  # 1. Semantic search on the user's direct query (higher weight)
+            (error_log, 3, 1.0),   # 2. Semantic search on the raw error log
+        ]
 
-        # 3. Keyword-based search for technical terms from logs
+        # 3. Keyword-based search for technical terms from logs: exact BM25 matches when the
+        # keyword index is available, otherwise another semantic query
         log_keywords = self._extract_log_keywords(error_log)
-        if log_keywords:
-            keyword_query = "Code related to " + " ".join(log_keywords)
-            keyword_results = self._query_collection(keyword_query, top_k=3)
-            for snippet in keyword_results:
-                all_snippets[snippet] = all_snippets.get(snippet, 0) + 1.2 # High weight for keywords
+        use_keyword_index = self.keyword_index is not None and self.collection is not None
+        if log_keywords and not use_keyword_index:
+            sub_queries.append(("Code related to " + " ".join(log_keywords), 3, 1.2))  # High weight for keywords
 
         # 4. Contextual search based on conversation themes
         history_themes = self._extract_history_themes(chat_history)
         if history_themes:
-            theme_query = "Follow-up on " + " ".join(history_themes)
-            theme_results = self._query_collection(theme_query, top_k=2)
-            for snippet in theme_results:
-                all_snippets[snippet] = all_snippets.get(snippet, 0) + 0.8 # Lower weight for general themes
+            sub_queries.append(("Follow-up on " + " ".join(history_themes), 2, 0.8))  # Lower weight for general themes
+        extracted = time.perf_counter()
+
+        results, timings = self._query_collection_many([(text, k) for text, k, _ in sub_queries])
+        weights = [weight for _, _, weight in sub_queries]
+
+        keyword_started = time.perf_counter()
+        if use_keyword_index:
+            results.append(self._keyword_search(error_log, log_keywords, 5))
+            weights.append(1.5)  # Exact symbol matches are the strongest signal
+        keyword_finished = time.perf_counter()
+
+        # 5. Rank results by weighted reciprocal rank fusion; ties keep first-seen order
+        merge_started = time.perf_counter()
+        documents = {chunk_id: snippet for hits in results for chunk_id, snippet in hits}
+        ranked_ids = reciprocal_rank_fusion([[chunk_id for chunk_id, _ in hits] for hits in results], weights)
+        ranked_snippets = list(dict.fromkeys(documents[chunk_id] for chunk_id in ranked_ids))
+        finished = time.perf_counter()
 
-        # 5. Rank results by frequency and weight
-        ranked_snippets = sorted(all_snippets.keys(), key=lambda k: all_snippets[k], reverse=True)
+        timings['keyword_extraction_ms'] = round((extracted - started) * 1000, 2)
+        timings['keyword_search_ms'] = round((keyword_finished - keyword_started) * 1000, 3)
+        timings['merge_ms'] = round((finished - merge_started) * 1000, 2)
+        timings['total_ms'] = round((finished - started) * 1000, 2)
 
         return {
             "ranked_code_snippets": ranked_snippets[:top_k],
             "log_keywords": log_keywords,
-            "history_themes": history_themes
+            "history_themes": history_themes,
+            "retrieval_timings": timings
         }
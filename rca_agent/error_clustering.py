@@ -0,0 +1,41 @@
+import numpy as np
+from response_cache import signature_key
+
+
+def cluster_error_logs(error_logs: list[str], embed_fn, similarity_threshold: float) -> list[dict]:
+    """
+    Groups error logs that describe the same failure. Logs are first grouped by normalized
+    signature (see response_cache); then each signature group joins the existing cluster whose
+    leader's embedding has cosine similarity of at least similarity_threshold, or starts a new one.
+    embed_fn is called once, with one representative log per signature.
+    Returns clusters largest first, as {'representative': index, 'members': [indices], 'signatures': count}.
+    """
+    groups = {}
+    for i, error_log in enumerate(error_logs):
+        groups.setdefault(signature_key(error_log), []).append(i)
+    # Larger groups lead, so a cluster is represented by its most frequent variant
+    groups = sorted(groups.values(), key=len, reverse=True)
+
+    embeddings = embed_fn([error_logs[members[0]] for members in groups]) if len(groups) > 1 else []
+    if not embeddings:
+        # Single signature, or embedding failed: signature grouping alone
+        return [{'representative': members[0], 'members': members, 'signatures': 1} for members in groups]
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    leaders = np.empty((len(groups), vectors.shape[1]), dtype=np.float32)
+    clusters = []
+    for row, members in enumerate(groups):
+        if clusters:
+            similarities = leaders[:len(clusters)] @ vectors[row]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= similarity_threshold:
+                clusters[best]['members'].extend(members)
+                clusters[best]['signatures'] += 1
+                continue
+        leaders[len(clusters)] = vectors[row]
+        clusters.append({'representative': members[0], 'members': list(members), 'signatures': 1})
+
+    for cluster in clusters:
+        cluster['members'].sort()
+    return sorted(clusters, key=lambda cluster: len(cluster['members']), reverse=True)
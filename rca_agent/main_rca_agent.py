@@ -1,16 +1,106 @@
-from fastapi import FastAPI
+import json
+import sqlite3
+import asyncio
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from rca_service import perform_root_cause_analysis
+from config import WARMUP_ON_STARTUP, BATCH_MAX_LOGS, ANOMALY_RCA_DB_PATH
+from rca_service import (
+    perform_root_cause_analysis_async, perform_batch_root_cause_analysis_async, stream_root_cause_analysis,
+    start_async_resources, stop_async_resources, warmup_resources, response_cache
+)
+import instrumentation  # On sys.path via rca_service (shared with the code indexer)
 
 app = FastAPI()
 
 class RCARequest(BaseModel):
     error_log: str
 
+class RCABatchRequest(BaseModel):
+    error_logs: list[str]
+
+@app.on_event("startup")
+async def startup():
+    await start_async_resources()
+    if WARMUP_ON_STARTUP:
+        # Blocking connects run off the event loop; failures are retried by the first request
+        await asyncio.get_running_loop().run_in_executor(None, warmup_resources)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_async_resources()
+
 @app.post("/analyze")
-def analyze_error(request: RCARequest):
+async def analyze_error(request: RCARequest):
     """API endpoint to trigger a root cause analysis."""
-    result = perform_root_cause_analysis(request.error_log)
+    try:
+        result = await perform_root_cause_analysis_async(request.error_log)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many analyses in progress; retry shortly.")
     return result
 
+@app.post("/analyze/batch")
+async def analyze_error_batch(request: RCABatchRequest):
+    """
+    Analyzes many error logs in one call: one analysis per cluster of the same failure,
+    shared by every log in it. Returns the clusters (with sizes), each log's cluster and
+    how many LLM calls were made.
+    """
+    if not request.error_logs:
+        raise HTTPException(status_code=400, detail="error_logs is empty.")
+    if len(request.error_logs) > BATCH_MAX_LOGS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_LOGS} error logs per batch.")
+    return await perform_batch_root_cause_analysis_async(request.error_logs)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/analyze/stream")
+async def analyze_error_stream(request: RCARequest):
+    """
+    Streams the analysis as server-sent events: 'context' (retrieved code), 'token'
+    (generated text), then 'done' or 'error'.
+    """
+    events = stream_root_cause_analysis(request.error_log)
+    try:
+        # Wait for the first event so an overloaded server can still answer 503
+        first = await events.__anext__()
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many analyses in progress; retry shortly.")
+
+    async def body():
+        yield _sse(*first)
+        async for event, data in events:
+            yield _sse(event, data)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _recent_anomaly_groups(limit: int, status: str = None) -> list[dict]:
+    query = "SELECT * FROM anomaly_groups" + (" WHERE status = ?" if status else "") + " ORDER BY last_seen DESC LIMIT ?"
+    try:
+        conn = sqlite3.connect(f"file:{ANOMALY_RCA_DB_PATH}?mode=ro", uri=True)
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(query, (status, limit) if status else (limit,)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        return []  # The anomaly pipeline has not run yet
+    return [{**dict(row), "samples": json.loads(row["samples"]),
+             "context_provided": json.loads(row["context_provided"] or "[]")} for row in rows]
+
+@app.get("/anomalies")
+async def recent_anomalies(limit: int = 50, status: str = None):
+    """Anomaly groups found by the anomaly-to-RCA pipeline, most recently seen first, with their analyses."""
+    return await asyncio.get_running_loop().run_in_executor(None, _recent_anomaly_groups, min(limit, 500), status)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: per-stage latency histograms, request counters and response cache stats."""
+    cache = "".join(f"# TYPE rca_response_cache_{name}_total counter\nrca_response_cache_{name}_total {value}\n"
+                    for name, value in response_cache.stats.items() if isinstance(value, (int, float)))
+    return PlainTextResponse(instrumentation.render_prometheus('rca') + cache,
+                             media_type="text/plain; version=0.0.4")
+
 # To run this server: uvicorn main_rca_agent:app --reload
@@ -1,27 +1,259 @@
 # prompt_engine.py
+import os
+import re
+from config import (
+    PROMPT_TOKEN_BUDGET, PROMPT_LOG_SHARE, PROMPT_CODE_SHARE, PROMPT_HISTORY_SHARE,
+    SNIPPET_CONTEXT_LINES
+)
+
+# --- Token Estimation ---
+# Words, numbers and single punctuation marks; close to BPE counts for logs and Java
+# without needing the model's tokenizer.
+_TOKEN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+# --- Log Compression ---
+_FRAME = re.compile(r'^\s*at\s+[\w$.<>/]+\(([^)]*)\)')
+_FRAME_LOCATION = re.compile(r'([\w$]+\.java):(\d+)')
+_HEADLINE = re.compile(r'(Exception|Error|Throwable|Caused by:|\bERROR\b|\bFATAL\b|\bSEVERE\b)')
+_VARIABLE = re.compile(r'\d{4}-\d{2}-\d{2}[T ][\d:.,]+|0x[0-9a-fA-F]+|\b[0-9a-fA-F-]{16,}\b|\d+')
+TOP_FRAMES = 8  # Frames kept under each exception headline before others are dropped
+
+def dedupe_log_lines(error_log: str) -> list[str]:
+    """
+    Drops repeated log lines and stack frames (recursion, retry loops, the same warning
+    every second). Lines are compared with timestamps, ids and numbers masked; the first
+    occurrence is kept and annotated with the repeat count. Frames keep their line numbers.
+    """
+    kept, counts, first_index = [], {}, {}
+    for line in error_log.splitlines():
+        if not line.strip():
+            continue
+        key = line.strip() if _FRAME.match(line) else _VARIABLE.sub('#', line.strip())
+        if key in first_index:
+            counts[key] += 1
+            continue
+        first_index[key] = len(kept)
+        counts[key] = 1
+        kept.append(line)
+    for key, index in first_index.items():
+        if counts[key] > 1:
+            kept[index] = f"{kept[index]}  [repeated {counts[key]}x]"
+    return kept
+
+def fit_log(error_log: str, budget: int) -> str:
+    """
+    Dedupes the log, then keeps lines by importance until the budget is spent:
+    exception/error headlines first, then the top frames under each, then the rest.
+    Kept lines stay in their original order with a marker where lines were dropped.
+    """
+    lines = dedupe_log_lines(error_log)
+    priorities, frames_since_headline = [], TOP_FRAMES
+    for line in lines:
+        if _FRAME.match(line):
+            priorities.append(1 if frames_since_headline < TOP_FRAMES else 2)
+            frames_since_headline += 1
+        elif _HEADLINE.search(line):
+            priorities.append(0)
+            frames_since_headline = 0
+        else:
+            priorities.append(2)
+
+    keep, used = set(), 0
+    for i in sorted(range(len(lines)), key=lambda i: (priorities[i], i)):
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > budget:
+            continue
+        keep.add(i)
+        used += cost
+    return '\n'.join(_with_gap_markers(lines, keep, "... {n} log lines omitted ..."))
+
+def _with_gap_markers(lines: list[str], keep: set, marker: str) -> list[str]:
+    out, skipped = [], 0
+    for i, line in enumerate(lines):
+        if i in keep:
+            if skipped:
+                out.append(marker.format(n=skipped))
+                skipped = 0
+            out.append(line)
+        else:
+            skipped += 1
+    if skipped:
+        out.append(marker.format(n=skipped))
+    return out
+
+def referenced_lines(error_log: str) -> dict[str, set[int]]:
+    """Line numbers the stack trace points at, per source file name (e.g. 'UserService.java')."""
+    refs = {}
+    for line in error_log.splitlines():
+        frame = _FRAME.match(line)
+        if frame:
+            location = _FRAME_LOCATION.search(frame.group(1))
+            if location:
+                refs.setdefault(location.group(1), set()).add(int(location.group(2)))
+    return refs
+
+# --- Snippet Trimming ---
+def trim_snippet(snippet: str, metadata: dict, refs: dict[str, set[int]], budget: int) -> str:
+    """
+    Cuts a method snippet down to the budget. The declaration line is always kept; lines
+    around any line the stack trace references (SNIPPET_CONTEXT_LINES either side, using the
+    chunk's start_line metadata) come next, then the rest of the method from the top.
+    """
+    lines = snippet.splitlines()
+    if estimate_tokens(snippet) <= budget or not lines:
+        return snippet
+
+    start_line = (metadata or {}).get('start_line')
+    file_name = os.path.basename((metadata or {}).get('file_path', ''))
+    hits = sorted(n - start_line for n in refs.get(file_name, ()) if start_line and 0 <= n - start_line < len(lines))
+
+    order = [0]
+    for hit in hits:
+        # Nearest lines to the referenced one first, so the hot line survives a tight budget
+        for distance in range(SNIPPET_CONTEXT_LINES + 1):
+            order.extend(i for i in (hit - distance, hit + distance) if 0 <= i < len(lines))
+    order.extend(range(len(lines)))
+
+    keep, used = set(), 0
+    for i in order:
+        if i in keep:
+            continue
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > budget:
+            if hits:
+                continue
+            break
+        keep.add(i)
+        used += cost
+    return '\n'.join(_with_gap_markers(lines, keep, "    // ... {n} lines omitted ..."))
+
+def fit_snippets(snippets: list[str], metadatas: list[dict], error_log: str, budget: int) -> list[str]:
+    """
+    Spends the code budget in retrieval order: each snippet may use an equal share of
+    what is left, so short methods leave room for longer ones further down. Snippets
+    that would get almost nothing are dropped rather than cut to a signature.
+    """
+    refs = referenced_lines(error_log)
+    metadatas = list(metadatas or [])
+    metadatas += [{}] * (len(snippets) - len(metadatas))
+    fitted, remaining = [], budget
+    for i, (snippet, metadata) in enumerate(zip(snippets, metadatas)):
+        share = remaining // (len(snippets) - i)
+        if share < 20 and estimate_tokens(snippet) > share:
+            break
+        trimmed = trim_snippet(snippet, metadata, refs, share)
+        fitted.append(trimmed)
+        remaining -= estimate_tokens(trimmed)
+    return fitted
+
+# --- Budget Allocation ---
+def allocate_budget(total: int, needs: dict[str, int], shares: dict[str, float]) -> dict[str, int]:
+    """
+    Splits the budget by share, then hands whatever a section does not need to the
+    sections that still want more, in proportion to their shares.
+    """
+    allocation = {name: 0 for name in needs}
+    remaining = total
+    wanting = {name for name in needs if needs[name] > 0}
+    while remaining > 0 and wanting:
+        share_total = sum(shares[name] for name in wanting)
+        granted = 0
+        for name in list(wanting):
+            grant = min(needs[name] - allocation[name], int(remaining * shares[name] / share_total))
+            allocation[name] += grant
+            granted += grant
+            if allocation[name] >= needs[name]:
+                wanting.discard(name)
+        if granted == 0:
+            break
+        remaining -= granted
+    return allocation
+
 
 class PromptEngine:
-    def _summarize_history(self, chat_history: list[dict]) -> str:
+    """
+    Builds LLM prompts within a token budget. The budget left after the fixed template
+    is split across logs, code and history (see allocate_budget); each section is
+    compressed to its allocation and the tokens spent per section are reported.
+    """
+
+    def __init__(self, token_budget: int = PROMPT_TOKEN_BUDGET, shares: dict[str, float] = None):
+        self.token_budget = token_budget
+        self.shares = shares or {'logs': PROMPT_LOG_SHARE, 'code': PROMPT_CODE_SHARE, 'history': PROMPT_HISTORY_SHARE}
+
+    def _summarize_history(self, chat_history: list[dict], budget: int = None) -> str:
         """Creates a concise summary of the conversation."""
         if not chat_history:
             return "No previous conversation history."
-        
+
         summary = "Key points from the conversation so far:\n"
+        points = []
         for turn in chat_history[-4:]: # Summarize last 4 turns
             role = turn.get('role', 'Unknown')
             content = turn.get('content', '')
-            summary += f"- The {role} mentioned: '{content[:80]}...'\n"
-        return summary
+            points.append(f"- The {role} mentioned: '{content[:80]}...'\n")
+        if budget is not None:
+            # Most recent turns matter most; drop the oldest until the summary fits
+            while points and estimate_tokens(summary + "".join(points)) > budget:
+                points.pop(0)
+            if not points:
+                return "Earlier conversation omitted to fit the prompt budget."
+        return summary + "".join(points)
 
-    def build_prompt(self, user_query: str, chat_history: list[dict], error_log: str, code_snippets: list[str]) -> str:
+    def fit_context(self, template: str, error_log: str, code_snippets: list[str],
+                    code_metadata: list[dict] = None, chat_history: list[dict] = None) -> tuple[str, list[str], str, dict]:
         """
-        Dynamically constructs a prompt with all available context.
+        Compresses the log, snippets and history to fit the budget around the given template.
+        Returns (log text, snippets, history summary, tokens per section).
         """
+        template_tokens = estimate_tokens(template)
+        needs = {
+            'logs': estimate_tokens(error_log),
+            'code': sum(estimate_tokens(s) for s in code_snippets),
+            'history': estimate_tokens(self._summarize_history(chat_history)) if chat_history else 0,
+        }
+        allocation = allocate_budget(max(0, self.token_budget - template_tokens), needs, self.shares)
+
+        log_text = fit_log(error_log, allocation['logs'])
+        snippets = fit_snippets(code_snippets, code_metadata, error_log, allocation['code'])
+        history = self._summarize_history(chat_history, allocation['history']) if chat_history else ""
+
+        report = {
+            'template': template_tokens,
+            'logs': estimate_tokens(log_text),
+            'code': sum(estimate_tokens(s) for s in snippets),
+            'history': estimate_tokens(history),
+            'snippets_kept': len(snippets),
+            'snippets_dropped': len(code_snippets) - len(snippets),
+            'budget': self.token_budget,
+        }
+        report['total'] = report['template'] + report['logs'] + report['code'] + report['history']
+        return log_text, snippets, history, report
+
+    def build_prompt_with_report(self, user_query: str, chat_history: list[dict], error_log: str,
+                                 code_snippets: list[str], code_metadata: list[dict] = None) -> tuple[str, dict]:
+        """Same as build_prompt, also returning the tokens spent per section."""
         print("⚙️ Building dynamic LLM prompt...")
 
-        conversation_summary = self._summarize_history(chat_history)
+        template = self._template(user_query, "", "", "")
+        error_log, code_snippets, conversation_summary, report = self.fit_context(
+            template, error_log, code_snippets, code_metadata, chat_history
+        )
+        conversation_summary = conversation_summary or self._summarize_history(chat_history)
         code_context = "\n".join(code_snippets) if code_snippets else "No specific code snippets were found to be relevant."
+        return self._template(user_query, conversation_summary, error_log, code_context), report
+
+    def build_prompt(self, user_query: str, chat_history: list[dict], error_log: str, code_snippets: list[str],
+                     code_metadata: list[dict] = None) -> str:
+        """
+        Dynamically constructs a prompt with all available context, compressed to the token budget.
+        """
+        return self.build_prompt_with_report(user_query, chat_history, error_log, code_snippets, code_metadata)[0]
 
+    def _template(self, user_query: str, conversation_summary: str, error_log: str, code_context: str) -> str:
         # A single, powerful prompt template that handles all cases
         prompt = f"""
 You are an expert AI Root Cause Analysis assistant. Your goal is to provide a clear, accurate, and helpful analysis based on all available information.
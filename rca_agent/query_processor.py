@@ -1,4 +1,5 @@
 import re
+from bisect import bisect_right
 from enum import Enum
 from typing import Dict, List, Tuple
 
@@ -10,58 +11,77 @@ class QueryType(Enum):
     LOG_ANALYSIS = "log_analysis"
     FLOW_UNDERSTANDING = "flow_understanding"
 
+MAX_CLASSIFY_CHARS = 16384  # Pasted logs are classified on their head; the signal is in the first lines
+# Joins queries for classify_queries. No rule can span it: [^\n] gaps stop at the newlines and
+# \s+ stops at the NUL, so every match stays inside one query, exactly as classify_query sees it.
+_BATCH_SEPARATOR = "\n\x00\n"
+
+# (group name, query type it scores for, entity list it feeds, pattern).
+# Every rule starts at a word boundary, which the automaton checks once up front so positions
+# inside words are rejected without trying each alternative.
+# Multi-word phrases are lookaheads, so the words inside them are still counted on their own.
+# Gaps in phrases are bounded to one line so long pasted logs cannot make them backtrack.
+_RULES = [
+    ('class_decl', QueryType.SPECIFIC_CLASS, None, r'(?=(?i:class)\s+[A-Z][a-zA-Z0-9_]*\b)'),
+    ('method_decl', QueryType.SPECIFIC_METHOD, None, r'(?=(?i:(?:method|function)\s+[a-z][a-zA-Z0-9_]*\b))'),
+    ('error_question', QueryType.ERROR_ANALYSIS, None,
+     r'(?=(?i:why[^\n]{0,80}?fail|what[^\n]{0,80}?wrong|cause[^\n]{0,80}?error))'),
+    ('stack_trace', QueryType.ERROR_ANALYSIS, None, r'(?=(?i:stack ?trace\b))'),
+    ('log_request', QueryType.LOG_ANALYSIS, None,
+     r'(?=(?i:show[^\n]{0,80}?log|find[^\n]{0,80}?log|log[^\n]{0,80}?show))'),
+    ('flow_question', QueryType.FLOW_UNDERSTANDING, None,
+     r'(?=(?i:how[^\n]{0,80}?work|what[^\n]{0,80}?do|explain[^\n]{0,80}?flow))'),
+    ('class_name', QueryType.SPECIFIC_CLASS, 'class_names', r'[A-Z][a-zA-Z0-9_]*(?:Service|Controller|Repository)\b'),
+    ('method_name', QueryType.SPECIFIC_METHOD, 'method_names', r'[a-z][a-zA-Z0-9_]*\(\)'),
+    ('error_term', QueryType.ERROR_ANALYSIS, 'error_terms', r'(?i:(?:exception|error|null|timeout|connection|failed)\b)'),
+    ('log_term', QueryType.LOG_ANALYSIS, None, r'(?i:(?:log|logging|trace|debug)\b)'),
+    ('flow_term', QueryType.FLOW_UNDERSTANDING, None, r'(?i:(?:process|workflow|sequence)\b)'),
+    ('technical_term', None, 'technical_terms', r'(?i:(?:database|api|rest|http|sql|json)\b)'),
+]
+_ENTITY_KEYS = ('class_names', 'method_names', 'error_terms', 'technical_terms')
+_LOWERCASED_ENTITIES = {'error_terms', 'technical_terms'}
+
 class EnhancedQueryProcessor:
-    def __init__(self):
-        self.patterns = {
-            QueryType.SPECIFIC_CLASS: [
-                r'\b[A-Z][a-zA-Z0-9_]*Service\b',
-                r'\b[A-Z][a-zA-Z0-9_]*Controller\b',
-                r'\b[A-Z][a-zA-Z0-9_]*Repository\b',
-                r'\bclass\s+[A-Z][a-zA-Z0-9_]*\b'
-            ],
-            QueryType.SPECIFIC_METHOD: [
-                r'\b[a-z][a-zA-Z0-9_]*\(\)',
-                r'\bmethod\s+[a-z][a-zA-Z0-9_]*\b',
-                r'\bfunction\s+[a-z][a-zA-Z0-9_]*\b'
-            ],
-            QueryType.ERROR_ANALYSIS: [
-                r'\b(?:exception|error|null|timeout|connection|failed)\b',
-                r'\b(?:stack trace|stacktrace)\b',
-                r'\b(?:why.*fail|what.*wrong|cause.*error)\b'
-            ],
-            QueryType.LOG_ANALYSIS: [
-                r'\b(?:log|logging|trace|debug)\b',
-                r'\b(?:show.*log|find.*log|log.*show)\b'
-            ],
-            QueryType.FLOW_UNDERSTANDING: [
-                r'\b(?:how.*work|what.*do|explain.*flow)\b',
-                r'\b(?:process|workflow|sequence)\b'
-            ]
-        }
-    
-    def classify_query(self, query: str) -> Tuple[QueryType, float, Dict]:
-        """Classify user query and extract key entities."""
-        query_lower = query.lower()
-        
-        # Extract entities
-        entities = {
-            'class_names': re.findall(r'\b[A-Z][a-zA-Z0-9_]*(?:Service|Controller|Repository)\b', query),
-            'method_names': re.findall(r'\b[a-z][a-zA-Z0-9_]*\(\)', query),
-            'error_terms': re.findall(r'\b(?:exception|error|null|timeout|connection|failed)\b', query_lower),
-            'technical_terms': re.findall(r'\b(?:database|api|rest|http|sql|json)\b', query_lower)
-        }
-        
-        # Score each query type
-        scores = {}
-        for query_type, patterns in self.patterns.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, query_lower))
-                score += matches
-            scores[query_type] = score
-        
+    def __init__(self, max_chars: int = MAX_CLASSIFY_CHARS):
+        # Every pattern in one compiled alternation: a query is scanned once, whatever its length
+        self.max_chars = max_chars
+        self.automaton = re.compile(r'\b(?:' + '|'.join(f'(?P<{name}>{pattern})' for name, _, _, pattern in _RULES) + ')')
+        self.rules = {name: (query_type, entity) for name, query_type, entity, _ in _RULES}
+        self.patterns = {}
+        for name, query_type, _, pattern in _RULES:
+            if query_type is not None:
+                self.patterns.setdefault(query_type, []).append(pattern)
+
+    def _result(self, text: str, matches) -> Tuple[QueryType, float, Dict]:
+        scores = {query_type: 0 for query_type in self.patterns}
+        entities = {key: [] for key in _ENTITY_KEYS}
+        for match in matches:
+            query_type, entity = self.rules[match.lastgroup]
+            if query_type is not None:
+                scores[query_type] += 1
+            if entity is not None:
+                value = match.group()
+                entities[entity].append(value.lower() if entity in _LOWERCASED_ENTITIES else value)
+
         # Get highest scoring type
         best_type = max(scores, key=scores.get)
-        confidence = scores[best_type] / (len(query.split()) + 1)  # Normalize
-        
+        confidence = scores[best_type] / (len(text.split()) + 1)  # Normalize
         return best_type, confidence, entities
+
+    def classify_query(self, query: str) -> Tuple[QueryType, float, Dict]:
+        """Classify user query and extract key entities, in one scan of at most max_chars characters."""
+        text = query[:self.max_chars]
+        return self._result(text, self.automaton.finditer(text))
+
+    def classify_queries(self, queries: List[str]) -> List[Tuple[QueryType, float, Dict]]:
+        """Classifies many queries with a single scan over all of them, splitting matches back by position."""
+        texts = [query[:self.max_chars] for query in queries]
+        starts, position = [], 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + len(_BATCH_SEPARATOR)
+
+        per_query = [[] for _ in texts]
+        for match in self.automaton.finditer(_BATCH_SEPARATOR.join(texts)):
+            per_query[bisect_right(starts, match.start()) - 1].append(match)
+        return [self._result(text, matches) for text, matches in zip(texts, per_query)]
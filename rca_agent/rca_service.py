@@ -1,31 +1,196 @@
-import chromadb
+import os
+import sys
+import json
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict
+import httpx
 import requests
-from abc.langchain.embeddings import StorkEmbeddings
+from requests.adapters import HTTPAdapter
 from config import (
     CHROMA_DB_PATH, CHROMA_COLLECTION_NAME,
-    STORK_API_URL, STORK_API_KEY
+    VECTOR_STORE_BACKEND, LOCAL_VECTOR_STORE_PATH, LOCAL_VECTOR_NPROBE,
+    STORK_API_URL, STORK_API_KEY,
+    CODE_INDEXER_PATH, EMBEDDING_MODEL_ID, EMBEDDING_PROVIDER, HASHING_EMBEDDING_DIMENSION,
+    EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+    LLM_TIMEOUT_SECONDS, LLM_CONNECT_TIMEOUT_SECONDS,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE,
+    RETRIEVAL_WORKERS, MAX_CONCURRENT_RCA, RCA_QUEUE_TIMEOUT_SECONDS,
+    RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_SIMILARITY,
+    INDEX_MANIFEST_PATH, INDEX_MANIFEST_POLL_SECONDS, KEYWORD_INDEX_PATH, KEYWORD_FUSION_WEIGHT, SYMBOL_INDEX_PATH,
+    INSTRUMENTATION_ENABLED,
+    BATCH_CLUSTER_SIMILARITY, BATCH_MAX_CONCURRENT_ANALYSES, BATCH_EMBED_CONCURRENCY
 )
+from response_cache import RCAResponseCache, IndexVersions, signature_key
+from prompt_builder import PromptEngine
+from error_clustering import cluster_error_logs
 
-# Initialize clients
-chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-collection = chroma_client.get_collection(name=CHROMA_COLLECTION_NAME)
+# Appended (not prepended) so this agent's own config module still wins. The indexer modules
+# imported from here never import config themselves, which is what lets both sides share them.
+sys.path.append(CODE_INDEXER_PATH)
+import instrumentation
+from lazy_resource import LazyResource, warmup
+from embedding_cache import EmbeddingCache
+from keyword_index import KeywordIndex, extract_query_terms, reciprocal_rank_fusion
+from symbol_index import SymbolIndex
+from local_vector_store import open_collection
+from embedding_provider import create_embed_model, embedding_model_key
 
-# Initialize Stork Embeddings
-embedModel = StorkEmbeddings(
-    provider='GCP_VERTEX_AI', 
-    provider_id='textembedding-gecko@001'
+instrumentation.configure(INSTRUMENTATION_ENABLED)
+
+# Clients are created on first use, once per process (see lazy_resource.py): importing this
+# module opens nothing, so CLI start-up, tests and forked workers skip the connection cost, and
+# a collection the indexer has not created yet only fails the retrieval that needs it.
+
+# The vector backend must match the one the code indexer writes
+get_collection = LazyResource('vector collection', lambda: open_collection(
+    VECTOR_STORE_BACKEND, CHROMA_DB_PATH, CHROMA_COLLECTION_NAME, LOCAL_VECTOR_STORE_PATH,
+    create=False, nprobe=LOCAL_VECTOR_NPROBE))
+
+# The embedding model (Stork, or the local hashing stand-in for benchmarks)
+get_embed_model = LazyResource('embedding model', lambda: create_embed_model(
+    EMBEDDING_PROVIDER, EMBEDDING_MODEL_ID, HASHING_EMBEDDING_DIMENSION))
+EMBEDDING_MODEL_KEY = embedding_model_key(EMBEDDING_PROVIDER, EMBEDDING_MODEL_ID, HASHING_EMBEDDING_DIMENSION)
+
+def _create_http_session() -> requests.Session:
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_MAX_KEEPALIVE))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_MAX_KEEPALIVE))
+    return session
+
+# Pooled keep-alive session for the synchronous path (CLI); avoids a new connection per request
+get_http_session = LazyResource('gateway session', _create_http_session, close=lambda session: session.close())
+
+# Bounded executor for blocking embedding/vector store work on the async path
+get_retrieval_executor = LazyResource(
+    'retrieval executor',
+    lambda: ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rca-retrieval"),
+    close=lambda executor: executor.shutdown(wait=False),
+)
+
+# Shared async client and admission limit for the async path. They belong to the serving
+# event loop, so they are created in it (see start_async_resources) and forgotten after a fork.
+async_http_client = None
+rca_slots = None
+
+def _forget_async_resources():
+    global async_http_client, rca_slots
+    async_http_client = rca_slots = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_async_resources)
+
+LLM_FAILURE_MESSAGE = "Failed to get analysis from Stork LLM Gateway."
+
+# Analyses keyed by normalized error signature; never caches gateway failures
+response_cache = RCAResponseCache(
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY,
+    index_versions=IndexVersions(INDEX_MANIFEST_PATH, INDEX_MANIFEST_POLL_SECONDS),
 )
 
+# Same on-disk cache as the indexer, under the query-embedding namespace
+get_embedding_cache = LazyResource('embedding cache', lambda: EmbeddingCache(
+    EMBEDDING_CACHE_PATH, f"{EMBEDDING_MODEL_KEY}:query", EMBEDDING_CACHE_MAX_ENTRIES))
+
+# Exact-symbol index maintained by the code indexer; local lookups only
+get_keyword_index = LazyResource('keyword index', lambda: KeywordIndex(KEYWORD_INDEX_PATH))
+get_symbol_index = LazyResource('symbol index', lambda: SymbolIndex(SYMBOL_INDEX_PATH))
+
+# Compresses logs and snippets to the prompt token budget
+prompt_engine = PromptEngine()
+
+def warmup_resources() -> dict:
+    """Creates every client now (e.g. at server start-up) instead of on the first request; returns ms per client."""
+    timings = warmup(get_collection, get_embed_model, get_embedding_cache, get_keyword_index, get_symbol_index,
+                     get_http_session, get_retrieval_executor)
+    response_cache.index_versions.start()
+    print(f"Warmed up RCA resources (ms): {timings}")
+    return timings
+
+def _embed_query(texts: list[str]) -> list[list[float]]:
+    with instrumentation.span('embedding_model'):
+        # LangChain's embed_query method is for single text queries
+        return [get_embed_model().embed_query(texts[0])]
+
+@instrumentation.timed()
 def get_embedding_for_error(text: str) -> list[float]:
-    """Generates an embedding for the incoming error log using Stork."""
+    """Generates an embedding for the incoming error log using Stork, reusing cached ones for repeated logs."""
     try:
-        # LangChain's embed_query method is for single text queries
-        embedding = embedModel.embed_query(text)
-        return embedding
+        embeddings = get_embedding_cache().get_or_embed([text], _embed_query)
+        return embeddings[0] if embeddings else []
     except Exception as e:
         print(f"Error generating embedding for error log: {e}")
         return []
 
+def _embed_queries(texts: list[str]) -> list[list[float]]:
+    # embed_query per text keeps vectors identical to the single-log path (and its cache entries)
+    model = get_embed_model()
+    with instrumentation.span('embedding_model'):
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_EMBED_CONCURRENCY, len(texts)))) as pool:
+            return list(pool.map(model.embed_query, texts))
+
+@instrumentation.timed()
+def get_embeddings_for_errors(texts: list[str]) -> list[list[float]]:
+    """Embeddings for many error logs: one cache pass, then concurrent model calls for the misses only."""
+    try:
+        return get_embedding_cache().get_or_embed(texts, _embed_queries)
+    except Exception as e:
+        print(f"Error generating embeddings for error logs: {e}")
+        return []
+
+def query_code_context(error_embedding: list[float], top_k: int = 5, error_log: str = None) -> tuple[list[str], list[str], list[dict]]:
+    """
+    Returns the code snippets most relevant to an error, the files they came from and their metadata.
+    With error_log, the methods its stack frames point into come first (symbol index lookups, no
+    search needed). Remaining slots are filled from the vector ranking, fused with chunks matching
+    the log's exact symbols (BM25 over the keyword index) by reciprocal rank fusion.
+    Returns nothing if the collection cannot be opened (e.g. nothing has been indexed yet).
+    """
+    try:
+        collection = get_collection()
+    except Exception as e:
+        print(f"Vector collection unavailable: {e}")
+        return [], [], []
+    with instrumentation.span('symbol_resolve'):
+        resolved = get_symbol_index().resolve(error_log, limit=top_k) if error_log else []
+    chunks, ranked = {}, []
+    slots = top_k - len(resolved)
+    if slots > 0:
+        with instrumentation.span('collection_query'):
+            results = collection.query(
+                query_embeddings=[error_embedding],
+                n_results=top_k,
+                include=['documents', 'metadatas']
+            )
+        if results and results['documents']:
+            for chunk_id, document, meta in zip(results['ids'][0], results['documents'][0], (results['metadatas'] or [[]])[0]):
+                chunks[chunk_id] = (document, meta or {})
+        ranked = list(chunks)
+        if error_log:
+            with instrumentation.span('keyword_search'):
+                keyword_hits = [chunk_id for chunk_id, _ in get_keyword_index().search(extract_query_terms(error_log), top_k)]
+            ranked = reciprocal_rank_fusion([ranked, keyword_hits], [1.0, KEYWORD_FUSION_WEIGHT])
+        ranked = [chunk_id for chunk_id in ranked if chunk_id not in resolved][:slots]
+    ranked = resolved + ranked
+
+    missing = [chunk_id for chunk_id in ranked if chunk_id not in chunks]
+    if missing:
+        with instrumentation.span('collection_get'):
+            fetched = collection.get(ids=missing, include=['documents', 'metadatas'])
+        for chunk_id, document, meta in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+            chunks[chunk_id] = (document, meta or {})
+    ranked = [chunk_id for chunk_id in ranked if chunk_id in chunks]
+
+    documents = [chunks[chunk_id][0] for chunk_id in ranked]
+    metadatas = [chunks[chunk_id][1] for chunk_id in ranked]
+    files = {meta.get('file_path') for meta in metadatas if meta.get('file_path')}
+    return documents, sorted(files), metadatas
+
+@instrumentation.timed()
 def find_relevant_code(error_log: str, top_k: int = 5) -> list[str]:
     """Finds the most semantically similar code snippets from ChromaDB."""
     error_embedding = get_embedding_for_error(error_log)
@@ -34,24 +199,52 @@ def find_relevant_code(error_log: str, top_k: int = 5) -> list[str]:
         print("Failed to generate embedding for error log.")
         return []
     
-    results = collection.query(
-        query_embeddings=[error_embedding],
-        n_results=top_k
+    return query_code_context(error_embedding, top_k, error_log)[0]
+
+@instrumentation.timed('retrieve')
+def _retrieve(error_log: str) -> dict:
+    """Embeds the log once, reusing it both for the near-duplicate cache lookup and for code retrieval."""
+    retrieval = {'embedding': [], 'similar': None, 'code': [], 'files': [], 'metadatas': []}
+    retrieval['embedding'] = get_embedding_for_error(error_log)
+    if not retrieval['embedding']:
+        print("Failed to generate embedding for error log.")
+        return retrieval
+
+    with instrumentation.span('similar_cache_lookup'):
+        retrieval['similar'] = response_cache.find_similar(retrieval['embedding'])
+    if retrieval['similar'] is None:
+        retrieval['code'], retrieval['files'], retrieval['metadatas'] = query_code_context(retrieval['embedding'], error_log=error_log)
+    return retrieval
+
+def _remember(key: str, retrieval: dict, analysis: str) -> dict:
+    result = {"analysis": analysis, "context_provided": retrieval['code'], "prompt_tokens": retrieval.get('prompt_tokens', {})}
+    if analysis == LLM_FAILURE_MESSAGE or not analysis.strip():
+        # Never cached; "error" tells API clients (e.g. the anomaly pipeline) to retry instead of keeping it
+        return {**result, "analysis": LLM_FAILURE_MESSAGE, "cache": "error"}
+    response_cache.put(key, result, retrieval['embedding'], retrieval['files'])
+    return {**result, "cache": "miss"}
+
+@instrumentation.timed()
+def build_rca_prompt(error_log: str, code_context: list[str], code_metadata: list[dict] = None) -> tuple[str, dict]:
+    """
+    Constructs the detailed RCA prompt from the error log and retrieved snippets, compressed
+    to PROMPT_TOKEN_BUDGET. Returns the prompt and the tokens spent per section.
+    """
+    error_log, code_context, _, report = prompt_engine.fit_context(
+        _rca_template("", ""), error_log, code_context, code_metadata
     )
-    return results['documents'][0] if results and results['documents'] else []
+    snippets = "".join(f"// Snippet {i+1}\n{snippet}\n" for i, snippet in enumerate(code_context))
+    return _rca_template(error_log, snippets), report
 
-def get_rca_from_stork(error_log: str, code_context: list[str]) -> str:
-    """Constructs a prompt and sends it to the Stork LLM gateway."""
-    
-    # Construct the detailed prompt
-    prompt = f"""
+def _rca_template(error_log: str, snippets: str) -> str:
+    return f"""
     Analyze the following Java error log and the potentially relevant code snippets to determine the root cause.
 
     --- ERROR LOG ---
     {error_log}
 
     --- RELEVANT CODE CONTEXT ---
-    {"".join(f"// Snippet {i+1}\\n{snippet}\\n" for i, snippet in enumerate(code_context))}
+    {snippets}
 
     --- ANALYSIS REQUEST ---
     Based on the provided context, please provide:
@@ -59,6 +252,7 @@ def get_rca_from_stork(error_log: str, code_context: list[str]) -> str:
     2. A suggested fix or debugging step.
     """
 
+def _gateway_request(prompt: str) -> tuple[dict, dict]:
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {STORK_API_KEY}"
@@ -68,32 +262,282 @@ def get_rca_from_stork(error_log: str, code_context: list[str]) -> str:
         "model": "gemini-1.5-pro",
         "prompt": prompt
     }
+    return headers, payload
+
+def _prepare_prompt(error_log: str, retrieval: dict) -> str:
+    prompt, retrieval['prompt_tokens'] = build_rca_prompt(error_log, retrieval['code'], retrieval['metadatas'])
+    print(f"Prompt tokens: {retrieval['prompt_tokens']}")
+    return prompt
+
+@instrumentation.timed()
+def get_rca_from_stork(prompt: str) -> str:
+    """Sends an RCA prompt to the Stork LLM gateway."""
+    headers, payload = _gateway_request(prompt)
 
     try:
-        response = requests.post(STORK_API_URL, json=payload, headers=headers)
+        response = get_http_session().post(STORK_API_URL, json=payload, headers=headers,
+                                     timeout=(LLM_CONNECT_TIMEOUT_SECONDS, LLM_TIMEOUT_SECONDS))
         response.raise_for_status()
         return response.json().get("result", "No analysis returned from Stork.")
     except requests.exceptions.RequestException as e:
         print(f"Error calling Stork API: {e}")
-        return "Failed to get analysis from Stork LLM Gateway."
+        return LLM_FAILURE_MESSAGE
 
-def perform_root_cause_analysis(error_log: str) -> dict:
-    """Orchestrates the end-to-end RCA process."""
+def _analyze(error_log: str, key: str) -> dict:
     print("Finding relevant code context using Stork embeddings...")
-    relevant_code = find_relevant_code(error_log)
-    
-    if not relevant_code:
+    retrieval = _retrieve(error_log)
+    if retrieval['similar'] is not None:
+        return {**retrieval['similar'], "cache": "similar"}
+
+    if not retrieval['code']:
         print("No relevant code context found. Relying on error log alone.")
     
     print("Getting analysis from Stork LLM Gateway...")
-    analysis = get_rca_from_stork(error_log, relevant_code)
-    
-    return {
-        "error_log": error_log,
-        "analysis": analysis,
-        "context_provided": relevant_code
+    return _remember(key, retrieval, get_rca_from_stork(_prepare_prompt(error_log, retrieval)))
+
+def perform_root_cause_analysis(error_log: str) -> dict:
+    """
+    Orchestrates the end-to-end RCA process. Repeats of an already analyzed failure
+    (same normalized signature, or a near-identical embedding) are answered from the
+    response cache; concurrent identical requests share one LLM call. With instrumentation
+    enabled, 'timings' holds the milliseconds spent in each stage of this request.
+    """
+    trace = instrumentation.start_trace()
+    with instrumentation.span('analyze'):
+        key = signature_key(error_log)
+        result = response_cache.get(key)
+        if result is None:
+            result, shared = response_cache.single_flight(key, lambda: _analyze(error_log, key))
+            if shared and result["cache"] != "error":
+                result = {**result, "cache": "shared"}
+    return _with_timings({"error_log": error_log, "cache": "exact", **result}, trace)
+
+def _with_timings(result: dict, trace) -> dict:
+    instrumentation.count('analyses', cache=result['cache'])
+    if trace is not None:
+        result['timings'] = trace.to_dict()
+    return result
+
+# --- Async RCA path (FastAPI) ---
+
+async def start_async_resources():
+    """Creates the pooled HTTP client and admission semaphore in the serving event loop."""
+    global async_http_client, rca_slots
+    if async_http_client is None:
+        async_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+        )
+    if rca_slots is None:
+        rca_slots = asyncio.Semaphore(MAX_CONCURRENT_RCA)
+
+async def stop_async_resources():
+    global async_http_client
+    if async_http_client is not None:
+        await async_http_client.aclose()
+        async_http_client = None
+
+@instrumentation.timed('get_rca_from_stork')
+async def get_rca_from_stork_async(prompt: str) -> str:
+    """Async variant of get_rca_from_stork over the shared keep-alive client."""
+    headers, payload = _gateway_request(prompt)
+
+    try:
+        response = await async_http_client.post(STORK_API_URL, json=payload, headers=headers)
+        response.raise_for_status()
+        return response.json().get("result", "No analysis returned from Stork.")
+    except httpx.HTTPError as e:
+        print(f"Error calling Stork API: {e!r}")
+        return LLM_FAILURE_MESSAGE
+
+async def perform_root_cause_analysis_async(error_log: str) -> dict:
+    """
+    Same RCA flow as perform_root_cause_analysis without holding a thread for the LLM call.
+    Cache hits return immediately. Otherwise blocking embedding/Chroma work runs in the
+    bounded retrieval executor; at most MAX_CONCURRENT_RCA analyses run at once and
+    callers wait up to RCA_QUEUE_TIMEOUT_SECONDS for a slot (asyncio.TimeoutError otherwise).
+    """
+    await start_async_resources()
+    trace = instrumentation.start_trace()
+    with instrumentation.span('analyze'):
+        key = signature_key(error_log)
+        result = response_cache.get(key)
+        if result is None:
+            result, shared = await response_cache.single_flight_async(key, lambda: _analyze_async(error_log, key))
+            if shared and result["cache"] != "error":
+                result = {**result, "cache": "shared"}
+    return _with_timings({"error_log": error_log, "cache": "exact", **result}, trace)
+
+async def perform_batch_root_cause_analysis_async(error_logs: list[str]) -> dict:
+    """
+    Triage of many error logs at once. Logs are clustered by normalized signature and
+    embedding similarity (error_clustering), then each cluster's representative goes through
+    the same cached, single-flight path as /analyze, BATCH_MAX_CONCURRENT_ANALYSES at a time.
+    Every log shares its cluster's analysis: clusters[assignments[i]] answers error_logs[i].
+    llm_calls counts the clusters that needed a new gateway call.
+    """
+    await start_async_resources()
+    trace = instrumentation.start_trace()
+    with instrumentation.span('analyze_batch'):
+        clusters = await asyncio.get_running_loop().run_in_executor(
+            get_retrieval_executor(), contextvars.copy_context().run,
+            cluster_error_logs, error_logs, get_embeddings_for_errors, BATCH_CLUSTER_SIMILARITY)
+        slots = asyncio.Semaphore(BATCH_MAX_CONCURRENT_ANALYSES)
+
+        async def analyze(cluster: dict) -> dict:
+            async with slots:
+                try:
+                    return await perform_root_cause_analysis_async(error_logs[cluster['representative']])
+                except asyncio.TimeoutError:
+                    return {"analysis": None, "context_provided": [], "cache": "error",
+                            "error": "Too many analyses in progress; retry this cluster shortly."}
+
+        analyses = await asyncio.gather(*(analyze(cluster) for cluster in clusters))
+
+    assignments = [0] * len(error_logs)
+    results = []
+    for cluster_id, (cluster, analysis) in enumerate(zip(clusters, analyses)):
+        for i in cluster['members']:
+            assignments[i] = cluster_id
+        results.append({
+            "cluster": cluster_id,
+            "size": len(cluster['members']),
+            "signatures": cluster['signatures'],
+            "members": cluster['members'],
+            "representative": error_logs[cluster['representative']],
+            **{key: value for key, value in analysis.items() if key != "error_log"},
+        })
+    instrumentation.count('batch_logs', len(error_logs))
+    result = {
+        "total_logs": len(error_logs),
+        "distinct_signatures": sum(cluster['signatures'] for cluster in clusters),
+        "llm_calls": sum(1 for analysis in analyses
+                         if analysis.get("cache") == "miss" or analysis.get("analysis") == LLM_FAILURE_MESSAGE),
+        "clusters": results,
+        "assignments": assignments,
     }
+    if trace is not None:
+        result["timings"] = trace.to_dict()
+    return result
+
+async def _acquire_rca_slot():
+    with instrumentation.span('rca_queue_wait'):
+        await asyncio.wait_for(rca_slots.acquire(), timeout=RCA_QUEUE_TIMEOUT_SECONDS)
+
+async def _retrieve_in_executor(error_log: str) -> dict:
+    """Runs _retrieve on the retrieval executor inside a copy of this context, so its spans reach the request's trace."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_retrieval_executor(), contextvars.copy_context().run, _retrieve, error_log)
+
+async def _analyze_async(error_log: str, key: str) -> dict:
+    await _acquire_rca_slot()
+    try:
+        retrieval = await _retrieve_in_executor(error_log)
+        if retrieval['similar'] is not None:
+            return {**retrieval['similar'], "cache": "similar"}
+        if not retrieval['code']:
+            print("No relevant code context found. Relying on error log alone.")
+
+        analysis = await get_rca_from_stork_async(_prepare_prompt(error_log, retrieval))
+        return _remember(key, retrieval, analysis)
+    finally:
+        rca_slots.release()
     
+async def _stream_gateway_tokens(prompt: str):
+    """
+    Relays completion tokens from the gateway as they arrive. Accepts server-sent
+    'data: {...}' lines or newline-delimited JSON, reading the text from 'token',
+    'delta' or 'result'.
+    """
+    headers, payload = _gateway_request(prompt)
+    async with async_http_client.stream("POST", STORK_API_URL, json={**payload, "stream": True}, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            line = line.strip()
+            if line.startswith("data:"):
+                line = line[5:].strip()
+            if not line or line.startswith(("event:", "id:", ":")):
+                continue
+            if line == "[DONE]":
+                break
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                yield line
+                continue
+            text = chunk.get("token") or chunk.get("delta") or chunk.get("result") if isinstance(chunk, dict) else None
+            if text:
+                yield text
+
+def _replay_events(result: dict, cache: str):
+    """Events for an analysis that is already complete: its code references, then the whole text as one token."""
+    yield "context", {"cache": cache, "code_references": result["context_provided"]}
+    if result.get("cache") == "error":
+        yield "error", {"message": result["analysis"]}
+        return
+    yield "token", {"text": result["analysis"]}
+    yield "done", {"analysis": result["analysis"], "cache": cache}
+
+async def stream_root_cause_analysis(error_log: str):
+    """
+    Streams an RCA as (event, data) pairs: a 'context' event with the code references
+    as soon as retrieval finishes, 'token' events while the LLM generates, then 'done'
+    with the full analysis. Cache hits, and requests that join an identical analysis
+    already in flight (streamed or not), get the finished analysis in one token.
+    """
+    await start_async_resources()
+    key = signature_key(error_log)
+    cached = response_cache.get(key)
+    if cached is not None:
+        for event in _replay_events(cached, "exact"):
+            yield event
+        return
+
+    flight = response_cache.claim_async(key)
+    if flight is None:
+        result, _ = await response_cache.single_flight_async(key, lambda: _analyze_async(error_log, key))
+        for event in _replay_events(result, "shared"):
+            yield event
+        return
+
+    try:
+        await _acquire_rca_slot()
+        try:
+            retrieval = await _retrieve_in_executor(error_log)
+            if retrieval['similar'] is not None:
+                flight.set_result({**retrieval['similar'], "cache": "similar"})
+                for event in _replay_events(retrieval['similar'], "similar"):
+                    yield event
+                return
+
+            prompt = _prepare_prompt(error_log, retrieval)
+            yield "context", {"cache": "miss", "files": retrieval['files'], "code_references": retrieval['code'],
+                              "prompt_tokens": retrieval['prompt_tokens']}
+            parts = []
+            started = time.perf_counter()
+            try:
+                async for text in _stream_gateway_tokens(prompt):
+                    if not parts:
+                        instrumentation.observe('llm_first_token', time.perf_counter() - started)
+                    parts.append(text)
+                    yield "token", {"text": text}
+            except httpx.HTTPError as e:
+                print(f"Error streaming from Stork API: {e!r}")
+
+            analysis = "".join(parts)
+            instrumentation.observe('llm_stream', time.perf_counter() - started)
+            result = _remember(key, retrieval, analysis)
+            flight.set_result(result)  # Shared with waiting requests; failed or empty streams are not cached
+            if result["cache"] == "error":
+                yield "error", {"message": LLM_FAILURE_MESSAGE}
+                return
+            yield "done", {"analysis": analysis, "cache": "miss"}
+        finally:
+            rca_slots.release()
+    finally:
+        if not flight.done():
+            flight.cancel()  # Queue timeout or client gone: waiting requests start their own analysis
+
 # Enhanced main RCA function
 def enhanced_perform_rca(query: str, session_id: str, jira_logs: List[Dict] = None) -> Dict:
     """Enhanced RCA with multi-layered context awareness."""
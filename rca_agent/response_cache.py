@@ -0,0 +1,276 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# --- Error Signature Normalization ---
+SIGNATURE_FRAMES = 5  # Top stack frames kept in a signature
+
+_FRAME = re.compile(r'^\s*at\s+([\w$.<>/]+)\(([^)]*)\)')
+_EXCEPTION = re.compile(r'((?:[\w$]+\.)*[\w$]*(?:Exception|Error|Throwable))\b(?::\s*(.*))?')
+_MASKS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), '<ts>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{12,}\b'), '<hex>'),
+    (re.compile(r'\[[^\]]*(?:thread|exec|pool|worker|nio)[^\]]*\]', re.IGNORECASE), '[<thread>]'),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), '<str>'),
+    (re.compile(r'\d+'), '<n>'),
+]
+_LAMBDA_SUFFIX = re.compile(r'\$\d+')
+
+
+def _mask(text: str) -> str:
+    for pattern, replacement in _MASKS:
+        text = pattern.sub(replacement, text)
+    return ' '.join(text.split())
+
+
+def normalize_error_signature(error_log: str, max_frames: int = SIGNATURE_FRAMES) -> str:
+    """
+    Reduces an error log to what identifies the failure: the exception types (with
+    masked messages) and the top stack frames. Timestamps, ids, thread names and other
+    variable values are masked, so repeats of one failure share a signature.
+    """
+    exceptions, frames = [], []
+    for line in error_log.splitlines():
+        frame = _FRAME.match(line)
+        if frame:
+            if len(frames) < max_frames:
+                # Frame line numbers identify code, so they stay; synthetic $1/$2 suffixes do not
+                frames.append(f"at {_LAMBDA_SUFFIX.sub('$', frame.group(1))}({frame.group(2)})")
+            continue
+        exception = _EXCEPTION.search(line)
+        if exception:
+            exceptions.append(_mask(line[exception.start():]))
+
+    if not exceptions and not frames:
+        return _mask(error_log)
+    return '\n'.join(exceptions + frames)
+
+
+def signature_key(error_log: str) -> str:
+    return hashlib.sha256(normalize_error_signature(error_log).encode('utf8')).hexdigest()
+
+
+class IndexVersions:
+    """
+    Per-file content hashes from the code indexer's manifest. A background thread re-reads
+    the manifest when its mtime changes, at most every poll_seconds, and swaps in a new
+    table; lookups only read the current table, so they never touch the disk or wait on a reload.
+    """
+
+    def __init__(self, manifest_path: str, poll_seconds: float = 2.0):
+        self.manifest_path = manifest_path
+        self.poll_seconds = poll_seconds
+        self.mtime = None
+        self.hashes = None  # path -> sha256; None until the first load
+        self.lock = threading.Lock()
+        self.poller_pid = None
+
+    def start(self):
+        """Starts this process's reload thread (also done by the first lookup)."""
+        if self.poller_pid == os.getpid():
+            return
+        with self.lock:
+            if self.poller_pid != os.getpid():  # Threads do not survive a fork
+                self.poller_pid = os.getpid()
+                threading.Thread(target=self._poll, name="index-versions", daemon=True).start()
+
+    def _poll(self):
+        while True:
+            self._reload()
+            time.sleep(self.poll_seconds)
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self.mtime and self.hashes is not None:
+            return
+        try:
+            hashes = {}
+            if mtime is not None:
+                with open(self.manifest_path, 'r') as f:
+                    hashes = {path: entry['sha256'] for path, entry in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            print(f"Could not read index manifest {self.manifest_path}: {e}")
+            return  # Keep the previous table; retried on the next poll
+        self.mtime, self.hashes = mtime, hashes
+
+    def current(self, file_paths):
+        """{path: sha256} for the given files, or None while the manifest has not been loaded yet."""
+        self.start()
+        hashes = self.hashes
+        if hashes is None:
+            return None
+        return {path: hashes.get(path) for path in file_paths}
+
+
+class RCAResponseCache:
+    """
+    Caches RCA results by normalized error signature. Exact signatures hit directly;
+    near-duplicates are found by cosine similarity of the error-log embeddings.
+    Entries expire after ttl_seconds, the oldest are evicted past max_entries, and an
+    entry is dropped once any code file it was built from has been re-indexed.
+    Concurrent requests for one signature share a single computation (single-flight).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, similarity_threshold: float,
+                 index_versions: IndexVersions = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.index_versions = index_versions
+        self.entries = OrderedDict()  # key -> {'result', 'created', 'embedding', 'files'}
+        self.lock = threading.Lock()
+        self.inflight = {}        # key -> {'done': threading.Event, 'result' or 'error'} (sync callers)
+        self.async_inflight = {}  # key -> asyncio.Task, or a claim_async future (async callers)
+        self._matrix = None       # Normalized embeddings of entries, rebuilt lazily
+        self._matrix_keys = []
+        self.stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'invalidated': 0}
+
+    def _is_valid(self, entry: dict) -> bool:
+        if time.time() - entry['created'] > self.ttl_seconds:
+            return False
+        if self.index_versions and entry['files']:
+            return self.index_versions.current(entry['files']) in (entry['files'], None)
+        return True
+
+    def _drop(self, key: str):
+        self.entries.pop(key, None)
+        self._matrix = None
+        self.stats['invalidated'] += 1
+
+    def get(self, key: str):
+        """Returns the cached result for an exact signature, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if not self._is_valid(entry):
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            self.stats['exact_hits'] += 1
+            return entry['result']
+
+    def find_similar(self, embedding: list[float]):
+        """Returns the result of the most similar cached error above the threshold, or None."""
+        if not embedding:
+            return None
+        with self.lock:
+            if self._matrix is None:
+                self._matrix_keys = [k for k, e in self.entries.items() if e['embedding'] is not None]
+                vectors = np.array([self.entries[k]['embedding'] for k in self._matrix_keys], dtype=np.float32)
+                if len(vectors):
+                    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+                self._matrix = vectors
+            if not len(self._matrix):
+                return None
+
+            query = np.asarray(embedding, dtype=np.float32)
+            similarities = self._matrix @ (query / (np.linalg.norm(query) + 1e-12))
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.similarity_threshold:
+                    break
+                key = self._matrix_keys[i]
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if not self._is_valid(entry):
+                    self._drop(key)
+                    continue
+                self.entries.move_to_end(key)
+                self.stats['similar_hits'] += 1
+                return entry['result']
+            return None
+
+    def put(self, key: str, result: dict, embedding: list[float] = None, files=()):
+        versions = self.index_versions.current(files) if self.index_versions else {}
+        if versions is None:
+            return  # Index versions not loaded yet, so the entry could never be invalidated
+        with self.lock:
+            self.entries[key] = {'result': result, 'created': time.time(),
+                                 'embedding': embedding or None, 'files': versions}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._matrix = None
+
+    def single_flight(self, key: str, compute) -> tuple[dict, bool]:
+        """
+        Runs compute() once per key at a time; concurrent callers wait for and share its
+        result, or its exception, so a failing gateway is called once rather than once per waiter.
+        Returns (result, whether it was shared from another caller's computation).
+        """
+        with self.lock:
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = {'done': threading.Event()}
+        if not leader:
+            flight['done'].wait()
+            if 'error' in flight:
+                raise flight['error']
+            return flight['result'], True
+
+        try:
+            with self.lock:
+                self.stats['misses'] += 1
+            flight['result'] = compute()
+            return flight['result'], False
+        except BaseException as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight['done'].set()
+
+    async def single_flight_async(self, key: str, compute) -> tuple[dict, bool]:
+        """
+        Async single-flight: compute is a coroutine function, run once per key at a time in
+        its own task that every caller awaits through a shield. A caller being cancelled (e.g.
+        its client disconnected) leaves the computation running for the others. A follower
+        whose shared computation was cancelled or timed out in the RCA queue starts a new one.
+        """
+        for attempt in range(2):
+            task = self.async_inflight.get(key)
+            shared = task is not None
+            if not shared:
+                task = self._register_async(key, asyncio.ensure_future(compute()))
+            try:
+                return await asyncio.shield(task), shared
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                retry = shared and not attempt and task.done() and (
+                    task.cancelled() or isinstance(task.exception(), asyncio.TimeoutError))
+                if not retry:
+                    raise
+
+    def claim_async(self, key: str):
+        """
+        For work that cannot run inside single_flight_async (e.g. a streamed analysis): returns a
+        future the caller must resolve with its result, which single_flight_async callers for the
+        same key share, or None if another computation for the key is already in flight.
+        """
+        if key in self.async_inflight:
+            return None
+        return self._register_async(key, asyncio.get_running_loop().create_future())
+
+    def _register_async(self, key: str, flight: asyncio.Future) -> asyncio.Future:
+        self.stats['misses'] += 1
+        self.async_inflight[key] = flight
+        flight.add_done_callback(lambda done: self._async_done(key, done))
+        return flight
+
+    def _async_done(self, key: str, task: asyncio.Future):
+        if self.async_inflight.get(key) is task:
+            del self.async_inflight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved, so a failure no caller awaited is not logged as unhandled